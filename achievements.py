@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+"""
+Achievements, checked incrementally as a game's moves happen.
+
+Each achievement is one of a few predicate kinds over the game's moves.
+Engine compiles a catalog against the current rule table into trigger
+tables: for every action id, every location id and the end of a day, the
+tuple of (check, achievement) pairs that event can advance. A move runs
+only the checks in its own entry, so most moves run none, and nothing ever
+rescans a game's history.
+
+A game's progress is a bytearray of SLOT_SIZE bytes per achievement
+(status, count, last day counted), the same size for every game however
+long it runs.
+
+Kinds:
+
+    days_with(action, n)        the action performed on n different days
+    times(action, n)            the action performed n times
+    days_at(location, n)        travelled to the location on n different days
+    days_above(level, n)        n days ended with sustainability above level
+    never(action)               the game finished without the action
+"""
+
+PENDING, EARNED, FAILED = range(3)
+SLOT_SIZE = 3
+
+
+class Achievement:
+    """One catalog entry: a predicate kind, its target and its threshold."""
+
+    __slots__ = ("name", "title", "description", "kind", "target", "need")
+
+    def __init__(self, name, title, description, kind, target=None, need=1):
+        self.name = name
+        self.title = title
+        self.description = description
+        self.kind = kind
+        self.target = target
+        self.need = need
+
+
+CATALOG = (
+    Achievement("tree_planter", "Tree Planter", "Plant trees on 5 different days.",
+                "days_with", "plant_trees", 5),
+    Achievement("green_commuter", "Green Commuter", "Take public transport 10 times.",
+                "times", "use_public_transport", 10),
+    Achievement("beach_regular", "Beach Regular", "Visit the beach on 3 different days.",
+                "days_at", "beach", 3),
+    Achievement("steady_progress", "Steady Progress", "End 7 days with sustainability above 10.",
+                "days_above", 10, 7),
+    Achievement("plastic_free", "Plastic Free", "Finish the game without using single-use plastics.",
+                "never", "use_single_use_plastics"),
+)
+
+
+def _count(progress, offset, need):
+    progress[offset + 1] = count = min(progress[offset + 1] + 1, 255)
+    if count >= need:
+        progress[offset] = EARNED
+        return True
+    return False
+
+
+def _once_a_day(progress, offset, need, day):
+    if progress[offset + 2] == day:
+        return False
+    progress[offset + 2] = day
+    return _count(progress, offset, need)
+
+
+def _check_times(game, offset, achievement):
+    return _count(game.progress, offset, achievement.need)
+
+
+def _check_days(game, offset, achievement):
+    return _once_a_day(game.progress, offset, achievement.need, game.days)
+
+
+def _check_day_above(game, offset, achievement):
+    if game.sustainability_level > achievement.target:
+        return _count(game.progress, offset, achievement.need)
+    return False
+
+
+def _check_never(game, offset, achievement):
+    game.progress[offset] = FAILED
+    return False
+
+
+# kind -> (event the kind listens to, check run on that event)
+KINDS = {
+    "days_with": ("action", _check_days),
+    "times": ("action", _check_times),
+    "days_at": ("travel", _check_days),
+    "days_above": ("end_day", _check_day_above),
+    "never": ("action", _check_never),
+}
+
+
+class Engine:
+    """A catalog compiled into per-event trigger tables for one rule table."""
+
+    def __init__(self, rules, catalog=CATALOG):
+        self.catalog = tuple(catalog)
+        on_action = [[] for _ in rules.action_names]
+        on_travel = [[] for _ in rules.location_names]
+        on_end_day = []
+        for index, achievement in enumerate(self.catalog):
+            event, check = KINDS[achievement.kind]
+            trigger = (check, index * SLOT_SIZE, achievement)
+            if event == "action":
+                # An achievement about an action the rules no longer have can never fire.
+                if achievement.target in rules.action_ids:
+                    on_action[rules.action_ids[achievement.target]].append(trigger)
+            elif event == "travel":
+                if achievement.target in rules.location_ids:
+                    on_travel[rules.location_ids[achievement.target]].append(trigger)
+            else:
+                on_end_day.append(trigger)
+        self.on_action = tuple(map(tuple, on_action))
+        self.on_travel = tuple(map(tuple, on_travel))
+        self.on_end_day = tuple(on_end_day)
+        self.at_finish = tuple(index * SLOT_SIZE for index, achievement in enumerate(self.catalog)
+                               if achievement.kind == "never")
+
+    def new_progress(self):
+        return bytearray(SLOT_SIZE * len(self.catalog))
+
+    def _run(self, game, triggers):
+        earned = []
+        progress = game.progress
+        for check, offset, achievement in triggers:
+            if progress[offset] == PENDING and check(game, offset, achievement):
+                earned.append(achievement.name)
+        if game.is_over():
+            for offset in self.at_finish:
+                if progress[offset] == PENDING:
+                    progress[offset] = EARNED
+                    earned.append(self.catalog[offset // SLOT_SIZE].name)
+        return earned
+
+    def action(self, game, action_id):
+        """Advance a game's progress after an action; return the names of achievements it earned."""
+        return self._run(game, self.on_action[action_id])
+
+    def travel(self, game, location_id):
+        return self._run(game, self.on_travel[location_id])
+
+    def end_day(self, game):
+        """Advance progress after a day ends; game.days is already the new day."""
+        return self._run(game, self.on_end_day)
+
+    def earned(self, progress):
+        """The achievements a progress bytearray has earned, in catalog order."""
+        return [achievement for index, achievement in enumerate(self.catalog)
+                if index * SLOT_SIZE < len(progress) and progress[index * SLOT_SIZE] == EARNED]
+
+
+_compiled = (None, None)
+
+
+def engine_for(rules):
+    """The engine for a rule table, compiled on first use after a content change."""
+    global _compiled
+    compiled_rules, engine = _compiled
+    if compiled_rules is not rules:
+        engine = Engine(rules)
+        _compiled = (rules, engine)
+    return engine
@@ -1,86 +1,661 @@
-from flask import Flask, render_template, request, redirect, url_for, session
+import copy
+import hmac
+import os
+import queue
+from time import perf_counter
+from flask import Flask, Response, render_template, request, redirect, url_for, session, jsonify, g
+from jinja2 import FileSystemBytecodeCache
 from sustainability_game import SustainabilityGame
+from session_store import create_store, new_game_id
+from fragments import FragmentCache
+from event_log import EventLog, decode_games, encode_games
+import content_store
+import http_cache
+import live
+from leaderboard import METRICS, Leaderboard
+from replay import TranscriptWriter
+from rooms import Rooms, valid_room_name
+from cookie_state import COOKIE_NAME as STATE_COOKIE, CookieState
+import achievements
+import metrics
+import search
 
-app = Flask(__name__)
-app.secret_key = 'your_secret_key'
+# /static is served by the view below, from memory under content-hashed URLs.
+app = Flask(__name__, static_folder=None)
+app.secret_key = os.environ.get('GAME_SECRET_KEY', 'your_secret_key')
+app.assets = http_cache.StaticAssets(os.path.join(app.root_path, 'static'))
+app.jinja_env.globals['static_url'] = app.assets.url
+# ETags, 304s and compression for every buffered response.
+app.wsgi_app = http_cache.WSGIMiddleware(app.wsgi_app)
+# Compiled templates are cached on disk, so a cold start skips compiling
+# them on its first requests; templates still load only when first used.
+try:
+    _template_cache = os.path.join(app.root_path, '__pycache__', 'templates')
+    os.makedirs(_template_cache, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(_template_cache)
+except OSError:
+    pass
+app.store = create_store()
+# With GAME_STATELESS=1 games live in a signed cookie instead of app.store,
+# so any worker that shares the secret key can serve any request.
+app.cookie_state = None
+if os.environ.get('GAME_STATELESS') == '1':
+    # Anyone can sign a cookie with the published default key.
+    if 'GAME_SECRET_KEY' not in os.environ:
+        raise RuntimeError("GAME_STATELESS=1 needs GAME_SECRET_KEY set to a private key")
+    app.cookie_state = CookieState(app.secret_key, max_age=int(os.environ.get('GAME_STORE_TTL', '3600')))
+app.fragments = FragmentCache(app.jinja_env)
+app.live = live.Broadcaster()
+# Each open event stream would hold a worker thread, so under WSGI the stream
+# route is off unless GAME_FLASK_EVENTS=1; asgi.py serves it from its event loop.
+app.flask_events = os.environ.get('GAME_FLASK_EVENTS') == '1'
+app.leaderboard = Leaderboard()
+app.rooms = Rooms(ttl=int(os.environ.get('GAME_STORE_TTL', '3600')))
+
+# With GAME_NODE set to this node's URL and GAME_NODES to every node's URL
+# (comma-separated), this process owns one shard of the games of a cluster
+# behind router.py. `previous_ring` is the ring before the last membership
+# change, whose owners still hold games that have not been handed off; it is
+# dropped once every node has handed its games off. Nodes trust each other
+# through a token derived from the secret key, so a private key is required.
+app.node = os.environ.get('GAME_NODE')
+app.ring = app.previous_ring = None
+HANDOFF_BATCH = 1000
+if app.node:
+    if 'GAME_SECRET_KEY' not in os.environ:
+        raise RuntimeError("GAME_NODE needs GAME_SECRET_KEY set to a private key shared by the cluster")
+    from router import HashRing, cluster_token
+    app.ring = HashRing(os.environ.get('GAME_NODES', app.node).split(','))
+    app.cluster_token = cluster_token(app.secret_key)
+
+# With GAME_EVENT_LOG set to a directory, every move is appended to an event
+# log there and games are rebuilt from it on startup.
+app.event_log = None
+if os.environ.get('GAME_EVENT_LOG'):
+    app.event_log = EventLog(os.environ['GAME_EVENT_LOG'], ttl=int(os.environ.get('GAME_STORE_TTL', '3600')))
+    for _game_id, _game in app.event_log.recover().items():
+        app.store.save(_game_id, _game)
+        if _game.room:
+            app.rooms.get(_game.room).add_game(_game_id, _game)
+
+# With GAME_TRANSCRIPTS set to a file, every finished game is appended to it
+# as a transcript that replay.py can re-run against new rules.
+app.transcripts = None
+if os.environ.get('GAME_TRANSCRIPTS'):
+    app.transcripts = TranscriptWriter(os.environ['GAME_TRANSCRIPTS'])
+
+# The fact search index is mapped from disk, or built, once at startup and
+# rebuilt when the content changes.
+search.store.current()
+
+app.metrics_enabled = os.environ.get('GAME_METRICS', '1') != '0'
+app.metrics = metrics.Registry()
+REQUEST_SECONDS = app.metrics.histogram('game_request_seconds', 'Request time by route.', ('route',))
+PHASE_SECONDS = app.metrics.histogram(
+    'game_phase_seconds', 'Time spent loading/saving state, in game logic and rendering.', ('phase',))
+REQUESTS = app.metrics.counter('game_requests_total', 'Requests by route and status code.', ('route', 'status'))
+STORE_LOOKUPS = app.metrics.counter('game_store_lookups_total', 'Session store lookups by result.', ('result',))
+app.metrics.gauge('game_live_sessions', 'Games held by the session store.', lambda: len(app.store))
+app.metrics.gauge('game_live_streams', 'Open live update streams.', lambda: len(app.live))
+
+def observe_phase(phase, start):
+    if app.metrics_enabled:
+        PHASE_SECONDS.observe(perf_counter() - start, phase)
+
+def get_game(game_id):
+    """Fetch a game from the store, or the state cookie in stateless mode, recording the lookup."""
+    start = perf_counter()
+    if app.cookie_state is not None:
+        game = load_cookie_game(game_id)[1]
+    else:
+        game = app.store.get(game_id)
+        if game is None and app.previous_ring is not None:
+            game = pull_game(game_id)
+        if game is not None:
+            game.follow_content()
+    observe_lookup(start, game)
+    return game
+
+def observe_lookup(start, game):
+    """Record a game lookup that started at `start` and found `game`, or None."""
+    if app.metrics_enabled:
+        PHASE_SECONDS.observe(perf_counter() - start, 'state_load')
+        STORE_LOOKUPS.inc('miss' if game is None else 'hit')
+
+def create_game(player_name, room=None):
+    """Return (game_id, game) for a new game, under an ID this node owns."""
+    game = SustainabilityGame()
+    game.player_name = player_name
+    game.room = room
+    return new_owned_game_id(), game
+
+def new_owned_game_id():
+    """A new game ID; in a cluster, one that hashes to this node."""
+    game_id = new_game_id()
+    if app.ring is not None and app.node in app.ring:
+        while app.ring.node_for(game_id) != app.node:
+            game_id = new_game_id()
+    return game_id
+
+def pull_game(game_id):
+    """Take a game this node now owns from its owner before the last membership change."""
+    from router import call_node
+
+    previous = app.previous_ring
+    if previous is None:
+        return None
+    owner = previous.node_for(game_id)
+    if owner is None or owner == app.node or app.ring.node_for(game_id) != app.node:
+        return None
+    try:
+        status, data = call_node(owner, f'/internal/games/{game_id}', app.cluster_token)
+    except OSError:
+        return None
+    if status != 200:
+        return None
+    for _, game in decode_games(data):
+        app.store.save(game_id, game)
+        return game
+    return None
+
+def load_cookie_game(game_id=None):
+    """Return (game_id, game) from this request's state cookie, remembering its sequence number."""
+    loaded = app.cookie_state.loads(request.cookies.get(STATE_COOKIE), game_id)
+    if loaded is None:
+        return None, None
+    game_id, game, g.state_sequence = loaded
+    return game_id, game
+
+def save_game(game_id, game, moves=()):
+    """Store a game and append the (kind, arg) moves that produced it to the event log."""
+    start = perf_counter()
+    if app.cookie_state is not None:
+        g.state_cookie = app.cookie_state.dumps(game_id, game, g.get('state_sequence', 0) + 1)
+    else:
+        app.store.save(game_id, game)
+    record_moves(game_id, game, moves)
+    observe_phase('state_save', start)
+
+def record_moves(game_id, game, moves):
+    """Log saved moves, add them to the game's room, push the new state to live pages
+    and rank and record games they finish.
+
+    Never waits for fsync. Finished games accept no more moves or tips, so
+    a game reaches the leaderboard and the transcript file exactly once, and
+    is then left out of event log snapshots.
+    """
+    if app.event_log is not None:
+        for kind, arg in moves:
+            app.event_log.append(game_id, kind, arg, game)
+    if game.room:
+        app.rooms.record(game_id, game, moves, content_store.current().rules)
+    app.live.publish_state(game_id, game)
+    if moves and game.is_over():
+        app.leaderboard.record(game)
+        # Games from state cookies carry no move history to transcribe.
+        if app.transcripts is not None and app.cookie_state is None:
+            app.transcripts.write(game)
+        if app.event_log is not None:
+            app.event_log.forget(game_id)
+
+def load_game():
+    """Return the (game_id, game) pair for this player's session, if any."""
+    if app.cookie_state is not None:
+        start = perf_counter()
+        game_id, game = load_cookie_game()
+        observe_phase('state_load', start)
+        return game_id, game
+    game_id = session.get('game_id')
+    if not game_id:
+        return None, None
+    return game_id, get_game(game_id)
+
+def play(game, kind, arg=None):
+    """Apply a move to a game, timing it as game logic."""
+    start = perf_counter()
+    result = game.apply_move(kind, arg)
+    observe_phase('logic', start)
+    return result
+
+def render(template, **context):
+    start = perf_counter()
+    html = render_template(template, **context)
+    observe_phase('render', start)
+    return html
+
+@app.before_request
+def before_request():
+    g.request_start = perf_counter()
+    content_store.store.maybe_reload()
+
+@app.after_request
+def after_request(response):
+    if 'state_cookie' in g:
+        response.set_cookie(STATE_COOKIE, g.state_cookie, max_age=app.cookie_state.max_age,
+                            httponly=True, samesite='Lax')
+    if app.metrics_enabled and request.url_rule is not None:
+        route = request.url_rule.rule
+        REQUEST_SECONDS.observe(perf_counter() - g.request_start, route)
+        REQUESTS.inc(route, response.status_code)
+    return response
+
+@app.route('/static/<path:filename>')
+def static_file(filename):
+    status, headers, body = app.assets.response(filename, request.args.get('v'))
+    return body, status, headers
+
+@app.route('/metrics')
+def metrics_view():
+    return app.metrics.render(), 200, {'Content-Type': metrics.CONTENT_TYPE}
+
+def player_state(game):
+    """Return the player-facing view of a game, as shown on the game page."""
+    location = game.locations[game.current_location]
+    return {
+        "name": game.player_name,
+        "eco_points": game.eco_points,
+        "energy": game.energy,
+        "day": game.days,
+        "sustainability": round(game.sustainability_level),
+        "location": game.current_location,
+        "description": location['description'],
+        "actions": list(location['actions']),
+        "location_fact": game.location_fact(),
+        "room": game.room,
+        "achievements": [achievement.name for achievement in earned_achievements(game)],
+        "game_over": game.is_over()
+    }
+
+def earned_achievements(game):
+    return achievements.engine_for(content_store.current().rules).earned(game.progress)
+
+ROOM_ERROR = "room must be 1 to 32 letters, digits, '-' or '_'"
+MAX_NAME_LENGTH = 40
+NAME_ERROR = f"player_name must be at most {MAX_NAME_LENGTH} characters"
+
+def valid_player_name(name):
+    return isinstance(name, str) and 0 < len(name) <= MAX_NAME_LENGTH
+
+def room_state(game):
+    """The shared city state of a game's room, or None outside a room."""
+    return app.rooms.get(game.room).state() if game.room else None
 
 @app.route('/')
 def home():
-    return render_template('index.html')
+    return render('index.html')
 
 @app.route('/start', methods=['POST'])
 def start_game():
     player_name = request.form.get('player_name')
-    if not player_name:
+    room = request.form.get('room') or None
+    if not valid_player_name(player_name) or (room is not None and not valid_room_name(room)):
         return redirect(url_for('home'))
 
-    app.game = SustainabilityGame()  
-    app.game.player_name = player_name
-    
+    game_id, game = create_game(player_name, room)
+    save_game(game_id, game, [('start', None)])
+    if app.cookie_state is None:
+        session['game_id'] = game_id
+
     return redirect(url_for('game_view'))
 
 @app.route('/game')
 def game_view():
-    if not hasattr(app, 'game') or app.game.energy <= 0 or app.game.days > 7:
+    game_id, game = load_game()
+    if game is None:
+        return redirect(url_for('home'))
+    if game.is_over():
         return redirect(url_for('game_over'))
 
-    player = {
-        "name": app.game.player_name,
-        "eco_points": app.game.eco_points,
-        "energy": app.game.energy,
-        "day": app.game.days,
-        "sustainability": round(app.game.sustainability_level),
-        "location": app.game.current_location
-    }
-    location = app.game.locations[app.game.current_location]
-    return render_template(
+    return render(
         'game.html',
-        player=player,
-        location=location,
-        actions=location['actions'],
-        tip=session.pop('sustainability_tip', None),
-        game={"locations": app.game.locations}  
+        game_id=game_id,
+        player=player_state(game),
+        city=room_state(game),
+        location_fragment=app.fragments.location(game.current_location),
+        tip=session.pop('sustainability_tip', None)
     )
 
 @app.route('/action/<action>')
 def perform_action(action):
-    result = app.game.perform_action(action)
-    if "error" in result:
-        return redirect(url_for('game_view'))
+    game_id, game = load_game()
+    if game is None:
+        return redirect(url_for('home'))
+    if game.is_over():
+        return redirect(url_for('game_over'))
+    result = play(game, 'action', action)
+    if "error" not in result:
+        save_game(game_id, game, [('action', action)])
     return redirect(url_for('game_view'))
 
 @app.route('/change_location/<location>')
 def change_location(location):
-    if location in app.game.locations:
-        app.game.current_location = location
-        app.game.energy -= 5  
+    game_id, game = load_game()
+    if game is None:
+        return redirect(url_for('home'))
+    if game.is_over():
+        return redirect(url_for('game_over'))
+    result = play(game, 'travel', location)
+    if "error" not in result:
+        save_game(game_id, game, [('travel', location)])
     return redirect(url_for('game_view'))
 
 @app.route('/end_day')
 def end_day():
-    app.game.end_day()
+    game_id, game = load_game()
+    if game is None:
+        return redirect(url_for('home'))
+    if game.is_over():
+        return redirect(url_for('game_over'))
+    play(game, 'end_day')
+    save_game(game_id, game, [('end_day', None)])
     return redirect(url_for('game_view'))
 
 @app.route('/random_tip')
 def random_tip():
-    session['sustainability_tip'] = app.game.get_random_tip()
+    game_id, game = load_game()
+    if game is None:
+        return redirect(url_for('home'))
+    if game.is_over():
+        return redirect(url_for('game_over'))
+    session['sustainability_tip'] = draw_tip(game_id, game)
     return redirect(url_for('game_view'))
 
+def draw_tip(game_id, game):
+    """Draw the player's next tip, save the game and push the tip to live pages."""
+    tip = game.get_random_tip()
+    save_game(game_id, game, [('tip', None)])
+    app.live.publish(game_id, 'tip', {"tip": tip})
+    return tip
+
 @app.route('/game_over')
 def game_over():
-    reason = "You ran out of energy!" if app.game.energy <= 0 else "You completed 7 days!"
-    suggestions = "Try to balance your energy and eco points better next time!" if app.game.energy <= 0 else "Great job! Aim for a higher sustainability level next time!"
-    return render_template(
-        'game_over.html',
-        stats={
-            "name": app.game.player_name,
-            "days": app.game.days,
-            "eco_points": app.game.eco_points,
-            "sustainability": round(app.game.sustainability_level),
-            "reason": reason,
-            "suggestions": suggestions
-        }
-    )
+    game_id, game = load_game()
+    if game is None:
+        return redirect(url_for('home'))
+    return render('game_over.html', stats=game_over_stats(game))
+
+@app.route('/facts')
+def facts_view():
+    status, payload = fact_search(request.args.get('q', ''), request.args.get('location'),
+                                  request.args.get('limit', 10, type=int))
+    return jsonify(payload), status
+
+def fact_search(query, location=None, limit=10):
+    """(status, payload) for a search of the facts and tips, optionally at one location."""
+    if not query.strip():
+        return 400, {"error": "q is required"}
+    if location is not None and location not in content_store.current().locations:
+        return 400, {"error": "Unknown location"}
+    limit = max(1, min(limit, search.MAX_LIMIT))
+    return 200, {"query": query, "location": location,
+                 "results": search.store.current().results(query, location, limit)}
+
+@app.route('/leaderboard')
+def leaderboard_view():
+    return render('leaderboard.html', **leaderboard_data())
+
+@app.route('/api/v1/leaderboard')
+def api_leaderboard():
+    return jsonify(leaderboard_data(request.args.get('limit', 10, type=int)))
+
+def leaderboard_data(limit=10):
+    """The top games and score percentiles for each leaderboard metric."""
+    limit = max(1, min(limit, app.leaderboard.size))
+    return {
+        "games": len(app.leaderboard),
+        "boards": {metric: {"top": app.leaderboard.top(metric, limit),
+                            "percentiles": app.leaderboard.percentiles(metric)}
+                   for metric in METRICS},
+    }
+
+def game_over_stats(game):
+    """Return the summary shown on the game over page."""
+    reason = "You ran out of energy!" if game.energy <= 0 else "You completed 7 days!"
+    suggestions = "Try to balance your energy and eco points better next time!" if game.energy <= 0 else "Great job! Aim for a higher sustainability level next time!"
+    return {
+        "name": game.player_name,
+        "days": game.days,
+        "eco_points": game.eco_points,
+        "sustainability": round(game.sustainability_level),
+        "reason": reason,
+        "suggestions": suggestions,
+        "achievements": earned_achievements(game),
+        "rank": app.leaderboard.rank(game) if game.is_over() else None
+    }
+
+def parse_move(move):
+    """Turn a JSON move object into a (kind, arg) pair for SustainabilityGame.apply_move."""
+    if not isinstance(move, dict):
+        return None
+    kind = move.get('type')
+    if kind == 'action':
+        return kind, move.get('action')
+    if kind == 'travel':
+        return kind, move.get('location')
+    if kind == 'end_day':
+        return kind, None
+    return None
+
+@app.route('/api/v1/games', methods=['POST'])
+def api_create_game():
+    data = request.get_json(silent=True) or {}
+    player_name = data.get('player_name')
+    if not player_name:
+        return jsonify({"error": "player_name is required"}), 400
+    if not valid_player_name(player_name):
+        return jsonify({"error": NAME_ERROR}), 400
+    room = data.get('room')
+    if room is not None and not valid_room_name(room):
+        return jsonify({"error": ROOM_ERROR}), 400
+
+    game_id, game = create_game(player_name, room)
+    save_game(game_id, game, [('start', None)])
+    return jsonify({"game_id": game_id, "state": player_state(game)}), 201
+
+@app.route('/api/v1/rooms/<room>')
+def api_room_state(room):
+    found = app.rooms.get(room, create=False)
+    if found is None:
+        return jsonify({"error": "Unknown room"}), 404
+    return jsonify(found.state())
+
+@app.route('/api/v1/games/<game_id>')
+def api_game_state(game_id):
+    game = get_game(game_id)
+    if game is None:
+        return jsonify({"error": "Unknown game"}), 404
+    return jsonify({"game_id": game_id, "state": player_state(game)})
+
+@app.route('/api/v1/games/<game_id>/actions', methods=['POST'])
+def api_apply_moves(game_id):
+    """Apply one move, or a batch under "moves", and return the new state.
+
+    A batch is applied atomically: if any move is invalid, none are kept.
+    """
+    game = get_game(game_id)
+    if game is None:
+        return jsonify({"error": "Unknown game"}), 404
+    try:
+        updated, applied, results = apply_moves(game, request.get_json(silent=True))
+    except MoveError as exc:
+        return jsonify(exc.payload), exc.status
+
+    save_game(game_id, updated, applied)
+    return jsonify({"game_id": game_id, "results": results, "state": player_state(updated)})
+
+@app.route('/api/v1/games/<game_id>/tips', methods=['POST'])
+def api_draw_tip(game_id):
+    game = get_game(game_id)
+    if game is None:
+        return jsonify({"error": "Unknown game"}), 404
+    if game.is_over():
+        return jsonify({"error": "Game is over"}), 409
+    return jsonify({"tip": draw_tip(game_id, game)})
+
+@app.route('/api/v1/games/<game_id>/events')
+def api_game_events(game_id):
+    """Stream state changes and tips for a game as Server-Sent Events.
+
+    Each open stream holds a worker thread here, so the route answers 404
+    unless app.flask_events is set; asgi.py serves the same stream from
+    its event loop.
+    """
+    if not app.flask_events:
+        return jsonify({"error": "Event streams are served by the ASGI front end"}), 404
+    game = get_game(game_id)
+    if game is None:
+        return jsonify({"error": "Unknown game"}), 404
+    messages = queue.Queue()
+    unsubscribe = app.live.subscribe(game_id, game, messages.put)
+
+    def stream():
+        try:
+            while True:
+                try:
+                    yield messages.get(timeout=live.KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield live.KEEPALIVE
+        finally:
+            unsubscribe()
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+def from_cluster(token):
+    """True if this node is in a cluster and a request's X-Cluster-Token is its token."""
+    return app.ring is not None and hmac.compare_digest(token or '', app.cluster_token)
+
+def set_ring(nodes):
+    """Switch to a new set of cluster nodes, keeping the old ring to pull games from.
+
+    Returns (status, payload).
+    """
+    if not isinstance(nodes, list) or not nodes:
+        return 400, {"error": "nodes must be a non-empty list"}
+    app.previous_ring, app.ring = app.ring, app.ring.with_nodes(nodes)
+    return 200, {"nodes": list(app.ring.nodes)}
+
+def hand_off_games():
+    """Send every stored game this node no longer owns to its owner, in batches.
+
+    Returns (moved, left): how many games moved, and how many stayed because
+    their owner could not be reached; those can still be pulled from here.
+    """
+    from router import call_node
+
+    batches = {}
+    for game_id in app.store.game_ids():
+        owner = app.ring.node_for(game_id)
+        game = app.store.get(game_id) if owner != app.node else None
+        if game is not None:
+            batches.setdefault(owner, []).append((game_id, game))
+    moved = left = 0
+    for owner, games in batches.items():
+        for start in range(0, len(games), HANDOFF_BATCH):
+            batch = games[start:start + HANDOFF_BATCH]
+            try:
+                status, _ = call_node(owner, '/internal/games', app.cluster_token, encode_games(batch),
+                                      'application/octet-stream')
+            except OSError:
+                status = None
+            if status != 200:
+                left += len(batch)
+                continue
+            for game_id, _ in batch:
+                app.store.delete(game_id)
+            moved += len(batch)
+    return moved, left
+
+def end_handoff():
+    """Drop the previous ring once every node has handed off its games, so misses stop asking it."""
+    app.previous_ring = None
+
+def receive_games(data):
+    """Store games handed off by another node, unless this node already pulled a newer copy.
+
+    Returns how many were stored.
+    """
+    received = 0
+    for game_id, game in decode_games(data):
+        if app.store.get(game_id) is None:
+            app.store.save(game_id, game)
+            received += 1
+    return received
+
+def give_game(game_id):
+    """Remove one game from this node and return it encoded for its new owner, or None."""
+    game = app.store.get(game_id)
+    if game is None:
+        return None
+    app.store.delete(game_id)
+    return encode_games([(game_id, game)])
+
+@app.route('/internal/ring', methods=['POST'])
+def internal_ring():
+    if not from_cluster(request.headers.get('X-Cluster-Token')):
+        return jsonify({"error": "Forbidden"}), 403
+    status, payload = set_ring((request.get_json(silent=True) or {}).get('nodes'))
+    return jsonify(payload), status
+
+@app.route('/internal/handoff', methods=['POST'])
+def internal_handoff():
+    if not from_cluster(request.headers.get('X-Cluster-Token')):
+        return jsonify({"error": "Forbidden"}), 403
+    moved, left = hand_off_games()
+    return jsonify({"moved": moved, "left": left})
+
+@app.route('/internal/handoff/done', methods=['POST'])
+def internal_handoff_done():
+    if not from_cluster(request.headers.get('X-Cluster-Token')):
+        return jsonify({"error": "Forbidden"}), 403
+    end_handoff()
+    return jsonify({})
+
+@app.route('/internal/games', methods=['POST'])
+def internal_receive_games():
+    if not from_cluster(request.headers.get('X-Cluster-Token')):
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify({"received": receive_games(request.get_data())})
+
+@app.route('/internal/games/<game_id>')
+def internal_give_game(game_id):
+    if not from_cluster(request.headers.get('X-Cluster-Token')):
+        return jsonify({"error": "Forbidden"}), 403
+    data = give_game(game_id)
+    if data is None:
+        return jsonify({"error": "Unknown game"}), 404
+    return data, 200, {'Content-Type': 'application/octet-stream'}
+
+class MoveError(Exception):
+    """A rejected move request, with the HTTP status and JSON payload to return."""
+
+    def __init__(self, status, payload):
+        super().__init__(payload["error"])
+        self.status = status
+        self.payload = payload
+
+def apply_moves(game, data):
+    """Apply a JSON move, or a batch under "moves", to a copy of `game`.
+
+    Returns (updated_game, applied_moves, results); raises MoveError without
+    touching `game` if any move is rejected.
+    """
+    moves = data.get('moves') if isinstance(data, dict) and 'moves' in data else [data]
+    if not isinstance(moves, list) or not moves:
+        raise MoveError(400, {"error": "Expected a move or a non-empty list of moves"})
+
+    updated = copy.copy(game)
+    applied = []
+    results = []
+    for index, move in enumerate(moves):
+        if updated.is_over():
+            raise MoveError(409, {"error": "Game is over", "index": index})
+        parsed = parse_move(move)
+        result = play(updated, *parsed) if parsed else {"error": "Invalid move"}
+        if "error" in result:
+            raise MoveError(400, {"error": result["error"], "index": index})
+        applied.append(parsed)
+        results.append(result)
+    return updated, applied, results
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
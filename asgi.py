@@ -0,0 +1,602 @@
+#!/usr/bin/env python3
+
+"""
+ASGI front end serving the same pages and JSON API as app.py on an asyncio
+event loop, so an idle or slow connection costs a coroutine rather than a
+worker thread.
+
+Run it under any ASGI server, or the small HTTP/1.1 server built in here:
+
+    uvicorn asgi:application
+    python asgi.py --port 8000
+
+Game rules, templates, the game store, the event log, metrics, the
+session and state cookie formats, and game creation, lookup and cluster
+handoff are all shared with app.py, so the two front ends can be swapped
+without players noticing, or mixed in one cluster. Store access goes
+through session_store.AsyncSessionStore, and calls to other nodes run in
+threads, which keeps blocking work off the loop.
+"""
+
+import argparse
+import asyncio
+import json
+import re
+from http import HTTPStatus
+from time import perf_counter
+from urllib.parse import parse_qs, unquote
+
+from werkzeug.http import dump_cookie, parse_cookie
+
+import content_store
+import http_cache
+import live
+import metrics
+from app import (NAME_ERROR, REQUEST_SECONDS, REQUESTS, ROOM_ERROR, MoveError, apply_moves, create_game,
+                 end_handoff, fact_search, from_cluster, game_over_stats, give_game, hand_off_games,
+                 leaderboard_data, observe_lookup, play, player_state, pull_game, receive_games, record_moves,
+                 room_state, set_ring, valid_player_name)
+from app import app as flask_app
+from cookie_state import COOKIE_NAME as STATE_COOKIE
+from rooms import valid_room_name
+from session_store import AsyncSessionStore
+
+store = AsyncSessionStore(flask_app.store)
+
+_serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+_cookie_name = flask_app.config["SESSION_COOKIE_NAME"]
+_session_max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+
+
+class Request:
+    """The parts of an HTTP request the game routes need, plus the player's session."""
+
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query = scope.get("query_string", b"").decode("latin-1")
+        self.headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        self.body = body
+        self.session = {}
+        cookies = parse_cookie(self.headers.get("cookie", ""))
+        # Stateless mode: the game's state cookie, and the sequence number and new value of it.
+        self.state = cookies.get(STATE_COOKIE)
+        self.state_sequence = 0
+        self.new_state = None
+        cookie = cookies.get(_cookie_name)
+        if cookie:
+            try:
+                self.session = dict(_serializer.loads(cookie, max_age=_session_max_age))
+            except Exception:
+                # Tampered or expired cookies start a fresh session, as in Flask.
+                pass
+        self._original_session = dict(self.session)
+
+    def form(self):
+        return {name: values[0] for name, values in parse_qs(self.body.decode()).items()}
+
+    def json(self):
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return None
+
+    def session_cookie(self):
+        """Return a Set-Cookie header value if the session changed, else None."""
+        if self.session == self._original_session:
+            return None
+        if not self.session:
+            return dump_cookie(_cookie_name, "", max_age=0, path="/", httponly=True)
+        return dump_cookie(_cookie_name, _serializer.dumps(self.session), path="/", httponly=True)
+
+    def state_cookie(self):
+        """Return a Set-Cookie header value if a game was saved in stateless mode, else None."""
+        if self.new_state is None:
+            return None
+        return dump_cookie(STATE_COOKIE, self.new_state, max_age=flask_app.cookie_state.max_age,
+                           path="/", httponly=True, samesite="Lax")
+
+
+def html(body, status=200):
+    return status, [("content-type", "text/html; charset=utf-8")], body.encode()
+
+
+def json_response(payload, status=200):
+    return status, [("content-type", "application/json")], json.dumps(payload).encode()
+
+
+def redirect(location):
+    return 302, [("location", location), ("content-type", "text/html; charset=utf-8")], b""
+
+
+def render(template, **context):
+    return html(flask_app.jinja_env.get_template(template).render(**context))
+
+
+def load_cookie_game(request, game_id=None):
+    loaded = flask_app.cookie_state.loads(request.state, game_id)
+    if loaded is None:
+        return None, None
+    game_id, game, request.state_sequence = loaded
+    return game_id, game
+
+
+async def get_game(request, game_id):
+    start = perf_counter()
+    if flask_app.cookie_state is not None:
+        game = load_cookie_game(request, game_id)[1]
+    else:
+        game = await store.get(game_id)
+        if game is None and flask_app.previous_ring is not None:
+            game = await asyncio.to_thread(pull_game, game_id)
+        if game is not None:
+            game.follow_content()
+    observe_lookup(start, game)
+    return game
+
+
+async def load_game(request):
+    if flask_app.cookie_state is not None:
+        start = perf_counter()
+        game_id, game = load_cookie_game(request)
+        observe_lookup(start, game)
+        return game_id, game
+    game_id = request.session.get("game_id")
+    if not game_id:
+        return None, None
+    return game_id, await get_game(request, game_id)
+
+
+async def save_game(request, game_id, game, moves=()):
+    if flask_app.cookie_state is not None:
+        request.new_state = flask_app.cookie_state.dumps(game_id, game, request.state_sequence + 1)
+    else:
+        await store.save(game_id, game)
+    record_moves(game_id, game, moves)
+
+
+async def draw_tip(request, game_id, game):
+    tip = game.get_random_tip()
+    await save_game(request, game_id, game, [("tip", None)])
+    flask_app.live.publish(game_id, "tip", {"tip": tip})
+    return tip
+
+
+# Routes
+
+async def home(request):
+    return render("index.html")
+
+
+async def start_game(request):
+    form = request.form()
+    player_name = form.get("player_name")
+    room = form.get("room") or None
+    if not valid_player_name(player_name) or (room is not None and not valid_room_name(room)):
+        return redirect("/")
+    game_id, game = create_game(player_name, room)
+    await save_game(request, game_id, game, [("start", None)])
+    if flask_app.cookie_state is None:
+        request.session["game_id"] = game_id
+    return redirect("/game")
+
+
+async def game_view(request):
+    game_id, game = await load_game(request)
+    if game is None:
+        return redirect("/")
+    if game.is_over():
+        return redirect("/game_over")
+    return render(
+        "game.html",
+        game_id=game_id,
+        player=player_state(game),
+        city=room_state(game),
+        location_fragment=flask_app.fragments.location(game.current_location),
+        tip=request.session.pop("sustainability_tip", None),
+    )
+
+
+async def _move(request, kind, arg=None):
+    game_id, game = await load_game(request)
+    if game is None:
+        return redirect("/")
+    if game.is_over():
+        return redirect("/game_over")
+    result = play(game, kind, arg)
+    if "error" not in result:
+        await save_game(request, game_id, game, [(kind, arg)])
+    return redirect("/game")
+
+
+async def perform_action(request, action):
+    return await _move(request, "action", action)
+
+
+async def change_location(request, location):
+    return await _move(request, "travel", location)
+
+
+async def end_day(request):
+    return await _move(request, "end_day")
+
+
+async def random_tip(request):
+    game_id, game = await load_game(request)
+    if game is None:
+        return redirect("/")
+    if game.is_over():
+        return redirect("/game_over")
+    request.session["sustainability_tip"] = await draw_tip(request, game_id, game)
+    return redirect("/game")
+
+
+async def game_over(request):
+    _, game = await load_game(request)
+    if game is None:
+        return redirect("/")
+    return render("game_over.html", stats=game_over_stats(game))
+
+
+async def facts_view(request):
+    query = parse_qs(request.query)
+    try:
+        limit = int(query.get("limit", ["10"])[0])
+    except ValueError:
+        limit = 10
+    status, payload = fact_search(query.get("q", [""])[0], query.get("location", [None])[0], limit)
+    return json_response(payload, status)
+
+
+async def leaderboard_view(request):
+    return render("leaderboard.html", **leaderboard_data())
+
+
+async def api_leaderboard(request):
+    try:
+        limit = int(parse_qs(request.query).get("limit", ["10"])[0])
+    except ValueError:
+        limit = 10
+    return json_response(leaderboard_data(limit))
+
+
+async def metrics_view(request):
+    return 200, [("content-type", metrics.CONTENT_TYPE)], flask_app.metrics.render().encode()
+
+
+async def api_create_game(request):
+    data = request.json()
+    player_name = data.get("player_name") if isinstance(data, dict) else None
+    if not player_name:
+        return json_response({"error": "player_name is required"}, 400)
+    if not valid_player_name(player_name):
+        return json_response({"error": NAME_ERROR}, 400)
+    room = data.get("room")
+    if room is not None and not valid_room_name(room):
+        return json_response({"error": ROOM_ERROR}, 400)
+    game_id, game = create_game(player_name, room)
+    await save_game(request, game_id, game, [("start", None)])
+    return json_response({"game_id": game_id, "state": player_state(game)}, 201)
+
+
+async def api_room_state(request, room):
+    found = flask_app.rooms.get(room, create=False)
+    if found is None:
+        return json_response({"error": "Unknown room"}, 404)
+    return json_response(found.state())
+
+
+async def api_game_state(request, game_id):
+    game = await get_game(request, game_id)
+    if game is None:
+        return json_response({"error": "Unknown game"}, 404)
+    return json_response({"game_id": game_id, "state": player_state(game)})
+
+
+async def api_apply_moves(request, game_id):
+    game = await get_game(request, game_id)
+    if game is None:
+        return json_response({"error": "Unknown game"}, 404)
+    try:
+        updated, applied, results = apply_moves(game, request.json())
+    except MoveError as exc:
+        return json_response(exc.payload, exc.status)
+    await save_game(request, game_id, updated, applied)
+    return json_response({"game_id": game_id, "results": results, "state": player_state(updated)})
+
+
+async def api_draw_tip(request, game_id):
+    game = await get_game(request, game_id)
+    if game is None:
+        return json_response({"error": "Unknown game"}, 404)
+    if game.is_over():
+        return json_response({"error": "Game is over"}, 409)
+    return json_response({"tip": await draw_tip(request, game_id, game)})
+
+
+async def api_game_events(request, game_id):
+    """Stream state changes and tips as Server-Sent Events, one coroutine per stream."""
+    game = await get_game(request, game_id)
+    if game is None:
+        return json_response({"error": "Unknown game"}, 404)
+    loop = asyncio.get_running_loop()
+    messages = asyncio.Queue()
+    # Moves made through Flask threads publish too, so hop onto the loop.
+    unsubscribe = flask_app.live.subscribe(
+        game_id, game, lambda message: loop.call_soon_threadsafe(messages.put_nowait, message))
+
+    async def stream():
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(messages.get(), live.KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield live.KEEPALIVE
+        finally:
+            unsubscribe()
+
+    return 200, [("content-type", "text/event-stream"), ("cache-control", "no-cache")], stream()
+
+
+def forbidden():
+    return json_response({"error": "Forbidden"}, 403)
+
+
+async def internal_ring(request):
+    if not from_cluster(request.headers.get("x-cluster-token")):
+        return forbidden()
+    data = request.json()
+    status, payload = set_ring(data.get("nodes") if isinstance(data, dict) else None)
+    return json_response(payload, status)
+
+
+async def internal_handoff(request):
+    if not from_cluster(request.headers.get("x-cluster-token")):
+        return forbidden()
+    moved, left = await asyncio.to_thread(hand_off_games)
+    return json_response({"moved": moved, "left": left})
+
+
+async def internal_handoff_done(request):
+    if not from_cluster(request.headers.get("x-cluster-token")):
+        return forbidden()
+    end_handoff()
+    return json_response({})
+
+
+async def internal_receive_games(request):
+    if not from_cluster(request.headers.get("x-cluster-token")):
+        return forbidden()
+    return json_response({"received": await asyncio.to_thread(receive_games, request.body)})
+
+
+async def internal_give_game(request, game_id):
+    if not from_cluster(request.headers.get("x-cluster-token")):
+        return forbidden()
+    data = await asyncio.to_thread(give_game, game_id)
+    if data is None:
+        return json_response({"error": "Unknown game"}, 404)
+    return 200, [("content-type", "application/octet-stream")], data
+
+
+async def static_file(request, filename):
+    version = parse_qs(request.query).get("v", [None])[0]
+    return flask_app.assets.response(filename, version)
+
+
+def _compile(rule):
+    """Turn a Flask-style rule such as /action/<action> into a regex."""
+    def group(match):
+        return f"(?P<{match.group(2)}>{'.+' if match.group(1) else '[^/]+'})"
+    return re.compile(re.sub(r"<(path:)?(\w+)>", group, rule) + "$")
+
+
+# Same rules as app.py, so metrics from both front ends line up.
+ROUTES = [(rule, methods, _compile(rule), handler) for rule, methods, handler in [
+    ("/", ("GET",), home),
+    ("/start", ("POST",), start_game),
+    ("/game", ("GET",), game_view),
+    ("/action/<action>", ("GET",), perform_action),
+    ("/change_location/<location>", ("GET",), change_location),
+    ("/end_day", ("GET",), end_day),
+    ("/random_tip", ("GET",), random_tip),
+    ("/game_over", ("GET",), game_over),
+    ("/facts", ("GET",), facts_view),
+    ("/leaderboard", ("GET",), leaderboard_view),
+    ("/metrics", ("GET",), metrics_view),
+    ("/api/v1/leaderboard", ("GET",), api_leaderboard),
+    ("/api/v1/rooms/<room>", ("GET",), api_room_state),
+    ("/api/v1/games", ("POST",), api_create_game),
+    ("/api/v1/games/<game_id>", ("GET",), api_game_state),
+    ("/api/v1/games/<game_id>/actions", ("POST",), api_apply_moves),
+    ("/api/v1/games/<game_id>/tips", ("POST",), api_draw_tip),
+    ("/api/v1/games/<game_id>/events", ("GET",), api_game_events),
+    ("/internal/ring", ("POST",), internal_ring),
+    ("/internal/handoff", ("POST",), internal_handoff),
+    ("/internal/handoff/done", ("POST",), internal_handoff_done),
+    ("/internal/games", ("POST",), internal_receive_games),
+    ("/internal/games/<game_id>", ("GET",), internal_give_game),
+    ("/static/<path:filename>", ("GET",), static_file),
+]]
+
+
+async def dispatch(request):
+    """Return (rule, (status, headers, body)) for a request."""
+    allowed = False
+    for rule, methods, pattern, handler in ROUTES:
+        match = pattern.match(request.path)
+        if match is None:
+            continue
+        if request.method not in methods and not (request.method == "HEAD" and "GET" in methods):
+            allowed = True
+            continue
+        return rule, await handler(request, **match.groupdict())
+    if allowed:
+        return None, (405, [("content-type", "text/plain")], b"Method Not Allowed")
+    return None, (404, [("content-type", "text/plain")], b"Not Found")
+
+
+async def application(scope, receive, send):
+    """The ASGI 3 entry point."""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    start = perf_counter()
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+
+    content_store.store.maybe_reload()
+    request = Request(scope, body)
+    rule, (status, headers, payload) = await dispatch(request)
+    if isinstance(payload, bytes):
+        status, headers, payload = http_cache.finish(request.method, status, headers, payload,
+                                                     request.headers.get("accept-encoding"),
+                                                     request.headers.get("if-none-match"))
+    headers = [(name.lower().encode(), value.encode()) for name, value in headers]
+    for cookie in (request.session_cookie(), request.state_cookie()):
+        if cookie:
+            headers.append((b"set-cookie", cookie.encode("latin-1")))
+    if isinstance(payload, bytes):
+        if not any(name == b"content-length" for name, _ in headers):
+            headers.append((b"content-length", str(len(payload)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if request.method == "HEAD" else payload})
+    else:
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await _stream(payload, receive, send)
+
+    if flask_app.metrics_enabled and rule is not None:
+        REQUEST_SECONDS.observe(perf_counter() - start, rule)
+        REQUESTS.inc(rule, status)
+
+
+async def _stream(chunks, receive, send):
+    """Send an async iterator of chunks until it ends or the client disconnects."""
+    async def pump():
+        async for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    pumping = asyncio.ensure_future(pump())
+    disconnected = asyncio.ensure_future(receive())
+    try:
+        await asyncio.wait((pumping, disconnected), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnected.cancel()
+        # Cancelling the pump closes the iterator, which ends its subscription.
+        pumping.cancel()
+        try:
+            await pumping
+        except asyncio.CancelledError:
+            pass
+
+
+# Built-in server
+
+async def _serve_connection(app, reader, writer):
+    """Serve HTTP/1.1 requests with Content-Length bodies on one keep-alive connection.
+
+    Responses without a Content-Length, such as event streams, are written as
+    they are sent and end by closing the connection.
+    """
+    server, client = writer.get_extra_info("sockname"), writer.get_extra_info("peername")
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, version = request_line.split(" ", 2)
+            headers = []
+            for line in header_lines:
+                if line:
+                    name, _, value = line.partition(":")
+                    headers.append((name.strip().lower().encode("latin-1"), value.strip().encode("latin-1")))
+            header_map = dict(headers)
+            body = await reader.readexactly(int(header_map.get(b"content-length", b"0")))
+            raw_path, _, query = target.partition("?")
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": version[5:],
+                "method": method, "scheme": "http", "path": unquote(raw_path),
+                "raw_path": raw_path.encode("latin-1"),
+                "query_string": query.encode("latin-1"), "root_path": "", "headers": headers,
+                "server": server[:2] if server else None, "client": client[:2] if client else None,
+            }
+            pending = [{"type": "http.request", "body": body, "more_body": False}]
+            keep_alive = header_map.get(b"connection", b"").lower() != b"close" and version == "HTTP/1.1"
+            response = {}
+
+            async def receive():
+                if pending:
+                    return pending.pop()
+                # Only streaming responses wait here, to learn when the client goes away.
+                await reader.read()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    response["start"] = message
+                    return
+                chunk = message.get("body", b"")
+                if "sent" not in response:
+                    start = response["sent"] = response["start"]
+                    lines = [f"HTTP/1.1 {start['status']} {HTTPStatus(start['status']).phrase}"]
+                    lines += [f"{name.decode('latin-1')}: {value.decode('latin-1')}"
+                              for name, value in start["headers"]]
+                    if not any(name == b"content-length" for name, _ in start["headers"]):
+                        if not message.get("more_body"):
+                            lines.append(f"content-length: {len(chunk)}")
+                        else:
+                            # A stream of unknown length ends when the connection does.
+                            response["close"] = True
+                    if not keep_alive or response.get("close"):
+                        lines.append("connection: close")
+                    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+                writer.write(chunk)
+                await writer.drain()
+
+            await app(scope, receive, send)
+            if not keep_alive or response.get("close"):
+                break
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(app=application, host="127.0.0.1", port=8000, ready=None):
+    """Serve an ASGI app until cancelled; `ready` is called with the bound port."""
+    server = await asyncio.start_server(lambda reader, writer: _serve_connection(app, reader, writer),
+                                        host, port, backlog=4096)
+    if ready is not None:
+        ready(server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Sustainability Game on an asyncio event loop")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(host=args.host, port=args.port,
+                          ready=lambda port: print(f"Serving on http://{args.host}:{port}", flush=True)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+"""
+Vectorized batch engine for replaying many SustainabilityGame runs at once.
+
+Requires NumPy (pip install numpy). N games are held as parallel arrays and
+every step applies one move code per game:
+
+    0 .. A-1        perform ACTION_NAMES[code]
+    A .. A+L-1      travel to LOCATION_NAMES[code - A]
+    A+L             end the day
+    A+L+1           no-op (useful for games that are already over)
+
+The arithmetic mirrors SustainabilityGame.perform_action, change_location
+and end_day exactly, so a batch run and a scalar replay of the same move
+codes end in identical states.
+"""
+
+import numpy as np
+
+from sustainability_game import (
+    DAY_RECOVERY, GAME_DAYS, MAX_ENERGY, MAX_MOVES, RULES, TRAVEL_COST, SustainabilityGame
+)
+
+# Move codes follow the compiled rule table's action and location ids.
+ACTION_NAMES = RULES.action_names
+LOCATION_NAMES = RULES.location_names
+
+TRAVEL_BASE = len(ACTION_NAMES)
+END_DAY = TRAVEL_BASE + len(LOCATION_NAMES)
+NOOP = END_DAY + 1
+MOVE_COUNT = NOOP + 1
+
+# One row per action: eco_points, energy, sustainability.
+IMPACT_MATRIX = np.array([RULES.eco_points, RULES.energy, RULES.sustainability], dtype=np.float64).T
+
+# Per-move-code deltas, so a step is a handful of gathers instead of branches.
+_ECO = np.zeros(MOVE_COUNT, dtype=np.int64)
+_ENERGY = np.zeros(MOVE_COUNT, dtype=np.int64)
+_SUSTAINABILITY = np.zeros(MOVE_COUNT, dtype=np.float64)
+_ECO[:TRAVEL_BASE] = IMPACT_MATRIX[:, 0]
+_ENERGY[:TRAVEL_BASE] = IMPACT_MATRIX[:, 1]
+_SUSTAINABILITY[:TRAVEL_BASE] = IMPACT_MATRIX[:, 2]
+_ENERGY[TRAVEL_BASE:END_DAY] = -TRAVEL_COST
+
+# _NEXT_LOCATION[location * MOVE_COUNT + code] is the location after the move.
+_NEXT_LOCATION = np.repeat(np.arange(len(LOCATION_NAMES))[:, None], MOVE_COUNT, axis=1)
+_NEXT_LOCATION[:, TRAVEL_BASE:END_DAY] = np.arange(len(LOCATION_NAMES))
+_NEXT_LOCATION = _NEXT_LOCATION.ravel()
+
+# LEGAL_MOVES[location, code] is True when the move is offered at that location.
+LEGAL_MOVES = np.zeros((len(LOCATION_NAMES), MOVE_COUNT), dtype=bool)
+for _loc, _action_ids in enumerate(RULES.location_actions):
+    LEGAL_MOVES[_loc, list(_action_ids)] = True
+    LEGAL_MOVES[_loc, TRAVEL_BASE:END_DAY] = True
+    LEGAL_MOVES[_loc, TRAVEL_BASE + _loc] = False
+    LEGAL_MOVES[_loc, END_DAY] = True
+
+# Legal move codes per location, padded to a common width, for O(N) sampling.
+_LEGAL_COUNTS = LEGAL_MOVES.sum(axis=1)
+_LEGAL_CODES = np.zeros((len(LOCATION_NAMES), _LEGAL_COUNTS.max()), dtype=np.int64)
+for _loc in range(len(LOCATION_NAMES)):
+    _codes = np.flatnonzero(LEGAL_MOVES[_loc])
+    _LEGAL_CODES[_loc, :len(_codes)] = _codes
+
+
+class BatchGame:
+    """N independent games stored as parallel NumPy arrays."""
+
+    def __init__(self, n_games):
+        self.eco_points = np.zeros(n_games, dtype=np.int64)
+        self.energy = np.full(n_games, 100, dtype=np.int64)
+        self.sustainability = np.zeros(n_games, dtype=np.float64)
+        self.day = np.ones(n_games, dtype=np.int64)
+        self.location = np.full(n_games, RULES.start_location, dtype=np.int64)
+        self.moves = np.zeros(n_games, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.day)
+
+    def active(self):
+        """Return a mask of games still in play under the web app's rules."""
+        return (self.energy > 0) & (self.day <= GAME_DAYS) & (self.moves < MAX_MOVES)
+
+    def step(self, moves):
+        """Apply one move code to every game."""
+        moves = np.asarray(moves, dtype=np.int64)
+
+        self.eco_points += _ECO[moves]
+        self.energy += _ENERGY[moves]
+        self.sustainability += _SUSTAINABILITY[moves]
+        self.location = _NEXT_LOCATION[self.location * MOVE_COUNT + moves]
+        self.moves += moves != NOOP
+
+        is_end_day = moves == END_DAY
+        self.day += is_end_day
+        np.minimum(self.energy + DAY_RECOVERY, MAX_ENERGY, out=self.energy, where=is_end_day)
+
+    def sample_legal(self, rng):
+        """Draw a uniformly random legal move per game; finished games get NOOP."""
+        choice = (rng.random(len(self)) * _LEGAL_COUNTS[self.location]).astype(np.int64)
+        moves = _LEGAL_CODES[self.location, choice]
+        return np.where(self.active(), moves, NOOP)
+
+    def replay(self, history):
+        """Apply a (steps, n_games) matrix of move codes, one row per step."""
+        for moves in np.asarray(history, dtype=np.int64):
+            self.step(moves)
+
+    def take(self, index):
+        """Return a new BatchGame holding copies of the selected games."""
+        subset = BatchGame(0)
+        for field in self._fields:
+            setattr(subset, field, getattr(self, field)[index])
+        return subset
+
+    def put(self, index, subset):
+        """Write the games of `subset` back into positions `index`."""
+        for field in self._fields:
+            getattr(self, field)[index] = getattr(subset, field)
+
+    _fields = ("eco_points", "energy", "sustainability", "day", "location", "moves")
+
+    def run_random(self, seed, max_steps=200):
+        """Play random legal moves until every game is over; return the move history.
+
+        Finished games are compacted out of the working set as they drop out,
+        so late steps only touch the games still in play.
+        """
+        rng = np.random.default_rng(seed)
+        history = np.full((max_steps, len(self)), NOOP, dtype=np.int8)
+        index = np.arange(len(self))
+        working = self
+        steps = 0
+        while steps < max_steps and len(index):
+            moves = working.sample_legal(rng)
+            working.step(moves)
+            history[steps, index] = moves
+            steps += 1
+            active = working.active()
+            if not active.all():
+                if working is not self:
+                    self.put(index, working)
+                working = working.take(active)
+                index = index[active]
+        if working is not self:
+            self.put(index, working)
+        return history[:steps]
+
+
+def apply_move_code(game, code):
+    """Apply one move code to a scalar SustainabilityGame."""
+    code = int(code)
+    if code < TRAVEL_BASE:
+        game.perform_action(ACTION_NAMES[code])
+    elif code < END_DAY:
+        game.change_location(LOCATION_NAMES[code - TRAVEL_BASE])
+    elif code == END_DAY:
+        game.end_day()
+
+
+def replay_scalar(codes):
+    """Replay a sequence of move codes through a fresh SustainabilityGame."""
+    game = SustainabilityGame()
+    for code in codes:
+        apply_move_code(game, code)
+    return game
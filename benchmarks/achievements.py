@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+"""
+Cost of achievement tracking per move and per game.
+
+Plays the same move sequence with the engine switched off, with an empty
+catalog and with the achievement catalog, and times each move through SustainabilityGame.apply_move
+and a full POST to the JSON API, so the difference is what the engine
+adds. Also reports the progress bytes each game carries.
+
+Run from the repository root:
+    python benchmarks/achievements.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("GAME_METRICS", "0")
+
+import achievements
+import content_store
+from app import app
+from sustainability_game import SustainabilityGame
+
+MOVES = [("travel", "park"), ("action", "plant_trees"), ("action", "water_conservation"), ("travel", "home"),
+         ("action", "rest"), ("action", "rest"), ("end_day", None)]
+API_MOVES = [{"type": kind, "action": arg} if kind == "action" else
+             {"type": kind, "location": arg} if kind == "travel" else {"type": kind} for kind, arg in MOVES]
+
+
+class NoEngine(achievements.Engine):
+    """An engine whose move hooks do nothing."""
+
+    def action(self, game, event_id=None):
+        return []
+
+    travel = end_day = action
+
+
+def per_move(number=20000):
+    def play():
+        game = SustainabilityGame(seed=1)
+        for move in MOVES:
+            game.apply_move(*move)
+    return timeit.timeit(play, number=number) / number / len(MOVES)
+
+
+def per_request(client, number=300):
+    def play():
+        game_id = client.post('/api/v1/games', json={"player_name": "bench"}).get_json()["game_id"]
+        for move in API_MOVES:
+            client.post(f'/api/v1/games/{game_id}/actions', json=move)
+    return timeit.timeit(play, number=number) / number / len(API_MOVES)
+
+
+def main():
+    rules = content_store.current().rules
+    client = app.test_client()
+    print(f"progress: {len(SustainabilityGame().progress)} bytes per game, "
+          f"{len(achievements.CATALOG)} achievements")
+    timings = {}
+    for name, engine in (("engine off", NoEngine(rules, ())), ("empty catalog", achievements.Engine(rules, ())),
+                         ("achievements", achievements.Engine(rules))):
+        achievements._compiled = (rules, engine)
+        timings[name] = (per_move(), per_request(client))
+        print(f"{name:<16}{timings[name][0] * 1e6:>8.2f} us per move{timings[name][1] * 1e6:>10.1f} us per API move")
+    achievements._compiled = (None, None)
+    move_cost = timings["achievements"][0] - timings["engine off"][0]
+    print(f"engine cost: {move_cost * 1e6:.2f} us per move, "
+          f"{move_cost / timings['achievements'][1]:.2%} of an API move")
+
+
+if __name__ == "__main__":
+    main()
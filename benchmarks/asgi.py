@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+"""
+Concurrent-connection capacity of the ASGI front end against the threaded
+WSGI server.
+
+Each server runs in its own process. An asyncio client opens N connections
+at once; every client creates a game through the JSON API and then polls
+its state, reconnecting whenever the server closes the connection (the
+Werkzeug server does after each response). Reports throughput, p95
+latency, failed clients, and the server's thread count and resident memory
+while all N connections are open: the WSGI server needs a thread per
+connection, the ASGI one a coroutine.
+
+Run from the repository root:
+    python benchmarks/asgi.py
+    python benchmarks/asgi.py --connections 100 1000 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    "wsgi": [sys.executable, "-c", (
+        "from werkzeug.serving import make_server, WSGIRequestHandler\n"
+        "from app import app\n"
+        "class Quiet(WSGIRequestHandler):\n"
+        "    def log_request(self, *a, **k): pass\n"
+        "server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=Quiet)\n"
+        "server.socket.listen(4096)\n"
+        "print(server.server_port, flush=True)\n"
+        "server.serve_forever()\n")],
+    "asgi": [sys.executable, "-c", (
+        "import asyncio, asgi\n"
+        "asyncio.run(asgi.serve(port=0, ready=lambda port: print(port, flush=True)))\n")],
+}
+
+
+def _proc_status(pid):
+    fields = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            fields[name] = value.strip()
+    return int(fields["Threads"]), int(fields["VmRSS"].split()[0]) // 1024
+
+
+class _Connection:
+    """A client connection that reconnects when the server closes it after a response."""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+
+    async def request(self, method, path, body=b""):
+        if self.writer is None:
+            await self.open()
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+                          f"Content-Type: application/json\r\n\r\n".encode() + body)
+        head = (await self.reader.readuntil(b"\r\n\r\n")).lower()
+        length = 0
+        for line in head.split(b"\r\n"):
+            if line.startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        payload = await self.reader.readexactly(length)
+        if b"connection: close" in head:
+            self.close()
+        return payload
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def _player(port, polls, latencies, opened, release):
+    connection = _Connection(port)
+    await connection.open()
+    try:
+        opened.append(1)
+        await release.wait()
+        start = time.perf_counter()
+        game_id = json.loads(await connection.request("POST", "/api/v1/games",
+                                                      b'{"player_name": "bench"}'))["game_id"]
+        latencies.append(time.perf_counter() - start)
+        for _ in range(polls):
+            start = time.perf_counter()
+            await connection.request("GET", f"/api/v1/games/{game_id}")
+            latencies.append(time.perf_counter() - start)
+    finally:
+        connection.close()
+
+
+async def _load(port, connections, polls, pid):
+    latencies, opened = [], []
+    release = asyncio.Event()
+    tasks = [asyncio.create_task(_player(port, polls, latencies, opened, release)) for _ in range(connections)]
+    while len(opened) < connections and not all(task.done() for task in tasks):
+        await asyncio.sleep(0.05)
+    # Give the server a moment to accept every connection before sampling it.
+    await asyncio.sleep(0.5)
+    threads, rss = _proc_status(pid)
+    start = time.perf_counter()
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failures = sum(isinstance(result, BaseException) for result in results)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else float("nan")
+    return len(latencies) / elapsed, p95, failures, threads, rss
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--connections", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--polls", type=int, default=5, help="state requests per connection")
+    args = parser.parse_args(argv)
+
+    print(f"{'server':<6}{'conns':>7}{'req/s':>10}{'p95 ms':>10}{'failed':>8}{'threads':>9}{'RSS MB':>8}")
+    for name, command in SERVERS.items():
+        for connections in args.connections:
+            server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, text=True,
+                                      env=dict(os.environ, GAME_METRICS="0"))
+            try:
+                port = int(server.stdout.readline())
+                rps, p95, failures, threads, rss = asyncio.run(_load(port, connections, args.polls, server.pid))
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"{name:<6}{connections:>7}{rps:>10,.0f}{p95:>10.1f}{failures:>8}{threads:>9}{rss:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+"""
+Throughput of the NumPy batch engine against scalar SustainabilityGame replay.
+
+Run from the repository root:
+    python benchmarks/batch_engine.py [n_games]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from batch_engine import NOOP, BatchGame, replay_scalar
+
+
+def main():
+    n_games = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    played = BatchGame(n_games)
+    start = time.perf_counter()
+    history = played.run_random(seed=0)
+    play_seconds = time.perf_counter() - start
+    moves = int((history != NOOP).sum())
+
+    # Replay each game's real moves, without the NOOP padding, through the scalar class.
+    scalar_games = min(n_games, 2000)
+    sequences = [column[column != NOOP] for column in history[:, :scalar_games].T]
+    start = time.perf_counter()
+    for codes in sequences:
+        replay_scalar(codes.tolist())
+    scalar_moves = sum(len(codes) for codes in sequences)
+    scalar_rate = scalar_moves / (time.perf_counter() - start)
+
+    # Replay the recorded move matrix, NOOP padding included, through a fresh batch.
+    replayed = BatchGame(n_games)
+    start = time.perf_counter()
+    replayed.replay(history)
+    replay_seconds = time.perf_counter() - start
+
+    print(f"games: {n_games}, steps: {len(history)}, moves: {moves}")
+    print(f"scalar replay: {scalar_rate:14,.0f} moves/s")
+    print(f"batch replay:  {moves / replay_seconds:14,.0f} moves/s  ({scalar_rate and moves / replay_seconds / scalar_rate:.0f}x)")
+    print(f"batch play:    {moves / play_seconds:14,.0f} moves/s  ({moves / play_seconds / scalar_rate:.0f}x, includes sampling)")
+
+    sample = np.random.default_rng(1).integers(0, n_games, size=50)
+    for index in sample:
+        game = replay_scalar(history[:, index].tolist())
+        for batch in (played, replayed):
+            assert game.eco_points == batch.eco_points[index]
+            assert game.energy == batch.energy[index]
+            assert game.sustainability_level == batch.sustainability[index]
+    print("spot check: batch and scalar states match")
+
+
+if __name__ == "__main__":
+    main()
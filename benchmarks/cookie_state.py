@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+"""
+Size and cost of the stateless-mode game cookie.
+
+Packs a game in progress into a signed cookie and reads it back, and
+compares the time per request with a load and save through the memory
+and SQLite session stores.
+
+Run from the repository root:
+    python benchmarks/cookie_state.py
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cookie_state import CookieState
+from session_store import MemorySessionStore, SqliteSessionStore, new_game_id
+from sustainability_game import SustainabilityGame
+
+
+def main():
+    game = SustainabilityGame()
+    game.player_name = "Chan Tai Man"
+    for kind, arg in [("travel", "park"), ("action", "plant_trees"), ("end_day", None)]:
+        game.apply_move(kind, arg)
+    game_id = new_game_id()
+    state = CookieState("benchmark secret", remember=0)
+    value = state.dumps(game_id, game, 3)
+    print(f"cookie value: {len(value)} bytes for a {len(game.player_name)}-character name")
+
+    number = 20000
+    rows = [
+        ("state cookie", lambda: state.loads(state.dumps(game_id, game, 3))),
+    ]
+    memory = MemorySessionStore()
+    memory.save(game_id, game)
+    rows.append(("memory store", lambda: memory.save(game_id, memory.get(game_id))))
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite = SqliteSessionStore(os.path.join(directory, "games.db"))
+        sqlite.save(game_id, game)
+        rows.append(("sqlite store", lambda: sqlite.save(game_id, sqlite.get(game_id))))
+        for name, load_and_save in rows:
+            seconds = timeit.timeit(load_and_save, number=number)
+            print(f"{name:<14}{seconds / number * 1e6:>8.1f} us per load + save")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+"""
+Event log throughput: group commit versus one fsync per event.
+
+Several threads append moves as a web worker's request threads would. With
+group commit they return immediately and a background thread fsyncs each
+batch; the per-event mode waits for its own record to reach the disk before
+the next append, which is what a naive write-then-fsync log would do.
+Also reports the cost of one append as a game's move history grows, which
+should stay flat, and recovery time from a snapshot plus log tail.
+
+Run from the repository root:
+    python benchmarks/event_log.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_log import EventLog
+from session_store import new_game_id
+from sustainability_game import SustainabilityGame
+
+
+def append_events(log, threads, per_thread, durable_each):
+    def worker():
+        game_id = new_game_id()
+        game = SustainabilityGame()
+        log.append(game_id, "start", None, game)
+        for _ in range(per_thread):
+            game.perform_action("rest")
+            position = log.append(game_id, "action", "rest", game)
+            if durable_each:
+                log.wait(position)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    log.wait()
+    return threads * per_thread / (time.perf_counter() - start)
+
+
+def main():
+    threads, per_thread = 8, 250
+    for durable_each in (True, False):
+        directory = tempfile.mkdtemp()
+        try:
+            log = EventLog(directory)
+            log.recover()
+            rate = append_events(log, threads, per_thread, durable_each)
+            log.close()
+        finally:
+            shutil.rmtree(directory)
+        label = "fsync per event" if durable_each else "group commit"
+        print(f"{label:<16} {rate:>10,.0f} events/s")
+
+    directory = tempfile.mkdtemp()
+    try:
+        log = EventLog(directory, fsync=False)
+        log.recover()
+        for history in (10, 1000, 5000):
+            game_id = new_game_id()
+            game = SustainabilityGame()
+            for _ in range(history):
+                game.perform_action("rest")
+            log.append(game_id, "start", None, game)
+            start = time.perf_counter()
+            for _ in range(1000):
+                log.append(game_id, "action", "rest", game)
+            elapsed = time.perf_counter() - start
+            print(f"append with {history:>5} moves played: {elapsed * 1000:.2f} us")
+        log.close()
+    finally:
+        shutil.rmtree(directory)
+
+    directory = tempfile.mkdtemp()
+    try:
+        log = EventLog(directory, snapshot_every=50000, fsync=False)
+        log.recover()
+        append_events(log, 100, 1000, False)
+        log.close()
+        start = time.perf_counter()
+        log = EventLog(directory, fsync=False)
+        games = log.recover()
+        elapsed = time.perf_counter() - start
+        log.close()
+        print(f"recovered {len(games)} games from 100,100 events in {elapsed * 1000:.0f} ms")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+"""
+Per-session memory and construction time of SustainabilityGame.
+
+Compares the current slotted game, which shares the module-level catalog,
+with the previous layout that rebuilt the catalog dicts inside every game.
+
+Run from the repository root:
+    python benchmarks/game_state.py
+"""
+
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sustainability_game import ACTION_IMPACTS, LOCATIONS, TIPS, SustainabilityGame
+
+
+class LegacyGame:
+    """The previous game layout: a plain object with its own catalog copy."""
+
+    def __init__(self):
+        self.player_name = ""
+        self.eco_points = 0
+        self.days = 1
+        self.energy = 100
+        self.sustainability_level = 0
+        self.current_location = "home"
+        self.locations = {
+            name: {"description": data["description"], "actions": list(data["actions"])}
+            for name, data in LOCATIONS.items()
+        }
+        self.action_impacts = {name: dict(impact) for name, impact in ACTION_IMPACTS.items()}
+        self.tips = list(TIPS)
+
+
+def measure_memory(factory, count):
+    """Return the average bytes allocated per game when keeping `count` games alive."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    games = [factory() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del games
+    return allocated / count
+
+
+def measure_construction(factory, number):
+    """Return the best-of-five average construction time in microseconds."""
+    best = min(timeit.repeat(factory, number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main():
+    count = 10000
+    rows = []
+    for label, factory in (("before (LegacyGame)", LegacyGame), ("after (SustainabilityGame)", SustainabilityGame)):
+        rows.append((label, measure_memory(factory, count), measure_construction(factory, count)))
+
+    print(f"{'layout':<28}{'bytes/session':>16}{'construct (us)':>18}")
+    for label, memory, construct in rows:
+        print(f"{label:<28}{memory:>16.0f}{construct:>18.2f}")
+    (_, mem_before, time_before), (_, mem_after, time_after) = rows
+    print(f"\nmemory: {mem_before / mem_after:.1f}x smaller, construction: {time_before / time_after:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+"""
+Leaderboard cost per operation as the number of recorded games grows.
+
+Records games with scores drawn from the random policy's final-score
+spread, then times record(), rank() and top() at each size, next to a rank
+computed by scanning every recorded score, which is what a plain table
+would need.
+
+Run from the repository root:
+    python benchmarks/leaderboard.py
+    python benchmarks/leaderboard.py --games 1000000 5000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leaderboard import Leaderboard
+
+
+def random_game(rng):
+    return SimpleNamespace(player_name=f"player-{rng.getrandbits(32)}", eco_points=int(rng.gauss(40, 60)),
+                           sustainability_level=rng.gauss(20, 25))
+
+
+def per_call(function, number):
+    return min(timeit.repeat(function, number=number, repeat=3)) / number * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the leaderboard")
+    parser.add_argument("--games", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    board = Leaderboard()
+    scores = []
+    probe = random_game(rng)
+    print(f"{'games':>10}{'record us':>11}{'rank us':>10}{'top-10 us':>11}{'scan rank us':>14}")
+    for target in sorted(args.games):
+        games = [random_game(rng) for _ in range(target - len(board))]
+
+        def record_next():
+            game = games.pop()
+            board.record(game)
+            scores.append(game.eco_points)
+
+        record = per_call(record_next, min(len(games) // 3, 20000)) if games else 0.0
+        while games:
+            record_next()
+        rank = per_call(lambda: board.rank(probe), 10000)
+        top = per_call(lambda: board.top("eco_points"), 10000)
+        scan = per_call(lambda: sum(score > probe.eco_points for score in scores) + 1, 3)
+        print(f"{len(board):>10,}{record:>11.2f}{rank:>10.2f}{top:>11.2f}{scan:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+"""
+Overhead of the request instrumentation behind /metrics.
+
+Reports the cost of single counter and histogram updates, the recording
+work done by one GET /game (four histogram observations and two counter
+increments), and end-to-end request time with metrics enabled and disabled.
+The end-to-end difference is within run-to-run noise on most machines, so
+the direct measurement is the one to watch.
+
+Run from the repository root:
+    python benchmarks/metrics.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from app import app
+
+
+def per_request(client, number):
+    return min(timeit.repeat(lambda: client.get('/game'), number=number, repeat=1)) / number * 1e6
+
+
+def record_game_view(histogram, counter):
+    """The metric updates made while serving GET /game."""
+    histogram.observe(0.0001, "state_load")
+    counter.inc("hit")
+    histogram.observe(0.0004, "render")
+    histogram.observe(0.0006, "/game")
+    counter.inc("/game", 200)
+
+
+def main():
+    registry = metrics.Registry()
+    counter = registry.counter("bench_total", "Benchmark counter.", ("route",))
+    histogram = registry.histogram("bench_seconds", "Benchmark histogram.", ("route",))
+    number = 200000
+    inc = min(timeit.repeat(lambda: counter.inc("/game"), number=number, repeat=5)) / number * 1e6
+    observe = min(timeit.repeat(lambda: histogram.observe(0.003, "/game"), number=number, repeat=5)) / number * 1e6
+    per_view = min(timeit.repeat(lambda: record_game_view(histogram, counter), number=number, repeat=5)) / number * 1e6
+    print(f"counter.inc:         {inc:6.2f} us")
+    print(f"histogram.observe:   {observe:6.2f} us")
+    print(f"GET /game recording: {per_view:6.2f} us")
+
+    client = app.test_client()
+    client.post('/start', data={'player_name': 'bench'})
+    timings = {True: [], False: []}
+    for _ in range(5):
+        for enabled in (True, False):
+            app.metrics_enabled = enabled
+            timings[enabled].append(per_request(client, 1000))
+    app.metrics_enabled = True
+    enabled, disabled = min(timings[True]), min(timings[False])
+    print(f"GET /game, metrics on:  {enabled:7.1f} us")
+    print(f"GET /game, metrics off: {disabled:7.1f} us")
+    print(f"overhead per request:   {enabled - disabled:7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
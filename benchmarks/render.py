@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+"""
+Per-request render time of the game page, with and without the fragment cache.
+
+The "before" case renders the page the way game_view used to, looping over
+every location and action and title-casing names on each request.
+
+Run from the repository root:
+    python benchmarks/render.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import render_template
+
+from app import app, player_state
+from sustainability_game import SustainabilityGame
+
+LEGACY_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Hong Kong Sustainability Challenge</title>
+    <link rel="stylesheet" href="/static/style.css">
+</head>
+<body>
+    <main>
+        <section>
+            <h2>Player Stats</h2>
+            <p>Player: {{ player.name }}</p>
+            <p>Day: {{ player.day }} | Eco Points: {{ player.eco_points }} | Energy: {{ player.energy }}</p>
+            <p>Sustainability Level: {{ player.sustainability }}</p>
+        </section>
+        <section>
+            <h2>Current Location: {{ location.description }}</h2>
+            <h3>Actions</h3>
+            <ul>
+                {% for action in actions %}
+                    <li><a href="/action/{{ action }}">{{ action.replace('_', ' ').title() }}</a></li>
+                {% endfor %}
+            </ul>
+            <h3>Travel to Another Location</h3>
+            <ul>
+                {% for loc, loc_data in game.locations.items() %}
+                    {% if loc != player.location %}
+                        <li><a href="/change_location/{{ loc }}">{{ loc.title() }}</a></li>
+                    {% endif %}
+                {% endfor %}
+            </ul>
+        </section>
+        <section>
+            <a href="/end_day">End Day</a> | <a href="/random_tip">Get a Sustainability Tip</a>
+        </section>
+    </main>
+</body>
+</html>"""
+
+# Compiled once, as a file-based template would be.
+LEGACY = app.jinja_env.from_string(LEGACY_TEMPLATE)
+
+
+def render_before(game):
+    location = game.locations[game.current_location]
+    return render_template(
+        LEGACY,
+        player=player_state(game),
+        location=location,
+        actions=location['actions'],
+        game={"locations": game.locations},
+    )
+
+
+def render_after(game):
+    return render_template(
+        'game.html',
+        game_id="benchmark",
+        player=player_state(game),
+        location_fragment=app.fragments.location(game.current_location),
+        tip=None,
+    )
+
+
+def main():
+    game = SustainabilityGame()
+    game.change_location("park")
+    number = 5000
+    with app.test_request_context():
+        render_before(game)
+        render_after(game)
+        before = min(timeit.repeat(lambda: render_before(game), number=number, repeat=5)) / number * 1e6
+        after = min(timeit.repeat(lambda: render_after(game), number=number, repeat=5)) / number * 1e6
+
+    print(f"before (full loops): {before:8.1f} us/render")
+    print(f"after (fragments):   {after:8.1f} us/render")
+    print(f"render time cut by {(1 - after / before) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+"""
+Size of game transcripts and how fast replay.py re-verifies them.
+
+Plays N games with the random policy from simulate.py (drawing a tip now
+and then), appends them to a transcript file, then streams the file back
+and replays every game one at a time and in NumPy batches, checking each
+final state.
+
+Run from the repository root:
+    python benchmarks/replay.py
+    python benchmarks/replay.py --games 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay import TranscriptWriter, read_transcripts, verify
+from simulate import MAX_MOVES, random_policy
+from sustainability_game import SustainabilityGame
+
+
+def record(path, games, seed):
+    rng = random.Random(seed)
+    with TranscriptWriter(path) as writer:
+        for number in range(games):
+            game = SustainabilityGame(seed=rng.getrandbits(32))
+            game.player_name = f"player{number}"
+            for _ in range(MAX_MOVES):
+                if game.is_over():
+                    break
+                if rng.random() < 0.05:
+                    game.get_random_tip()
+                game.apply_move(*random_policy(game, rng))
+            writer.write(game)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--games", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.hkt")
+        start = time.perf_counter()
+        record(path, args.games, args.seed)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+        print(f"recorded {args.games:,} games in {elapsed:.1f}s: {size / 2**20:.1f} MiB, "
+              f"{size / args.games:.0f} bytes/game")
+
+        start = time.perf_counter()
+        count = sum(1 for _ in read_transcripts(path))
+        elapsed = time.perf_counter() - start
+        print(f"{'stream only':<12}{count / elapsed:>12,.0f} games/s")
+
+        for name, vectorized in (("scalar", False), ("batched", True)):
+            report = verify(read_transcripts(path), vectorized=vectorized)
+            rate = report.games / report.elapsed
+            print(f"{name:<12}{rate:>12,.0f} games/s  mismatches {report.mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+"""
+Throughput of room updates when many threads play in the same city.
+
+Each of T threads joins the room for its share of P players and records A
+actions per player, first with a single shard (one lock for the whole
+room) and then with rooms.SHARDS shards. Checks that the totals match what
+was recorded and reports updates per second.
+
+Run from the repository root:
+    python benchmarks/rooms.py
+    python benchmarks/rooms.py --players 10000 --threads 32
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rooms import SHARDS, Room
+
+
+def run(shards, players, actions, threads):
+    room = Room("bench", shards)
+    start_line = threading.Barrier(threads + 1)
+
+    def play(count):
+        start_line.wait()
+        for _ in range(count):
+            room.join()
+            for _ in range(actions):
+                room.record_action(5, 0.5)
+
+    shares = [players // threads + (i < players % threads) for i in range(threads)]
+    workers = [threading.Thread(target=play, args=(share,)) for share in shares]
+    for worker in workers:
+        worker.start()
+    start_line.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    state = room.state()
+    assert (state["players"], state["actions"]) == (players, players * actions), state
+    return players * (actions + 1) / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--players", type=int, default=10000)
+    parser.add_argument("--actions", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    print(f"{args.players:,} players x {args.actions} actions on {args.threads} threads")
+    for shards in (1, SHARDS):
+        rate = run(shards, args.players, args.actions, args.threads)
+        print(f"{shards:>3} shard(s){rate:>14,.0f} updates/s  totals ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+"""
+Balance, reshuffling and lookup cost of the consistent-hash ring.
+
+For several virtual-node counts, places K game IDs on a ring of N nodes and
+reports the most loaded node against the mean, the share of games that
+move when one node joins or leaves (the ideal is 1/(N+1) and 1/N), and
+the time of one lookup.
+
+Run from the repository root:
+    python benchmarks/router.py
+    python benchmarks/router.py --nodes 8 --games 200000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from router import HashRing
+from session_store import new_game_id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--nodes", type=int, default=4)
+    parser.add_argument("--games", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    keys = [new_game_id() for _ in range(args.games)]
+    nodes = [f"http://10.0.0.{i + 1}:5000" for i in range(args.nodes + 1)]
+    print(f"{args.games:,} games on {args.nodes} nodes; ideal moves: join {1 / (args.nodes + 1):.1%}, "
+          f"leave {1 / args.nodes:.1%}")
+    print(f"{'vnodes':>7}{'max/mean':>10}{'join':>8}{'leave':>8}{'lookup':>10}")
+    for vnodes in (1, 16, 128, 512):
+        ring = HashRing(nodes[:-1], vnodes)
+        owners = [ring.node_for(key) for key in keys]
+        load = Counter(owners)
+        balance = max(load.values()) / (args.games / args.nodes)
+        joined = ring.with_nodes(nodes)
+        left = ring.with_nodes(nodes[1:-1])
+        join = sum(joined.node_for(key) != owner for key, owner in zip(keys, owners)) / args.games
+        leave = sum(left.node_for(key) != owner for key, owner in zip(keys, owners)) / args.games
+        lookup = timeit.timeit(lambda: ring.node_for(keys[0]), number=100000) / 100000
+        print(f"{vnodes:>7}{balance:>10.2f}{join:>8.1%}{leave:>8.1%}{lookup * 1e6:>8.2f}us")
+
+
+if __name__ == "__main__":
+    main()
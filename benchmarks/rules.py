@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+"""
+Cost of applying one action: the compiled rule table against nested-dict
+lookups.
+
+Times RuleTable.apply with a pre-resolved action id, the full
+SustainabilityGame.perform_action (name lookup, apply and result dict), and
+the previous dict-based perform_action body.
+
+Run from the repository root:
+    python benchmarks/rules.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import content_store
+from sustainability_game import SustainabilityGame
+
+
+def dict_perform_action(game, action):
+    """perform_action as it was before the rule table."""
+    action_impacts = content_store.current().action_impacts
+    if action not in action_impacts:
+        return {"error": "Invalid action"}
+    impact = action_impacts[action]
+    game.eco_points += impact["eco_points"]
+    game.energy += impact["energy"]
+    game.sustainability_level += impact["sustainability"]
+    return {
+        "action": action,
+        "eco_points": impact["eco_points"],
+        "energy": impact["energy"],
+        "sustainability": impact["sustainability"]
+    }
+
+
+def per_call(function, number=500000):
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1e9
+
+
+def main():
+    game = SustainabilityGame()
+    rules = content_store.current().rules
+    action_id = rules.action_ids["plant_trees"]
+    print(f"RuleTable.apply:               {per_call(lambda: rules.apply(game, action_id)):6.0f} ns")
+    print(f"perform_action (rule table):   {per_call(lambda: game.perform_action('plant_trees')):6.0f} ns")
+    print(f"perform_action (nested dicts): {per_call(lambda: dict_perform_action(game, 'plant_trees')):6.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+"""
+Fact search: index build and load time and query latency.
+
+Builds the index of the current content, maps it back from disk, and
+times queries through the index against a linear scan that tokenizes and
+scores every fact and tip per query.
+
+Run from the repository root:
+    python benchmarks/search.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+import timeit
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import content_store
+from search import SearchIndex, build, documents, tokenize
+
+QUERIES = ("recycling plastic", "air pollution from vehicles", "save water at home", "beach", "solar energy")
+
+
+def linear_scan(docs, query, limit=10):
+    terms = set(tokenize(query))
+    scores = []
+    for doc, (_, _, text) in enumerate(docs):
+        counts = Counter(tokenize(text))
+        score = sum(counts[term] for term in terms)
+        if score:
+            scores.append((score, doc))
+    return sorted(scores, reverse=True)[:limit]
+
+
+def main():
+    content = content_store.current()
+    docs = documents(content)
+    start = time.perf_counter()
+    data = build(content.version, docs)
+    built = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "index")
+        with open(path, "wb") as f:
+            f.write(data)
+        start = time.perf_counter()
+        index = SearchIndex.open(path)
+        opened = time.perf_counter() - start
+        print(f"{len(docs)} documents, index {len(data):,} bytes: build {built * 1000:.2f} ms, "
+              f"mmap load {opened * 1000:.2f} ms")
+
+        number = 2000
+        for name, run in (("index", lambda q: index.search(q)), ("linear scan", lambda q: linear_scan(docs, q))):
+            seconds = timeit.timeit(lambda: [run(query) for query in QUERIES], number=number)
+            print(f"{name:<12}{seconds / number / len(QUERIES) * 1e6:>10.1f} us per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+"""
+Cold-start time of the web app: time to first response and where import
+time goes.
+
+Each run starts a fresh interpreter that imports app and serves GET / and
+a new game page, timed from process start. A separate run with
+``python -X importtime`` is parsed into self time per top-level package and
+per module. Exits with status 1 if the median time to first response is
+over budget or `import app` loads a module that should only load on demand
+(NumPy, asyncio, the notebook tooling), so it can guard cold starts in CI.
+
+Run from the repository root:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --budget-ms 500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules `import app` must not pull in; they are loaded only by the code that needs them.
+LAZY_MODULES = ("numpy", "batch_engine", "asyncio", "IPython", "jupyter_client", "zmq", "tornado", "nbconvert")
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+assert client.get('/').status_code == 200
+first = time.perf_counter()
+client.post('/start', data={'player_name': 'bench'})
+assert client.get('/game').status_code == 200
+game = time.perf_counter()
+print(json.dumps({"import": imported - start, "first": first - imported, "game": game - first,
+                  "lazy": [name for name in LAZY_MODULES if name in sys.modules]}))
+"""
+
+
+def cold_start():
+    """Run one fresh process; return its timings in seconds, measured from spawn."""
+    env = dict(os.environ, GAME_METRICS="0")
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", f"LAZY_MODULES = {LAZY_MODULES!r}\n" + CHILD],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    total = time.perf_counter() - start
+    timings = json.loads(result.stdout)
+    # Time to first response covers interpreter startup, imports and the first request.
+    timings["ready"] = total - timings["game"]
+    return timings
+
+
+def import_profile():
+    """Parse ``-X importtime`` for `import app` into (self microseconds by module, total microseconds)."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT,
+                            env=dict(os.environ, GAME_METRICS="0"), capture_output=True, text=True, check=True)
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        modules[name] = int(self_us)
+        if name == "app":
+            total = int(cumulative_us)
+    return modules, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=800,
+                        help="fail if the median time to first response is higher")
+    parser.add_argument("--top", type=int, default=10, help="packages and modules to list")
+    args = parser.parse_args(argv)
+
+    runs = [cold_start() for _ in range(args.runs)]
+    ready = statistics.median(run["ready"] for run in runs) * 1000
+    print(f"time to first response (median of {args.runs}): {ready:.0f} ms")
+    for phase, label in (("import", "import app"), ("first", "first request"), ("game", "new game page")):
+        print(f"  {label:<16}{statistics.median(run[phase] for run in runs) * 1000:>8.1f} ms")
+
+    modules, total = import_profile()
+    packages = Counter()
+    for name, self_us in modules.items():
+        packages[name.partition(".")[0]] += self_us
+    print(f"\nimport app: {total / 1000:.0f} ms, {len(modules)} modules")
+    print("self time by package:")
+    for name, self_us in packages.most_common(args.top):
+        print(f"  {name:<28}{self_us / 1000:>8.1f} ms")
+    print("slowest modules:")
+    for name, self_us in Counter(modules).most_common(args.top):
+        print(f"  {name:<28}{self_us / 1000:>8.1f} ms")
+
+    failures = []
+    if ready > args.budget_ms:
+        failures.append(f"time to first response {ready:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    loaded = sorted({name for run in runs for name in run["lazy"]})
+    if loaded:
+        failures.append("import app loaded " + ", ".join(loaded))
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+"""
+Headless throughput of the terminal game engine.
+
+A bot plays complete terminal games through play_headless, choosing menu
+entries at random, with and without building the screen text. Interactive
+play used to sleep for one or two seconds after most moves and fork a
+`clear` process for every screen.
+
+Run from the repository root:
+    python benchmarks/terminal.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_sustainability_game import TerminalGame, play_headless
+
+
+def random_bot(rng):
+    def choose(game):
+        if game.phase == "name":
+            return "bot"
+        if game.phase == "menu":
+            return rng.choice("1234557")
+        if game.phase == "travel":
+            return str(rng.randint(1, 5))
+        return ""
+    return choose
+
+
+def games_per_second(quiet, games):
+    bot = random_bot(random.Random(0))
+    start = time.perf_counter()
+    for _ in range(games):
+        play_headless(bot, TerminalGame(quiet=quiet))
+    return games / (time.perf_counter() - start)
+
+
+def main():
+    print(f"quiet:   {games_per_second(True, 5000):8,.0f} games/s")
+    print(f"verbose: {games_per_second(False, 1000):8,.0f} games/s")
+
+
+if __name__ == "__main__":
+    main()
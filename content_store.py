@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+"""
+Game content (facts, tips, locations and action impacts) loaded from
+content/content.json into an immutable in-memory snapshot.
+
+The parsed content is cached next to the data file in a marshal-encoded
+binary file, keyed by a hash of the JSON source, so later startups skip the
+JSON parse. A running process picks up edits with ContentStore.maybe_reload():
+the new snapshot is built off to the side and swapped in with one reference
+assignment, so readers always see either the old or the new content in full.
+"""
+
+import hashlib
+import logging
+import marshal
+import os
+import sys
+import threading
+import time
+from types import MappingProxyType
+
+import rules
+
+CONTENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content", "content.json")
+
+_CACHE_FORMAT = 1
+
+logger = logging.getLogger(__name__)
+
+
+class ContentError(ValueError):
+    """Raised when a content file is missing required data."""
+
+
+def _freeze(table):
+    """Wrap a catalog table and its nested dicts in read-only mappings."""
+    return MappingProxyType({
+        key: MappingProxyType(value) if isinstance(value, dict) else value
+        for key, value in table.items()
+    })
+
+
+def _intern(value):
+    """Intern every string in a parsed JSON value and turn lists into tuples."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return tuple(_intern(item) for item in value)
+    if isinstance(value, dict):
+        return {sys.intern(key): _intern(item) for key, item in value.items()}
+    return value
+
+
+class Content:
+    """One immutable version of the game content."""
+
+    __slots__ = ("version", "fact_categories", "facts", "location_facts", "tips",
+                 "locations", "action_impacts", "rules")
+
+    def __init__(self, version, data):
+        for key in ("facts", "location_facts", "tips", "locations", "action_impacts"):
+            if key not in data:
+                raise ContentError(f"Content is missing {key!r}")
+        data = _intern(data)
+        self.version = version
+        self.fact_categories = MappingProxyType(data["facts"])
+        self.facts = tuple(fact for facts in data["facts"].values() for fact in facts)
+        self.location_facts = MappingProxyType(data["location_facts"])
+        self.tips = data["tips"]
+        self.locations = _freeze(data["locations"])
+        self.action_impacts = _freeze(data["action_impacts"])
+        # Raises rules.RuleError (a ValueError) on dangling references, so a
+        # bad file fails at startup and is rejected by reload().
+        self.rules = rules.compile_rules(self.locations, self.action_impacts)
+
+
+def _parse(source):
+    import json
+    return json.loads(source)
+
+
+def load(path=CONTENT_PATH, use_cache=True):
+    """Load a content file, compiling or reusing its binary cache."""
+    with open(path, "rb") as f:
+        source = f.read()
+    version = hashlib.sha256(source).hexdigest()[:16]
+    cache_path = path + ".cache"
+
+    data = None
+    if use_cache:
+        try:
+            with open(cache_path, "rb") as f:
+                cached = marshal.load(f)
+            if cached[0] == _CACHE_FORMAT and cached[1] == version:
+                data = cached[2]
+        except (OSError, EOFError, ValueError, TypeError, IndexError):
+            pass
+
+    if data is None:
+        data = _parse(source)
+        if use_cache:
+            try:
+                tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    marshal.dump((_CACHE_FORMAT, version, data), f)
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                logger.warning("Could not write content cache %s", cache_path)
+
+    return Content(version, data)
+
+
+class ContentStore:
+    """Holds the current Content and swaps in new versions when the file changes."""
+
+    def __init__(self, path=CONTENT_PATH, check_interval=2.0, clock=time.monotonic):
+        self.path = path
+        self.check_interval = check_interval
+        self.clock = clock
+        self._content = None
+        self._stat = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _file_stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def current(self):
+        """Return the current content, loading it on first use."""
+        content = self._content
+        if content is None:
+            with self._lock:
+                if self._content is None:
+                    self._stat = self._file_stat()
+                    self._content = load(self.path)
+                content = self._content
+        return content
+
+    def reload(self):
+        """Reload the content file; return True if a new version was swapped in.
+
+        A file that fails to load is logged and the current content is kept.
+        """
+        with self._lock:
+            try:
+                stat = self._file_stat()
+                content = load(self.path)
+            except (OSError, ValueError) as exc:
+                logger.error("Keeping content version %s: %s",
+                             self._content.version if self._content else None, exc)
+                return False
+            self._stat = stat
+            if self._content is not None and content.version == self._content.version:
+                return False
+            self._content = content
+            return True
+
+    def maybe_reload(self):
+        """Reload if the file has changed, checking at most once per check_interval."""
+        now = self.clock()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.check_interval
+        try:
+            changed = self._file_stat() != self._stat
+        except OSError:
+            return False
+        return changed and self.reload()
+
+
+store = ContentStore(check_interval=float(os.environ.get("CONTENT_CHECK_INTERVAL", "2")))
+
+
+def current():
+    """Return the current content of the default store."""
+    return store.current()
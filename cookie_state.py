@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+"""
+Stateless mode: a player's game kept in a compact signed cookie.
+
+With GAME_STATELESS=1 the web app keeps no game on the server. Each
+response carries the game's per-player fields packed into about 50 bytes,
+plus the name, room and achievement progress, and a 128-bit HMAC-SHA256
+tag, so any worker on any node that shares the secret key can serve the
+next request without a store lookup. The location is carried by name, so
+a content reload that reorders the locations cannot move a player, and a
+player whose location a reload removed is sent back to the start. The
+game's move history is not carried, only its length, so the MAX_MOVES
+limit still applies; games played this way are not written to the
+transcript file.
+
+Names are capped at /start and the encoded value is refused above
+MAX_VALUE_SIZE, so a state cookie always fits in a browser's 4 kB limit.
+
+Cookies carry an issue time and a sequence number that goes up with every
+save. A cookie older than ``max_age`` seconds is refused, and each worker
+remembers the highest sequence number it has seen for recent games and
+refuses anything lower, so an old cookie cannot roll a game back on a
+worker that has served it since. Across workers that have not seen the
+game, the expiry bounds how far back a replayed cookie can go.
+"""
+
+import base64
+import binascii
+import hashlib
+import hmac
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+import content_store
+from sampler import cursor_for, cursor_seed
+from sustainability_game import SustainabilityGame
+
+COOKIE_NAME = "game_state"
+# Version 1 cookies carry no achievement progress; versions 1 and 2 hold
+# energy in 16 bits; versions 1 to 3 hold the location as an index into the
+# current locations; versions 1 to 4 carry no move count.
+VERSION = 5
+TAG_SIZE = 16
+MAX_AGE = 3600
+REMEMBER = 100000
+MAX_VALUE_SIZE = 3800
+
+# version, game id, issued at, sequence, tip seed, tip position, day,
+# energy, eco points, sustainability, move count; then the location, name,
+# room and progress as length-prefixed bytes
+_STATE = struct.Struct("<B16sIIIHBiidH")
+_STATE_V4 = struct.Struct("<B16sIIIHBiid")
+# As version 4 with the location id after the day.
+_STATE_V3 = struct.Struct("<B16sIIIHBBiid")
+_STATE_V2 = struct.Struct("<B16sIIIHBBhid")
+_LAYOUTS = {1: _STATE_V2, 2: _STATE_V2, 3: _STATE_V3, 4: _STATE_V4, VERSION: _STATE}
+_LENGTH = struct.Struct("<H")
+
+
+def _pack_bytes(data):
+    if len(data) > 0xFFFF:
+        raise ValueError("field too long for a state cookie")
+    return _LENGTH.pack(len(data)) + data
+
+
+def _unpack_bytes(data, offset):
+    (length,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    value = data[offset:offset + length]
+    if len(value) != length:
+        raise ValueError("truncated state")
+    return value, offset + length
+
+
+def _unpack_text(data, offset):
+    text, offset = _unpack_bytes(data, offset)
+    return text.decode(), offset
+
+
+class CookieState:
+    """Packs games into signed cookie values and reads them back."""
+
+    def __init__(self, secret, max_age=MAX_AGE, remember=REMEMBER, clock=time.time):
+        if isinstance(secret, str):
+            secret = secret.encode()
+        # A key of its own, so these tags can never pass for Flask session signatures.
+        self._key = hashlib.sha256(b"game-state\0" + secret).digest()
+        self.max_age = max_age
+        self.remember = remember
+        self.clock = clock
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tag(self, payload):
+        return hmac.new(self._key, payload, hashlib.sha256).digest()[:TAG_SIZE]
+
+    def _see(self, game_id, sequence):
+        """Record a sequence number; False if a newer one was already seen for the game."""
+        if not self.remember:
+            return True
+        with self._lock:
+            seen = self._seen.get(game_id, 0)
+            if sequence < seen:
+                return False
+            self._seen[game_id] = sequence
+            self._seen.move_to_end(game_id)
+            if len(self._seen) > self.remember:
+                self._seen.popitem(last=False)
+        return True
+
+    def dumps(self, game_id, game, sequence):
+        """The cookie value holding a game, as save number `sequence`.
+
+        Raises ValueError if the game does not fit in a cookie.
+        """
+        seed = cursor_seed(game.tip_cursor)
+        payload = (_STATE.pack(VERSION, bytes.fromhex(game_id), int(self.clock()), sequence,
+                               seed, game.tip_cursor - cursor_for(seed), game.days, game.energy,
+                               game.eco_points, game.sustainability_level, game.move_count)
+                   + _pack_bytes(game.current_location.encode()) + _pack_bytes(game.player_name.encode()) + _pack_bytes((game.room or "").encode())
+                   + _pack_bytes(bytes(game.progress)))
+        value = base64.urlsafe_b64encode(payload + self._tag(payload)).rstrip(b"=").decode()
+        if len(value) > MAX_VALUE_SIZE:
+            raise ValueError("game state too large for a cookie")
+        self._see(game_id, sequence)
+        return value
+
+    def loads(self, value, game_id=None):
+        """Return (game_id, game, sequence) from a cookie value, or None.
+
+        None covers a missing, tampered, expired or superseded cookie, and
+        one that belongs to a game other than `game_id` when it is given.
+        """
+        if not value or len(value) > MAX_VALUE_SIZE:
+            return None
+        try:
+            data = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        except (binascii.Error, ValueError):
+            return None
+        payload, tag = data[:-TAG_SIZE], data[-TAG_SIZE:]
+        if not payload or not hmac.compare_digest(tag, self._tag(payload)):
+            return None
+        version = payload[0]
+        layout = _LAYOUTS.get(version)
+        if layout is None or len(payload) < layout.size:
+            return None
+        fields = layout.unpack_from(payload)
+        move_count = 0
+        if version == VERSION:
+            (version, raw_id, issued, sequence, seed, position, days,
+             energy, eco_points, sustainability, move_count) = fields
+        elif version == 4:
+            (version, raw_id, issued, sequence, seed, position, days,
+             energy, eco_points, sustainability) = fields
+        else:
+            (version, raw_id, issued, sequence, seed, position, days, location_id,
+             energy, eco_points, sustainability) = fields
+        found_id = raw_id.hex()
+        if game_id is not None and found_id != game_id:
+            return None
+        if self.clock() - issued > self.max_age:
+            return None
+        try:
+            offset = layout.size
+            if version >= 4:
+                location, offset = _unpack_text(payload, offset)
+            else:
+                locations = content_store.current().rules.location_names
+                location = locations[location_id] if location_id < len(locations) else ""
+            name, offset = _unpack_text(payload, offset)
+            room, offset = _unpack_text(payload, offset)
+            progress = None
+            if version >= 2:
+                progress, offset = _unpack_bytes(payload, offset)
+        except (struct.error, ValueError):
+            return None
+        if offset != len(payload):
+            return None
+        if not self._see(found_id, sequence):
+            return None
+
+        game = SustainabilityGame(seed=seed)
+        game.tip_cursor = cursor_for(seed) + position
+        game.player_name = name
+        game.room = room or None
+        game.days = days
+        game.current_location = location
+        game.follow_content()
+        game.energy = energy
+        game.eco_points = eco_points
+        game.sustainability_level = sustainability
+        game.move_count = move_count
+        if progress is not None:
+            game.progress = bytearray(progress)
+        return found_id, game, sequence
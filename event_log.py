@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+
+"""
+Append-only event log with snapshots for game state persistence.
+
+Every move is appended as a small binary record to the current log segment.
+Records are buffered and written with one fsync per batch by a background
+thread (group commit), so the request path never waits on the disk. Every
+``snapshot_every`` events the log rotates to a new segment and writes a
+snapshot of every game's latest state; recovery loads the newest snapshot
+and replays only the segments written after it. Snapshots leave out games
+that have been forgotten (finished) or have had no moves for ``ttl``
+seconds, so they only hold games that can still be played.
+
+Layout of the log directory:
+
+    snapshot-000003.bin     game states as of the start of segment 3
+    events-000003.log       records appended since then
+
+Each record is framed as ``<length:u16><crc32:u32><payload>``; a torn or
+corrupt record ends replay of its segment. Action and location names are
+written once per segment as symbol records and referenced by number.
+"""
+
+import glob
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+from replay import move_token, parse_token
+from sampler import cursor_seed
+from sustainability_game import SustainabilityGame
+
+SYMBOL, START, ACTION, TRAVEL, END_DAY, TIP, START_IN_ROOM = range(7)
+KINDS = {"start": START, "action": ACTION, "travel": TRAVEL, "end_day": END_DAY, "tip": TIP}
+
+_FRAME = struct.Struct("<HI")
+_SYMBOL = struct.Struct("<BH")
+_EVENT = struct.Struct("<B16sI")
+_EVENT_ARG = struct.Struct("<B16sIH")
+_START = struct.Struct("<B16sIQ")
+_START_IN_ROOM = struct.Struct("<B16sIQB")
+_STATE = struct.Struct("<16sIHiidQ")
+_SEED = struct.Struct("<II")
+_SNAPSHOT_MAGIC = b"HKSG4"
+# Older formats: 1 has no seeds or moves, 2 has no rooms, 3 has no achievement progress.
+_SNAPSHOT_VERSIONS = {b"HKSG1": 1, b"HKSG2": 2, b"HKSG3": 3, _SNAPSHOT_MAGIC: 4}
+
+logger = logging.getLogger(__name__)
+
+
+def _state_parts(game_id, seq, game):
+    """The fixed-size parts of a packed game state, around its move list.
+
+    Returns (head, seed, moves, count, tail): the state packs as head, the
+    seed and the first `count` entries of `moves`, then tail. The list is
+    kept by reference and only appended to, so appends stay constant-size
+    and the moves are encoded when a snapshot is written.
+    """
+    name = game.player_name.encode()
+    location = game.current_location.encode()
+    head = (_STATE.pack(bytes.fromhex(game_id), seq, game.days, game.energy, game.eco_points,
+                        float(game.sustainability_level), game.tip_cursor)
+            + bytes([len(location)]) + location + struct.pack("<H", len(name)) + name)
+    tail = _pack_room(game.room) + bytes([len(game.progress)]) + game.progress
+    return head, game.seed, game.moves, len(game.moves), tail
+
+
+def _join_state(parts):
+    head, seed, moves, count, tail = parts
+    encoded = "\n".join(move_token(kind, arg) for kind, arg in moves[:count]).encode()
+    return head + _SEED.pack(seed, len(encoded)) + encoded + tail
+
+
+def _pack_state(game_id, seq, game):
+    return _join_state(_state_parts(game_id, seq, game))
+
+
+def _pack_room(room):
+    room = (room or "").encode()
+    return bytes([len(room)]) + room
+
+
+def _unpack_state(data, offset, version=3):
+    raw_id, seq, days, energy, eco_points, sustainability, tip_cursor = _STATE.unpack_from(data, offset)
+    offset += _STATE.size
+    location_length = data[offset]
+    location = data[offset + 1:offset + 1 + location_length].decode()
+    offset += 1 + location_length
+    (name_length,) = struct.unpack_from("<H", data, offset)
+    name = data[offset + 2:offset + 2 + name_length].decode()
+    offset += 2 + name_length
+    seed, moves = None, []
+    if version >= 2:
+        seed, moves_length = _SEED.unpack_from(data, offset)
+        offset += _SEED.size
+        encoded = data[offset:offset + moves_length].decode()
+        moves = [parse_token(token) for token in encoded.split("\n")] if encoded else []
+        offset += moves_length
+    room = None
+    if version >= 3:
+        room_length = data[offset]
+        room = data[offset + 1:offset + 1 + room_length].decode() or None
+        offset += 1 + room_length
+    progress = None
+    if version >= 4:
+        progress_length = data[offset]
+        progress = bytearray(data[offset + 1:offset + 1 + progress_length])
+        offset += 1 + progress_length
+
+    game = SustainabilityGame(seed=seed)
+    game.player_name = name
+    game.days = days
+    game.energy = energy
+    game.eco_points = eco_points
+    game.sustainability_level = sustainability
+    game.current_location = location
+    game.tip_cursor = tip_cursor
+    game.moves = moves
+    game.move_count = len(moves)
+    game.room = room
+    if progress is not None:
+        game.progress = progress
+    elif moves:
+        # Older snapshots: earn the achievements again by replaying the moves.
+        replayed = SustainabilityGame(seed=seed)
+        for kind, arg in moves:
+            replayed.apply_move(kind, arg)
+        game.progress = replayed.progress
+    return raw_id.hex(), seq, game, offset
+
+
+def encode_games(games):
+    """Encode (game_id, game) pairs in the snapshot format, e.g. to hand them to another node."""
+    return _SNAPSHOT_MAGIC + b"".join(_pack_state(game_id, 0, game) for game_id, game in games)
+
+
+def decode_games(data):
+    """Yield the (game_id, game) pairs of encode_games() output."""
+    version = _SNAPSHOT_VERSIONS.get(data[:len(_SNAPSHOT_MAGIC)])
+    if version is None:
+        raise ValueError("not an encoded game batch")
+    offset = len(_SNAPSHOT_MAGIC)
+    while offset < len(data):
+        game_id, _, game, offset = _unpack_state(data, offset, version)
+        yield game_id, game
+
+
+def _frames(data):
+    """Yield record payloads until the end of the data or the first torn record."""
+    offset = 0
+    while offset + _FRAME.size <= len(data):
+        length, checksum = _FRAME.unpack_from(data, offset)
+        payload = data[offset + _FRAME.size:offset + _FRAME.size + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            logger.warning("Stopping replay at a torn record (offset %d)", offset)
+            return
+        yield payload
+        offset += _FRAME.size + length
+
+
+class EventLog:
+    """Append-only, group-committed log of game moves in a directory."""
+
+    def __init__(self, directory, flush_interval=0.005, max_batch=1000, snapshot_every=100000,
+                 fsync=True, ttl=None, clock=time.monotonic):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.ttl = ttl
+        self.clock = clock
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._wakeup = threading.Event()
+        self._buffer = []
+        self._appended = 0
+        self._durable = 0
+        self._since_snapshot = 0
+        self._states = {}
+        self._symbols = {}
+        self._segment = None
+        self._file = None
+        self._closed = False
+        self._thread = None
+
+    # Recovery
+
+    def _numbers(self, prefix, suffix):
+        paths = glob.glob(os.path.join(self.directory, f"{prefix}-*{suffix}"))
+        return sorted(int(os.path.basename(path)[len(prefix) + 1:-len(suffix)]) for path in paths)
+
+    def _path(self, prefix, number, suffix):
+        return os.path.join(self.directory, f"{prefix}-{number:06d}{suffix}")
+
+    def recover(self):
+        """Rebuild every game from the newest snapshot plus the log tail, then open for appending.
+
+        Returns a dict mapping game IDs to SustainabilityGame objects.
+        """
+        games, seqs = {}, {}
+        snapshots = self._numbers("snapshot", ".bin")
+        first_segment = 1
+        if snapshots:
+            first_segment = snapshots[-1]
+            with open(self._path("snapshot", first_segment, ".bin"), "rb") as f:
+                data = f.read()
+            version = _SNAPSHOT_VERSIONS.get(data[:len(_SNAPSHOT_MAGIC)])
+            if version is None:
+                raise ValueError(f"Corrupt snapshot {first_segment}")
+            offset = len(_SNAPSHOT_MAGIC)
+            while offset < len(data):
+                game_id, seq, game, offset = _unpack_state(data, offset, version)
+                games[game_id], seqs[game_id] = game, seq
+
+        segments = [number for number in self._numbers("events", ".log") if number >= first_segment]
+        for number in segments:
+            with open(self._path("events", number, ".log"), "rb") as f:
+                self._replay(f.read(), games, seqs)
+
+        now = self.clock()
+        self._states = {game_id: (seqs[game_id], _state_parts(game_id, seqs[game_id], game), now)
+                        for game_id, game in games.items()}
+        self._segment = max(segments + snapshots + [0]) + 1
+        self._open_segment(self._segment)
+        # The new segment starts from these states, so older files are no longer needed.
+        self._write_snapshot(self._segment, dict(self._states))
+        self._start_flusher()
+        return games
+
+    def _replay(self, data, games, seqs):
+        symbols = {}
+        for payload in _frames(data):
+            kind = payload[0]
+            if kind == SYMBOL:
+                _, number = _SYMBOL.unpack_from(payload)
+                symbols[number] = payload[_SYMBOL.size:].decode()
+                continue
+            if kind in (START, START_IN_ROOM):
+                room = None
+                if kind == START:
+                    _, raw_id, seq, tip_cursor = _START.unpack_from(payload)
+                    name = payload[_START.size:]
+                else:
+                    _, raw_id, seq, tip_cursor, room_length = _START_IN_ROOM.unpack_from(payload)
+                    room = payload[_START_IN_ROOM.size:_START_IN_ROOM.size + room_length].decode()
+                    name = payload[_START_IN_ROOM.size + room_length:]
+                game_id = raw_id.hex()
+                # A new game's tip cursor is the start of its seed's order.
+                game = SustainabilityGame(seed=cursor_seed(tip_cursor))
+                game.player_name = name.decode()
+                game.tip_cursor = tip_cursor
+                game.room = room
+                games[game_id], seqs[game_id] = game, seq
+                continue
+            if kind in (ACTION, TRAVEL):
+                _, raw_id, seq, symbol = _EVENT_ARG.unpack_from(payload)
+            else:
+                _, raw_id, seq = _EVENT.unpack_from(payload)
+            game_id = raw_id.hex()
+            game = games.get(game_id)
+            # Events already covered by the snapshot are skipped.
+            if game is None or seq <= seqs[game_id]:
+                continue
+            if kind == ACTION:
+                game.perform_action(symbols[symbol])
+            elif kind == TRAVEL:
+                game.change_location(symbols[symbol])
+            elif kind == END_DAY:
+                game.end_day()
+            elif kind == TIP:
+                game.get_random_tip()
+            seqs[game_id] = seq
+
+    # Appending
+
+    def _open_segment(self, number):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self._path("events", number, ".log"), "ab")
+
+    def _start_flusher(self):
+        self._thread = threading.Thread(target=self._flush_loop, name="event-log-flusher", daemon=True)
+        self._thread.start()
+
+    def _frame(self, payload):
+        self._buffer.append(_FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+
+    def _symbol(self, name):
+        number = self._symbols.get(name)
+        if number is None:
+            number = self._symbols[name] = len(self._symbols)
+            self._frame(_SYMBOL.pack(SYMBOL, number) + name.encode())
+        return number
+
+    def append(self, game_id, kind, arg, game):
+        """Record one move already applied to `game`; returns its log position.
+
+        `kind` is "start", "action", "travel", "end_day" or "tip". The record
+        becomes durable with the next batch; call wait() to block until then.
+        """
+        raw_id = bytes.fromhex(game_id)
+        code = KINDS[kind]
+        with self._lock:
+            if self._segment is None:
+                raise RuntimeError("Call recover() before appending")
+            seq = self._states[game_id][0] + 1 if game_id in self._states else 1
+            if code == START and game.room:
+                room = game.room.encode()
+                self._frame(_START_IN_ROOM.pack(START_IN_ROOM, raw_id, seq, game.tip_cursor, len(room))
+                            + room + game.player_name.encode())
+            elif code == START:
+                self._frame(_START.pack(START, raw_id, seq, game.tip_cursor) + game.player_name.encode())
+            elif code in (ACTION, TRAVEL):
+                self._frame(_EVENT_ARG.pack(code, raw_id, seq, self._symbol(arg)))
+            else:
+                self._frame(_EVENT.pack(code, raw_id, seq))
+            self._states[game_id] = (seq, _state_parts(game_id, seq, game), self.clock())
+            self._appended += 1
+            position = self._appended
+            if len(self._buffer) >= self.max_batch:
+                self._wakeup.set()
+        return position
+
+    def forget(self, game_id):
+        """Drop a finished or expired game from future snapshots."""
+        with self._lock:
+            self._states.pop(game_id, None)
+
+    def _live_states(self):
+        """A copy of the states to snapshot, after dropping games idle for longer than the TTL."""
+        if self.ttl is not None:
+            cutoff = self.clock() - self.ttl
+            for game_id in [game_id for game_id, state in self._states.items() if state[2] < cutoff]:
+                del self._states[game_id]
+        return dict(self._states)
+
+    def wait(self, position=None, timeout=None):
+        """Block until the record at `position` (default: everything appended) is on disk."""
+        with self._lock:
+            position = self._appended if position is None else position
+            self._wakeup.set()
+            return self._flushed.wait_for(lambda: self._durable >= position or self._closed, timeout)
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self._flush() and self._closed:
+                return
+
+    def _flush(self):
+        """Write and fsync the buffered records as one batch; returns True if there were any.
+
+        Appends only hold the lock long enough to swap out the buffer, so
+        they never wait for the disk.
+        """
+        with self._io_lock:
+            with self._lock:
+                if not self._buffer:
+                    return False
+                batch, self._buffer = self._buffer, []
+                appended = self._appended
+                snapshot = None
+                self._since_snapshot += len(batch)
+                if self._since_snapshot >= self.snapshot_every:
+                    # Records appended from here on belong to the next segment.
+                    self._since_snapshot = 0
+                    self._segment += 1
+                    self._symbols = {}
+                    snapshot = (self._segment, self._live_states())
+
+            self._file.write(b"".join(batch))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            if snapshot:
+                self._open_segment(snapshot[0])
+                self._write_snapshot(*snapshot)
+
+        with self._lock:
+            self._durable = appended
+            self._flushed.notify_all()
+        return True
+
+    def _write_snapshot(self, segment, states):
+        path = self._path("snapshot", segment, ".bin")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_SNAPSHOT_MAGIC)
+            for state in states.values():
+                f.write(_join_state(state[1]))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        for number in self._numbers("snapshot", ".bin"):
+            if number < segment:
+                os.remove(self._path("snapshot", number, ".bin"))
+        for number in self._numbers("events", ".log"):
+            if number < segment:
+                os.remove(self._path("events", number, ".log"))
+
+    def close(self):
+        """Flush everything and stop the background flusher."""
+        self._flush()
+        with self._lock:
+            self._closed = True
+            self._flushed.notify_all()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
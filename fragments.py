@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+from markupsafe import Markup
+
+import content_store
+
+
+class FragmentCache:
+    """Renders the per-location part of the game page once and reuses it.
+
+    The action list and travel list only depend on the player's location, so
+    they are rendered once per location and cached under the content version;
+    a content reload gets fresh fragments and drops the old ones.
+    """
+
+    def __init__(self, jinja_env, template_name='_location.html'):
+        self.jinja_env = jinja_env
+        self.template_name = template_name
+        self._fragments = {}
+
+    def location(self, name, content=None):
+        content = content or content_store.current()
+        key = (content.version, name)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            if any(version != content.version for version, _ in list(self._fragments)):
+                self._fragments.clear()
+            html = self.jinja_env.get_template(self.template_name).render(
+                location_name=name,
+                location=content.locations[name],
+                locations=content.locations,
+            )
+            fragment = self._fragments[key] = Markup(html)
+        return fragment
+
+    def clear(self):
+        self._fragments.clear()
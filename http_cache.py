@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+"""
+Response compression, ETags and static asset caching for both front ends.
+
+finish() post-processes a complete GET response:
+
+- gives it a strong ETag (a hash of the body, unless the handler set one)
+  and answers a matching If-None-Match with 304 Not Modified;
+- compresses text bodies of at least MIN_SIZE bytes with Brotli (when the
+  optional ``brotli`` package is installed) or gzip, whichever the client
+  accepts, with a separate ETag per encoding. Compressed bodies are kept
+  in a small LRU keyed by ETag, so static files and pages that are the
+  same for most players (the home page, the leaderboard) are compressed
+  once.
+
+app.py applies it as WSGI middleware and asgi.py calls it before sending.
+Streamed responses (Server-Sent Events) pass through untouched.
+
+StaticAssets serves /static from memory under content-hashed URLs,
+``/static/style.css?v=<hash>``. Templates build them with static_url(), so
+those responses can be cached for a year and a changed file gets a new URL.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+
+MIN_SIZE = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+CACHE_ENTRIES = 256
+CACHE_MAX_BODY = 256 * 1024
+COMPRESSIBLE = ("text/", "application/json", "application/javascript", "image/svg+xml")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_brotli = None
+
+
+def _brotli_module():
+    # Brotli is optional; without it clients get gzip.
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+        except ImportError:
+            brotli = False
+        _brotli = brotli
+    return _brotli
+
+
+def decompress(body, encoding):
+    """Undo a "gzip" or "br" Content-Encoding; other values leave the body as it is."""
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "br":
+        brotli = _brotli_module()
+        if not brotli:
+            raise ValueError("Got a Brotli response, but the brotli package is not installed")
+        return brotli.decompress(body)
+    return body
+
+
+def make_etag(body):
+    """A strong ETag for a body."""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def negotiate(accept_encoding):
+    """Pick "br", "gzip" or None from an Accept-Encoding header."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0 and (encoding != "br" or _brotli_module()):
+            return encoding
+    return None
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header matches an ETag (weak comparison, as RFC 9110 specifies)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _compress(body, encoding):
+    if encoding == "br":
+        return _brotli_module().compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionCache:
+    """LRU of compressed bodies keyed by (ETag, encoding)."""
+
+    def __init__(self, entries=CACHE_ENTRIES):
+        self.entries = entries
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag, encoding, body):
+        key = (etag, encoding)
+        with self._lock:
+            compressed = self._bodies.get(key)
+            if compressed is not None:
+                self._bodies.move_to_end(key)
+                return compressed
+        compressed = _compress(body, encoding)
+        if len(body) <= CACHE_MAX_BODY:
+            with self._lock:
+                self._bodies[key] = compressed
+                if len(self._bodies) > self.entries:
+                    self._bodies.popitem(last=False)
+        return compressed
+
+    def __len__(self):
+        return len(self._bodies)
+
+
+def _header(headers, name):
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def finish(method, status, headers, body, accept_encoding=None, if_none_match=None, cache=None):
+    """Add an ETag, answer conditional requests and compress; returns (status, headers, body).
+
+    `headers` is a list of (name, value) pairs. Anything but a 200 response
+    to GET is returned unchanged.
+    """
+    if method != "GET" or status != 200 or _header(headers, "content-encoding"):
+        return status, headers, body
+    content_type = _header(headers, "content-type") or ""
+    compressible = content_type.startswith(COMPRESSIBLE) and len(body) >= MIN_SIZE
+    etag = _header(headers, "etag") or make_etag(body)
+    encoding = negotiate(accept_encoding) if compressible else None
+    if encoding:
+        etag = etag[:-1] + "-" + encoding + '"'
+
+    kept = [(name, value) for name, value in headers
+            if name.lower() not in ("etag", "content-length", "vary")]
+    kept.append(("ETag", etag))
+    if compressible:
+        kept.append(("Vary", "Accept-Encoding"))
+    if etag_matches(if_none_match, etag):
+        return 304, [(name, value) for name, value in kept if name.lower() != "content-type"], b""
+    if encoding:
+        body = (cache or _default_cache).get(etag, encoding, body)
+        kept.append(("Content-Encoding", encoding))
+    kept.append(("Content-Length", str(len(body))))
+    return 200, kept, body
+
+
+_default_cache = CompressionCache()
+
+
+class WSGIMiddleware:
+    """Applies finish() to every buffered response of a WSGI app."""
+
+    def __init__(self, app, cache=None):
+        self.app = app
+        self.cache = cache or _default_cache
+
+    def __call__(self, environ, start_response):
+        captured = []
+
+        def capture(status, headers, exc_info=None):
+            # An error page replaces the headers captured so far; nothing is sent yet either way.
+            captured[:] = [status, headers, exc_info]
+
+        chunks = self.app(environ, capture)
+        status, headers, exc_info = captured
+        # Only responses with a known length are buffered; streams pass through.
+        if environ["REQUEST_METHOD"] != "GET" or _header(headers, "content-length") is None:
+            start_response(status, headers, exc_info)
+            return chunks
+        try:
+            body = b"".join(chunks)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+        code, headers, body = finish("GET", int(status.split()[0]), headers, body,
+                                     environ.get("HTTP_ACCEPT_ENCODING"), environ.get("HTTP_IF_NONE_MATCH"),
+                                     self.cache)
+        start_response(f"{code} {HTTPStatus(code).phrase}", headers, exc_info)
+        return [body]
+
+
+class _Asset:
+    __slots__ = ("stat", "body", "content_type", "version", "etag")
+
+
+class StaticAssets:
+    """Files under a directory, held in memory with content-hashed URLs."""
+
+    def __init__(self, directory, prefix="/static/"):
+        self.directory = os.path.abspath(directory)
+        self.prefix = prefix
+        self._assets = {}
+
+    def get(self, filename):
+        """The asset for a file name, reloaded if the file changed; None if there is no such file."""
+        path = os.path.normpath(os.path.join(self.directory, filename))
+        if not path.startswith(self.directory + os.sep):
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        asset = self._assets.get(filename)
+        if asset is None or asset.stat != key:
+            with open(path, "rb") as f:
+                body = f.read()
+            asset = _Asset()
+            asset.stat = key
+            asset.body = body
+            asset.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            if asset.content_type.startswith("text/") or asset.content_type == "application/javascript":
+                asset.content_type += "; charset=utf-8"
+            asset.version = hashlib.blake2b(body, digest_size=6).hexdigest()
+            asset.etag = f'"{asset.version}"'
+            self._assets[filename] = asset
+        return asset
+
+    def url(self, filename):
+        """The versioned URL of a file, for templates."""
+        asset = self.get(filename)
+        if asset is None:
+            return self.prefix + filename
+        return f"{self.prefix}{filename}?v={asset.version}"
+
+    def response(self, filename, version=None):
+        """(status, headers, body) for a request, cached for a year when `version` is current."""
+        asset = self.get(filename)
+        if asset is None:
+            return 404, [("Content-Type", "text/plain")], b"Not Found"
+        cache_control = IMMUTABLE if version == asset.version else REVALIDATE
+        return 200, [("Content-Type", asset.content_type), ("Cache-Control", cache_control),
+                     ("ETag", asset.etag)], asset.body
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+"""
+Leaderboard of finished games, ranked by eco points and by sustainability.
+
+Each metric keeps a count of games per score in a Fenwick tree, so a
+player's rank, the number of games recorded and any percentile are answered
+in O(log r), where r is the range of scores seen (not the number of games),
+and a min-heap of the best `size` entries for the board itself. Memory does
+not grow with the number of games, so millions of recorded games cost the
+same as a few. Sustainability is ranked to one decimal place.
+
+Scores have no upper bound (resting and acting can go on for ever), so the
+counts only cover keys from MIN_KEY to MAX_KEY; scores outside that range
+are counted at its nearest end, while the board still shows the real score.
+"""
+
+import heapq
+import math
+import threading
+
+METRICS = ("eco_points", "sustainability")
+MIN_KEY = -(1 << 16)
+MAX_KEY = (1 << 16) - 1
+
+
+def score_keys(game):
+    """Integer ranking keys of a finished game, per metric."""
+    return {
+        "eco_points": game.eco_points,
+        "sustainability": round(game.sustainability_level * 10),
+    }
+
+
+def display_score(metric, key):
+    return key / 10 if metric == "sustainability" else key
+
+
+class ScoreIndex:
+    """Counts of integer scores, with O(log r) rank and quantile queries.
+
+    The covered range grows by doubling when a score falls outside it, up
+    to min_key..max_key; keys beyond those are counted as the nearest one.
+    """
+
+    def __init__(self, low=0, size=1024, min_key=MIN_KEY, max_key=MAX_KEY):
+        self.low = low
+        self.min_key = min_key
+        self.max_key = max_key
+        self.total = 0
+        self._counts = [0] * size
+        self._tree = [0] * (size + 1)
+
+    def _clamp(self, key):
+        return min(max(key, self.min_key), self.max_key)
+
+    def _grow(self, key):
+        size = len(self._counts)
+        low, high = self.low, self.low + size
+        while not low <= key < high:
+            if key < low:
+                low = max(low - (high - low), self.min_key)
+            else:
+                high = min(high + (high - low), self.max_key + 1)
+        counts = [0] * (high - low)
+        counts[self.low - low:self.low - low + size] = self._counts
+        # Build the tree in O(r): push each node's sum up to its parent.
+        tree = [0] + counts
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.low, self._counts, self._tree = low, counts, tree
+
+    def add(self, key, count=1):
+        key = self._clamp(key)
+        if not self.low <= key < self.low + len(self._counts):
+            self._grow(key)
+        i = key - self.low
+        self._counts[i] += count
+        self.total += count
+        i += 1
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += count
+            i += i & -i
+
+    def count_at_most(self, key):
+        """Number of recorded scores <= key."""
+        i = min(key - self.low + 1, len(self._counts))
+        total = 0
+        tree = self._tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def rank(self, key):
+        """1-based rank of a score: one more than the number of higher scores."""
+        return self.total - self.count_at_most(self._clamp(key)) + 1
+
+    def count_below(self, key):
+        """Number of recorded scores < key."""
+        return self.count_at_most(self._clamp(key) - 1)
+
+    def quantile(self, fraction):
+        """The smallest recorded score with at least `fraction` of scores at or below it."""
+        if not self.total:
+            return None
+        target = max(1, math.ceil(self.total * fraction))
+        # Binary lifting down the tree to the first prefix sum >= target.
+        position, step = 0, 1 << (len(self._counts).bit_length() - 1)
+        tree = self._tree
+        while step:
+            following = position + step
+            if following < len(tree) and tree[following] < target:
+                position = following
+                target -= tree[following]
+            step >>= 1
+        return self.low + position
+
+
+class Leaderboard:
+    """Thread-safe rankings of finished games for each metric in METRICS."""
+
+    def __init__(self, size=100):
+        self.size = size
+        self._indexes = {metric: ScoreIndex() for metric in METRICS}
+        self._top = {metric: [] for metric in METRICS}
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def record(self, game):
+        """Record a finished game."""
+        keys = score_keys(game)
+        with self._lock:
+            self._sequence += 1
+            for metric, key in keys.items():
+                self._indexes[metric].add(key)
+                # Ties keep the earlier game: later ones compare lower.
+                entry = (key, -self._sequence, game.player_name)
+                top = self._top[metric]
+                if len(top) < self.size:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+
+    def __len__(self):
+        return self._indexes[METRICS[0]].total
+
+    def top(self, metric, limit=10):
+        """The best `limit` entries as dicts with rank, name and score."""
+        with self._lock:
+            best = heapq.nlargest(min(limit, self.size), self._top[metric])
+            index = self._indexes[metric]
+            return [{"rank": index.rank(key), "name": name, "score": display_score(metric, key)}
+                    for key, _, name in best]
+
+    def rank(self, game):
+        """Where a finished game places, per metric: rank, out of, and percentile beaten."""
+        keys = score_keys(game)
+        with self._lock:
+            result = {}
+            for metric, key in keys.items():
+                index = self._indexes[metric]
+                below = index.count_below(key)
+                result[metric] = {
+                    "rank": index.rank(key),
+                    "of": index.total,
+                    "percentile": round(100 * below / index.total, 1) if index.total else 0.0,
+                }
+            return result
+
+    def percentiles(self, metric, fractions=(0.5, 0.9, 0.99)):
+        """Scores at the given fractions of all recorded games."""
+        with self._lock:
+            index = self._indexes[metric]
+            result = {}
+            for fraction in fractions:
+                key = index.quantile(fraction)
+                result[f"p{round(fraction * 100)}"] = None if key is None else display_score(metric, key)
+            return result
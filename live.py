@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+"""
+Server-pushed game updates as Server-Sent Events.
+
+A page subscribes to /api/v1/games/<game_id>/events and gets the full state
+once, then only the fields that changed after each move, e.g.
+``{"energy": 90, "eco_points": 15}``, plus tips as they are drawn.
+Subscribers are plain callbacks, so the Flask front end can feed a
+queue.Queue and the ASGI one an asyncio.Queue. Like metrics, subscriptions
+are per worker process.
+"""
+
+import json
+import threading
+
+KEEPALIVE_SECONDS = 15
+KEEPALIVE = b": keepalive\n\n"
+
+
+def compact_state(game):
+    """The fields a live page displays."""
+    location = game.locations[game.current_location]
+    return {
+        "day": game.days,
+        "eco_points": game.eco_points,
+        "energy": game.energy,
+        "sustainability": round(game.sustainability_level),
+        "location": game.current_location,
+        "description": location["description"],
+        "actions": list(location["actions"]),
+        "location_fact": game.location_fact(),
+        "game_over": game.is_over(),
+    }
+
+
+def format_event(event, data):
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class _Channel:
+    __slots__ = ("subscribers", "state")
+
+    def __init__(self):
+        self.subscribers = []
+        self.state = None
+
+
+class Broadcaster:
+    """Fans out state deltas and tips to the subscribers of each game."""
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, game_id, game, deliver):
+        """Call deliver(bytes) with the full state now and every update after.
+
+        Returns a function that ends the subscription.
+        """
+        state = compact_state(game)
+        with self._lock:
+            channel = self._channels.get(game_id)
+            if channel is None:
+                channel = self._channels[game_id] = _Channel()
+            channel.subscribers.append(deliver)
+            channel.state = state
+        deliver(format_event("state", state))
+
+        def unsubscribe():
+            with self._lock:
+                channel.subscribers.remove(deliver)
+                if not channel.subscribers and self._channels.get(game_id) is channel:
+                    del self._channels[game_id]
+        return unsubscribe
+
+    def publish_state(self, game_id, game):
+        """Send the fields of `game` that changed since the last update, if anyone is listening."""
+        if game_id not in self._channels:
+            return
+        state = compact_state(game)
+        with self._lock:
+            channel = self._channels.get(game_id)
+            if channel is None:
+                return
+            previous, channel.state = channel.state, state
+            delta = {key: value for key, value in state.items() if previous.get(key) != value}
+            subscribers = list(channel.subscribers)
+        if delta:
+            message = format_event("state", delta)
+            for deliver in subscribers:
+                deliver(message)
+
+    def publish(self, game_id, event, data):
+        """Send any other event, such as a tip, to a game's subscribers."""
+        if game_id not in self._channels:
+            return
+        with self._lock:
+            channel = self._channels.get(game_id)
+            subscribers = list(channel.subscribers) if channel else ()
+        message = format_event(event, data)
+        for deliver in subscribers:
+            deliver(message)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(channel.subscribers) for channel in self._channels.values())
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+"""
+Load generator and latency benchmark for the Flask app.
+
+Simulated players each play a full game through /start, /action/<action>,
+/change_location/<location>, /end_day, /game and /game_over, concurrently
+from a thread pool. Moves are chosen by a simulate.py policy against a local
+copy of the game that mirrors the server's state. Like a browser, each player
+sends --accept-encoding, fetches the stylesheet and scripts a page links to,
+keeps them in a private cache and revalidates cached files that are not
+marked immutable with If-None-Match.
+
+    python loadtest.py --players 200 --concurrency 20 --output results.json
+    python loadtest.py --server --players 200 --baseline results.json
+
+By default requests go through Flask's test client in this process; with
+--server they go over HTTP to a local threaded WSGI server. The JSON report
+holds p50/p95/p99 latency and requests per second per route, and the
+response bytes per game (compare with --accept-encoding "" for the
+uncompressed size). With
+--baseline, the run fails if any route's p95 regresses by more than
+--tolerance.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import http_cache
+from simulate import MAX_MOVES, load_policy
+from sustainability_game import SustainabilityGame
+
+
+class TestClientTransport:
+    """Sends requests through Flask's test client, one client per player."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def session(self):
+        client = self.app.test_client()
+
+        def request(method, path, form=None, headers=None):
+            response = client.open(path, method=method, data=form, headers=headers)
+            headers = {name.lower(): value for name, value in response.headers.items()}
+            return response.status_code, headers, response.get_data()
+
+        return request
+
+
+class HttpTransport:
+    """Sends requests over HTTP, keeping one connection and cookie jar per player."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    def session(self):
+        connection = http.client.HTTPConnection(self.host, self.port)
+        cookies = {}
+
+        def request(method, path, form=None, headers=None):
+            headers = dict(headers or {})
+            if cookies:
+                headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in cookies.items())
+            body = None
+            if form is not None:
+                body = urlencode(form)
+                headers["Content-Type"] = "application/x-www-form-urlencoded"
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+            for header in response.headers.get_all("Set-Cookie") or ():
+                name, _, value = header.split(";", 1)[0].partition("=")
+                cookies[name.strip()] = value.strip()
+            return response.status, {name.lower(): value for name, value in response.headers.items()}, payload
+
+        return request
+
+
+class Recorder:
+    """Collects per-route latencies from all player threads."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.bytes = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, status, size):
+        with self._lock:
+            self.latencies[route].append(seconds)
+            self.bytes[route] += size
+            if status >= 400:
+                self.errors[route] += 1
+
+
+def _percentile(ordered, fraction):
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+ASSET_URL = re.compile(rb'(?:href|src)="(/static/[^"]+)"')
+
+
+def play(transport, recorder, policy, seed, accept_encoding="gzip, br"):
+    """Play one full game as a simulated player."""
+    request = transport.session()
+    rng = random.Random(seed)
+    shadow = SustainabilityGame()
+    # Static files by URL: (ETag, immutable), as a browser cache would keep them.
+    assets = {}
+    encoding = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+
+    def fetch(route, method, path, form=None, headers=None):
+        start = time.perf_counter()
+        status, response_headers, body = request(method, path, form, dict(encoding, **(headers or {})))
+        recorder.record(route, time.perf_counter() - start, status, len(body))
+        return status, response_headers, body
+
+    def timed(route, method, path, form=None):
+        status, headers, body = fetch(route, method, path, form)
+        if status != 200 or not headers.get("content-type", "").startswith("text/html"):
+            return
+        body = http_cache.decompress(body, headers.get("content-encoding"))
+        for url in ASSET_URL.findall(body):
+            url = url.decode()
+            cached = assets.get(url)
+            if cached and cached[1]:
+                continue
+            status, headers, _ = fetch("/static/<path:filename>", "GET", url,
+                                       headers={"If-None-Match": cached[0]} if cached else None)
+            if status == 200:
+                assets[url] = (headers.get("etag"), "immutable" in headers.get("cache-control", ""))
+
+    timed("/start", "POST", "/start", {"player_name": f"player-{seed}"})
+    timed("/game", "GET", "/game")
+    for _ in range(MAX_MOVES):
+        if shadow.is_over():
+            break
+        kind, arg = policy(shadow, rng)
+        shadow.apply_move(kind, arg)
+        if kind == "action":
+            timed("/action/<action>", "GET", f"/action/{arg}")
+        elif kind == "travel":
+            timed("/change_location/<location>", "GET", f"/change_location/{arg}")
+        else:
+            timed("/end_day", "GET", "/end_day")
+        timed("/game", "GET", "/game")
+    timed("/game_over", "GET", "/game_over")
+
+
+def run(transport, players, concurrency, policy_spec="random", seed=0, accept_encoding="gzip, br"):
+    """Play `players` games with `concurrency` threads; return (Recorder, seconds)."""
+    policy = load_policy(policy_spec)
+    recorder = Recorder()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(play, transport, recorder, policy, seed * 1000003 + player, accept_encoding)
+                   for player in range(players)]
+        for future in futures:
+            future.result()
+    return recorder, time.perf_counter() - start
+
+
+def report(recorder, elapsed, players):
+    """Summarize a run as a JSON-serializable dict."""
+    routes = {}
+    total_requests = 0
+    for route, latencies in sorted(recorder.latencies.items()):
+        ordered = sorted(latencies)
+        total_requests += len(ordered)
+        routes[route] = {
+            "requests": len(ordered),
+            "errors": recorder.errors[route],
+            "rps": round(len(ordered) / elapsed, 1),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+            "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+            "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+        }
+    return {
+        "players": players,
+        "seconds": round(elapsed, 3),
+        "requests": total_requests,
+        "rps": round(total_requests / elapsed, 1),
+        "bytes_per_game": round(sum(recorder.bytes.values()) / players),
+        "routes": routes,
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Return a list of routes whose p95 latency regressed beyond `tolerance`."""
+    regressions = []
+    for route, stats in result["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if before and stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {before['p95_ms']} ms -> {stats['p95_ms']} ms")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Sustainability Game web app")
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--policy", default="random", help="simulate.py policy for choosing moves")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--server", action="store_true", help="drive a local threaded WSGI server over HTTP")
+    parser.add_argument("--accept-encoding", default="gzip, br",
+                        help='Accept-Encoding header to send ("" for uncompressed responses)')
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    from app import app
+
+    server = None
+    if args.server:
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        transport = HttpTransport("127.0.0.1", server.server_port)
+    else:
+        transport = TestClientTransport(app)
+
+    try:
+        recorder, elapsed = run(transport, args.players, args.concurrency, args.policy, args.seed,
+                                args.accept_encoding)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    result = report(recorder, elapsed, args.players)
+    result["commit"] = _git_commit()
+    result["mode"] = "server" if args.server else "test_client"
+    result["concurrency"] = args.concurrency
+    result["accept_encoding"] = args.accept_encoding
+
+    print(f"{result['players']} games, {result['requests']} requests in {result['seconds']} s "
+          f"({result['rps']} req/s, {result['bytes_per_game']:,} bytes/game)")
+    print(f"{'route':<30}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, stats in result["routes"].items():
+        print(f"{route:<30}{stats['requests']:>10}{stats['rps']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
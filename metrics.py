@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+"""
+Low-overhead counters and histograms exposed in the Prometheus text format.
+
+Each thread writes to its own shard of every metric, so recording never
+takes a lock; a scrape sums the shards of all threads. When a thread exits,
+its shard is folded into the metric's retired totals, so servers that start
+a thread per connection keep a shard only per live thread. Metrics are per
+worker process, as with any Prometheus client in a pre-fork server.
+"""
+
+import itertools
+import threading
+import weakref
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _ThreadMarker:
+    """Held only by a thread's local storage, so it is freed when the thread exits."""
+
+    __slots__ = ("__weakref__",)
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = {}
+        self._retired = {}
+        self._shards_lock = threading.Lock()
+        self._numbers = itertools.count()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            number = next(self._numbers)
+            # Only taken once per thread, never on the recording path.
+            with self._shards_lock:
+                self._shards[number] = shard
+            marker = self._local.marker = _ThreadMarker()
+            weakref.finalize(marker, self._retire, number, shard)
+            return shard
+
+    def _retire(self, number, shard):
+        """Fold the shard of a thread that has exited into the retired totals."""
+        with self._shards_lock:
+            del self._shards[number]
+            for labels, values in shard.items():
+                total = self._retired.get(labels)
+                if total is None:
+                    self._retired[labels] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        total[i] += value
+
+    def _series(self):
+        """Return {labels: [shard values...]} across all threads."""
+        with self._shards_lock:
+            shards = list(self._shards.values())
+            merged = {labels: [list(values)] for labels, values in self._retired.items()}
+        for shard in shards:
+            for labels, values in list(shard.items()):
+                merged.setdefault(labels, []).append(values)
+        return merged
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            cell = shard[labels] = [0]
+        cell[0] += amount
+
+    def value(self, *labels):
+        return sum(cell[0] for cell in self._series().get(labels, ()))
+
+    def render(self):
+        lines = self._header()
+        for labels, cells in sorted(self._series().items()):
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {sum(cell[0] for cell in cells)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            # One count per bucket plus +Inf, followed by the running sum.
+            cell = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def count(self, *labels):
+        return sum(sum(cell[:-1]) for cell in self._series().get(labels, ()))
+
+    def render(self):
+        lines = self._header()
+        for labels, cells in sorted(self._series().items()):
+            totals = [sum(column) for column in zip(*cells)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), totals[:-1]):
+                cumulative += count
+                label_text = _label_text(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+            label_text = _label_text(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {totals[-1]}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A value read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, callback):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def render(self):
+        return self._header() + [f"{self.name} {self.callback()}"]
+
+
+class Registry:
+    """The set of metrics exposed by one worker."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, callback):
+        return self._register(Gauge(name, documentation, callback))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+
+"""
+Record finished games as compact transcripts and replay them in bulk.
+
+A SustainabilityGame is fully determined by its seed and the moves it
+accepted, so a transcript stores just those plus the final state the game
+reached. Replaying a transcript under the current rules and comparing final
+states shows which recorded games would now end differently, e.g. after a
+balance change:
+
+    python replay.py transcripts.hkt
+    python replay.py day1.hkt day2.hkt --json
+
+Transcript files are append-only: a magic header, then records framed as
+``<length:u32><crc32:u32><payload>``. Move names are written once as symbol
+records and each move is a single byte, so a typical game takes about 60
+bytes. Files are read in fixed-size chunks, never whole, and with NumPy
+installed games are replayed in batches through batch_engine; without it,
+one at a time.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import content_store
+from sustainability_game import SustainabilityGame, rules_hash
+
+MAGIC = b"HKTR1"
+SYMBOL, RULES, GAME = range(3)
+MAX_SYMBOLS = 256
+# Longer games are replayed one at a time rather than padding a whole batch.
+MAX_BATCH_MOVES = 1000
+
+_FRAME = struct.Struct("<II")
+_SYMBOL = struct.Struct("<BB")
+_GAME = struct.Struct("<BIHiidB")
+
+logger = logging.getLogger(__name__)
+
+
+def move_token(kind, arg):
+    """Encode a (kind, arg) move as a string such as "action:rest" or "end_day"."""
+    return kind if arg is None else f"{kind}:{arg}"
+
+
+def parse_token(token):
+    """Decode a move token back into a (kind, arg) pair."""
+    kind, _, arg = token.partition(":")
+    return kind, arg or None
+
+
+def final_state(game):
+    """The fields a replay is checked against: days, energy, eco points, sustainability."""
+    return (game.days, game.energy, game.eco_points, game.sustainability_level)
+
+
+class Transcript:
+    """One recorded game: its seed, player, moves and the final state it reached."""
+
+    __slots__ = ("rules_version", "seed", "player_name", "final", "codes", "symbols")
+
+    def __init__(self, rules_version, seed, player_name, final, codes, symbols):
+        self.rules_version = rules_version
+        self.seed = seed
+        self.player_name = player_name
+        self.final = final
+        self.codes = codes
+        self.symbols = symbols
+
+    @property
+    def moves(self):
+        symbols = self.symbols
+        return [parse_token(symbols[code]) for code in self.codes]
+
+
+class TranscriptWriter:
+    """Appends finished games to a transcript file; safe to share between threads.
+
+    Games are stamped with the hash of the rules they were played under:
+    `rules_version` if given, else that of the current content, so games
+    written after a content reload are filed under the new rules.
+    """
+
+    def __init__(self, path, rules_version=None):
+        self.path = path
+        self.rules_version = rules_version
+        self._lock = threading.Lock()
+        self._symbols = {}
+        self._written_version = None
+        self._content_version = self._content_rules = None
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+
+    def _current_rules(self):
+        if self.rules_version is not None:
+            return self.rules_version
+        content = content_store.current()
+        if content.version != self._content_version:
+            self._content_rules = rules_hash(content.locations, content.action_impacts)
+            self._content_version = content.version
+        return self._content_rules
+
+    def _stamp(self):
+        version = self._current_rules()
+        if version != self._written_version:
+            # Readers start a new symbol table at every rules record.
+            self._frame(bytes([RULES]) + version.encode())
+            self._written_version = version
+            self._symbols = {}
+
+    def _frame(self, payload):
+        self._file.write(_FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+
+    def _codes(self, game):
+        tokens = [move_token(kind, arg) for kind, arg in game.moves]
+        new = set(tokens).difference(self._symbols)
+        if len(self._symbols) + len(new) > MAX_SYMBOLS:
+            # Numbers are redefined from 0; readers follow the latest definition.
+            self._symbols = {}
+            new = set(tokens)
+        for token in sorted(new):
+            number = self._symbols[token] = len(self._symbols)
+            self._frame(_SYMBOL.pack(SYMBOL, number) + token.encode())
+        symbols = self._symbols
+        return bytes(symbols[token] for token in tokens)
+
+    def write(self, game):
+        """Record a finished game."""
+        name = game.player_name.encode()[:255]
+        with self._lock:
+            self._stamp()
+            codes = self._codes(game)
+            days, energy, eco_points, sustainability = final_state(game)
+            self._frame(_GAME.pack(GAME, game.seed, days, energy, eco_points, float(sustainability), len(name))
+                        + name + codes)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _frames(f, chunk_size):
+    """Yield record payloads from a file read `chunk_size` bytes at a time."""
+    data, offset = b"", 0
+    while True:
+        chunk = f.read(chunk_size)
+        data, offset = data[offset:] + chunk, 0
+        while offset + _FRAME.size <= len(data):
+            length, checksum = _FRAME.unpack_from(data, offset)
+            end = offset + _FRAME.size + length
+            if end > len(data):
+                break
+            payload = data[offset + _FRAME.size:end]
+            if zlib.crc32(payload) != checksum:
+                logger.warning("Stopping at a corrupt record in %s", f.name)
+                return
+            yield payload
+            offset = end
+        if not chunk:
+            if offset < len(data):
+                logger.warning("Stopping at a torn record at the end of %s", f.name)
+            return
+
+
+def read_transcripts(path, chunk_size=1 << 20):
+    """Stream the Transcripts in a file without loading it whole."""
+    rules_version, symbols = None, {}
+    table = ()
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a transcript file")
+        for payload in _frames(f, chunk_size):
+            kind = payload[0]
+            if kind == GAME:
+                _, seed, days, energy, eco_points, sustainability, name_length = _GAME.unpack_from(payload)
+                start = _GAME.size + name_length
+                yield Transcript(rules_version, seed, payload[_GAME.size:start].decode(),
+                                 (days, energy, eco_points, sustainability), payload[start:], table)
+            elif kind == SYMBOL:
+                _, number = _SYMBOL.unpack_from(payload)
+                symbols[number] = payload[_SYMBOL.size:].decode()
+                # Transcripts share one symbol tuple until the next definition.
+                table = tuple(symbols.get(index, "") for index in range(max(symbols) + 1))
+            elif kind == RULES:
+                rules_version, symbols, table = payload[1:].decode(), {}, ()
+
+
+def replay_game(transcript):
+    """Re-run a transcript under the current rules; return the new game."""
+    game = SustainabilityGame(seed=transcript.seed)
+    game.player_name = transcript.player_name
+    for kind, arg in transcript.moves:
+        game.apply_move(kind, arg)
+    return game
+
+
+class ReplayReport:
+    """Counts of replayed and mismatched games, with the first few mismatches."""
+
+    def __init__(self, max_examples=10):
+        self.games = 0
+        self.mismatches = 0
+        self.examples = []
+        self.max_examples = max_examples
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        return not self.mismatches
+
+    def mismatch(self, transcript, game):
+        self.mismatches += 1
+        if len(self.examples) < self.max_examples:
+            fields = ("days", "energy", "eco_points", "sustainability")
+            self.examples.append({
+                "seed": transcript.seed,
+                "player_name": transcript.player_name,
+                "rules_version": transcript.rules_version,
+                "recorded": dict(zip(fields, transcript.final)),
+                "replayed": dict(zip(fields, final_state(game))),
+            })
+
+    def as_dict(self):
+        return {
+            "games": self.games,
+            "mismatches": self.mismatches,
+            "seconds": round(self.elapsed, 3),
+            "games_per_second": round(self.games / self.elapsed) if self.elapsed else None,
+            "examples": self.examples,
+        }
+
+
+def _verify_scalar(transcript, report):
+    game = replay_game(transcript)
+    if final_state(game) != transcript.final:
+        report.mismatch(transcript, game)
+
+
+def _batch_engine():
+    # Imported on first use, so the app can write transcripts without loading NumPy.
+    try:
+        import batch_engine
+    except ImportError:  # NumPy is optional; replay falls back to one game at a time.
+        return None
+    return batch_engine
+
+
+def _move_codes(symbols, cache):
+    """Map a symbol table onto batch_engine move codes; moves the rules reject become NOOP."""
+    import numpy as np
+
+    import batch_engine
+
+    codes = cache.get(symbols)
+    if codes is None:
+        actions = {name: code for code, name in enumerate(batch_engine.ACTION_NAMES)}
+        locations = {name: batch_engine.TRAVEL_BASE + code for code, name in enumerate(batch_engine.LOCATION_NAMES)}
+        codes = np.full(MAX_SYMBOLS, batch_engine.NOOP, dtype=np.int8)
+        for number, token in enumerate(symbols):
+            kind, arg = parse_token(token)
+            if kind == "action":
+                codes[number] = actions.get(arg, batch_engine.NOOP)
+            elif kind == "travel":
+                codes[number] = locations.get(arg, batch_engine.NOOP)
+            elif kind == "end_day":
+                codes[number] = batch_engine.END_DAY
+        codes = cache[symbols] = codes
+    return codes
+
+
+def _verify_batch(transcripts, report, cache):
+    import numpy as np
+
+    import batch_engine
+
+    # Longest games first, so the games still in play are always a prefix.
+    transcripts = sorted(transcripts, key=lambda transcript: len(transcript.codes), reverse=True)
+    count = len(transcripts)
+    lengths = np.fromiter((len(transcript.codes) for transcript in transcripts), dtype=np.int64, count=count)
+    steps = int(lengths[0])
+
+    # Scatter every game's moves into a (steps, games) matrix in one go,
+    # translating each through its own symbol table.
+    tables = {}
+    row_tables = np.fromiter((tables.setdefault(transcript.symbols, len(tables)) for transcript in transcripts),
+                             dtype=np.int64, count=count)
+    translate = np.stack([_move_codes(symbols, cache) for symbols in tables])
+    codes = np.frombuffer(b"".join(transcript.codes for transcript in transcripts), dtype=np.uint8)
+    rows = np.repeat(np.arange(count), lengths)
+    columns = np.arange(len(codes)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    history = np.full((steps, count), batch_engine.NOOP, dtype=np.int8)
+    history[columns, rows] = translate[np.repeat(row_tables, lengths), codes]
+
+    # Step only the games that still have moves, compacting as they finish.
+    active = count - np.searchsorted(lengths[::-1], np.arange(steps), side="right")
+    games = working = batch_engine.BatchGame(count)
+    size = count
+    for step, moves in enumerate(history):
+        if active[step] <= size // 2:
+            if working is not games:
+                games.put(slice(0, size), working)
+            size = int(active[step])
+            working = games.take(slice(0, size))
+        working.step(moves[:size])
+    if working is not games:
+        games.put(slice(0, size), working)
+
+    days, energy, eco_points, sustainability = (np.array(field) for field in zip(*(t.final for t in transcripts)))
+    differ = ((games.day != days) | (games.energy != energy) | (games.eco_points != eco_points)
+              | (games.sustainability != sustainability))
+    for row in np.flatnonzero(differ):
+        # Re-run mismatches one at a time for the report.
+        _verify_scalar(transcripts[row], report)
+
+
+def verify(transcripts, batch_size=65536, vectorized=None, max_examples=10):
+    """Replay an iterable of Transcripts and compare final states; returns a ReplayReport.
+
+    `vectorized` defaults to True when NumPy is installed.
+    """
+    if vectorized is None:
+        vectorized = _batch_engine() is not None
+    report = ReplayReport(max_examples)
+    cache = {}
+    start = time.perf_counter()
+    transcripts = iter(transcripts)
+    while True:
+        chunk = list(itertools.islice(transcripts, batch_size))
+        if not chunk:
+            break
+        report.games += len(chunk)
+        if not vectorized:
+            for transcript in chunk:
+                _verify_scalar(transcript, report)
+            continue
+        batch = []
+        for transcript in chunk:
+            if len(transcript.codes) > MAX_BATCH_MOVES:
+                _verify_scalar(transcript, report)
+            else:
+                batch.append(transcript)
+        if batch:
+            _verify_batch(batch, report, cache)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded games and verify their final states")
+    parser.add_argument("paths", nargs="+", help="transcript files")
+    parser.add_argument("--batch-size", type=int, default=65536)
+    parser.add_argument("--scalar", action="store_true", help="replay one game at a time, without NumPy")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    transcripts = itertools.chain.from_iterable(read_transcripts(path) for path in args.paths)
+    report = verify(transcripts, args.batch_size, vectorized=False if args.scalar else None)
+    result = report.as_dict()
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Replayed {result['games']:,} games in {result['seconds']}s "
+              f"({result['games_per_second'] or 0:,} games/s): {result['mismatches']:,} mismatches")
+        for example in report.examples:
+            print(f"  seed {example['seed']} ({example['player_name']}, rules {example['rules_version']}): "
+                  f"recorded {example['recorded']}, replayed {example['replayed']}")
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+
+"""
+Game rooms: players who share a city, and the city's combined sustainability.
+
+Every action a player in a room performs adds its impact to the room's
+totals. A busy room takes thousands of updates a second from many worker
+threads, so the totals are kept in a ShardedCounter: each thread adds to
+its own shard under that shard's lock, and reads sum the shards. Writers
+on different threads almost never wait for each other, and reading the
+totals costs one pass over the shards. Like the leaderboard, rooms live in
+the memory of one worker process.
+
+A room counts the games in progress. A game leaves its room when it
+finishes, or after `ttl` seconds without moves, as it has expired from the
+store, and takes its actions and impact with it; so the totals and the
+average describe the games being played now, the same games event log
+recovery puts back after a restart. A room with no joins or actions for
+`ttl` seconds is dropped.
+"""
+
+import itertools
+import re
+import threading
+import time
+
+ROOM_NAME = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+SHARDS = 16
+
+# (upper bound, text) for sustainability_status, checked in order.
+STATUS_LEVELS = (
+    (5, "Hong Kong is still facing significant environmental challenges."),
+    (10, "Small improvements are visible in Hong Kong's environment."),
+    (20, "Your efforts are making a noticeable difference in Hong Kong!"),
+)
+TOP_STATUS = "Remarkable progress! Hong Kong is becoming a model for urban sustainability."
+
+
+def sustainability_status(level):
+    """Describe Hong Kong's environment at a sustainability level."""
+    for bound, text in STATUS_LEVELS:
+        if level < bound:
+            return text
+    return TOP_STATUS
+
+
+_thread_numbers = itertools.count()
+_thread_local = threading.local()
+
+
+def _thread_number():
+    """A small number per thread, given out in the order threads first ask."""
+    try:
+        return _thread_local.number
+    except AttributeError:
+        number = _thread_local.number = next(_thread_numbers)
+        return number
+
+
+def valid_room_name(name):
+    return isinstance(name, str) and ROOM_NAME.match(name) is not None
+
+
+class ShardedCounter:
+    """Running sums of a few fields, spread over independently locked shards.
+
+    Each thread always adds to the same shard, picked by its thread number
+    (thread idents are aligned addresses, which would all land on one
+    shard), so concurrent writers only share a lock when there are more
+    threads than shards.
+    """
+
+    def __init__(self, fields, shards=SHARDS):
+        self.fields = tuple(fields)
+        self._shards = [[0] * len(self.fields) for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def add(self, *values):
+        """Add one value per field."""
+        index = _thread_number() % len(self._shards)
+        shard = self._shards[index]
+        with self._locks[index]:
+            for i, value in enumerate(values):
+                shard[i] += value
+
+    def totals(self):
+        """The sum of each field over all shards, as a dict."""
+        totals = [0] * len(self.fields)
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                for i, value in enumerate(shard):
+                    totals[i] += value
+        return dict(zip(self.fields, totals))
+
+
+class Room:
+    """The players of one city and their combined impact.
+
+    Players are tracked by a member key (a game ID), so their share of the
+    totals can be taken out again when they leave or expire; a player who
+    joins without a key is counted for the life of the room.
+    """
+
+    FIELDS = ("players", "actions", "eco_points", "sustainability")
+
+    def __init__(self, name, shards=SHARDS, clock=time.monotonic):
+        self.name = name
+        self.clock = clock
+        self.touched = clock()
+        self._totals = ShardedCounter(self.FIELDS, shards)
+        # member -> [last seen, actions, eco points, sustainability]
+        self._members = {}
+        self._lock = threading.Lock()
+
+    def join(self, member=None, actions=0, eco_points=0, sustainability=0):
+        """Count a player, or mark a member as seen if already counted."""
+        now = self.touched = self.clock()
+        if member is not None:
+            entry = self._members.get(member)
+            if entry is not None:
+                entry[0] = now
+                return
+            with self._lock:
+                if member in self._members:
+                    return
+                self._members[member] = [now, actions, eco_points, sustainability]
+        self._totals.add(1, actions, eco_points, sustainability)
+
+    def record_action(self, eco_points, sustainability, member=None):
+        now = self.touched = self.clock()
+        self._totals.add(0, 1, eco_points, sustainability)
+        entry = self._members.get(member) if member is not None else None
+        if entry is not None:
+            entry[0] = now
+            entry[1] += 1
+            entry[2] += eco_points
+            entry[3] += sustainability
+
+    def leave(self, member):
+        """Take a member and its share of the totals out of the room."""
+        with self._lock:
+            entry = self._members.pop(member, None)
+        if entry is not None:
+            self._totals.add(-1, -entry[1], -entry[2], -entry[3])
+
+    def expire(self, cutoff):
+        """Take out every member not seen since `cutoff`."""
+        with self._lock:
+            gone = [member for member, entry in self._members.items() if entry[0] < cutoff]
+        for member in gone:
+            self.leave(member)
+
+    def add_game(self, game_id, game):
+        """Count a game already in progress, e.g. one recovered from the event log."""
+        actions = sum(1 for kind, _ in game.moves if kind == "action")
+        self.join(game_id, actions, game.eco_points, game.sustainability_level)
+
+    def __len__(self):
+        return len(self._members)
+
+    def state(self):
+        """The room's totals, its average sustainability per player in progress and the city's status."""
+        totals = self._totals.totals()
+        average = totals["sustainability"] / totals["players"] if totals["players"] else 0.0
+        return {
+            "room": self.name,
+            "players": totals["players"],
+            "actions": totals["actions"],
+            "eco_points": totals["eco_points"],
+            "sustainability": round(totals["sustainability"], 1),
+            "average_sustainability": round(average, 1),
+            "status": sustainability_status(average),
+        }
+
+
+class Rooms:
+    """Rooms by name, created on first use and dropped after `ttl` idle seconds.
+
+    Idle rooms and members are swept at most once per `sweep_interval`
+    seconds, when a room is looked up.
+    """
+
+    def __init__(self, shards=SHARDS, ttl=3600, sweep_interval=60, clock=time.monotonic):
+        self.shards = shards
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self._next_sweep = clock() + sweep_interval
+        self._rooms = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, create=True):
+        if self.clock() >= self._next_sweep:
+            self._sweep()
+        room = self._rooms.get(name)
+        if room is None and create:
+            with self._lock:
+                room = self._rooms.get(name)
+                if room is None:
+                    room = self._rooms[name] = Room(name, self.shards, self.clock)
+        return room
+
+    def _sweep(self):
+        with self._lock:
+            now = self.clock()
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.sweep_interval
+            for name in [name for name, room in self._rooms.items() if now - room.touched > self.ttl]:
+                del self._rooms[name]
+            rooms = list(self._rooms.values())
+        for room in rooms:
+            room.expire(now - self.ttl)
+
+    def record(self, game_id, game, moves, rules):
+        """Feed the (kind, arg) moves just applied to a game into its room.
+
+        A game the room does not know yet, e.g. one started before a
+        restart, joins it here; a game the moves finished leaves it.
+        """
+        room = self.get(game.room)
+        room.join(game_id)
+        for kind, arg in moves:
+            if kind == "action":
+                action_id = rules.action_ids[arg]
+                room.record_action(rules.eco_points[action_id], rules.sustainability[action_id], game_id)
+        if game.is_over():
+            room.leave(game_id)
+
+    def __len__(self):
+        return len(self._rooms)
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+
+"""
+Consistent-hash routing of games across several app.py nodes.
+
+Each node keeps the games it owns in its own in-memory store. HashRing
+places every node at VNODES points on a 64-bit ring, and a game belongs to
+the first node point after the hash of its ID, so each node owns many
+small arcs and a membership change only moves the games on the arcs that
+change hands: about 1/N of them when a node joins, and only the leaving
+node's games when one leaves.
+
+Router is a WSGI reverse proxy in front of the nodes. Requests that name a
+game, by the game ID in the Flask session (/game, /action/<action>,
+/change_location/<location>, /end_day, ...) or in the URL (/api/v1/games/
+<game_id>/...), go to the game's owner; everything else is spread round
+robin. Nodes mint game IDs that hash to themselves, so a game started on
+any node is already on its owner.
+
+On a membership change (Router.set_nodes, or POST /_cluster/nodes) the
+router:
+
+1. sends the new node list to every node (POST /internal/ring), which
+   keeps the old ring as its `previous` ring;
+2. switches its own ring, so requests go to the new owners;
+3. asks every node to hand off the games it no longer owns (POST
+   /internal/handoff), which it sends in batches to their new owners;
+4. once every game has moved, tells the nodes to drop their previous ring
+   (POST /internal/handoff/done).
+
+A new owner asked for a game it does not have yet pulls it from the owner
+under the previous ring, so games keep working while the handoff runs.
+Node-to-node and router-to-node calls carry a token derived from the
+shared secret key, so nodes refuse to start without GAME_SECRET_KEY.
+Rooms and the leaderboard stay per node.
+
+Run three local nodes behind a router on port 8000:
+
+    python router.py --local 3 --port 8000
+"""
+
+import argparse
+import bisect
+import hashlib
+import hmac
+import http.client
+import itertools
+import json
+import os
+import secrets
+import select
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+
+VNODES = 128
+TOKEN_HEADER = "X-Cluster-Token"
+NODE_HEADER = "X-Game-Node"
+# Routes that find their game through the session cookie.
+SESSION_ROUTES = ("/game", "/action/", "/change_location/", "/end_day", "/random_tip", "/game_over")
+GAME_ROUTE = "/api/v1/games/"
+HOP_BY_HOP = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te",
+              "trailer", "transfer-encoding", "upgrade"}
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+def cluster_token(secret_key):
+    """The token nodes and the router use to authenticate internal calls."""
+    if isinstance(secret_key, str):
+        secret_key = secret_key.encode()
+    return hmac.new(secret_key, b"game-cluster", hashlib.sha256).hexdigest()
+
+
+class HashRing:
+    """An immutable consistent-hash ring of node names with virtual nodes."""
+
+    def __init__(self, nodes=(), vnodes=VNODES):
+        self.nodes = tuple(dict.fromkeys(nodes))
+        self.vnodes = vnodes
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key):
+        """The node that owns a key, or None on an empty ring."""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key))
+        return self._owners[index % len(self._owners)]
+
+    def with_nodes(self, nodes):
+        """A ring over other nodes with the same number of virtual nodes."""
+        return HashRing(nodes, self.vnodes)
+
+    def __contains__(self, node):
+        return node in self.nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+def call_node(node, path, token, body=b"", content_type="application/json", timeout=30):
+    """POST or, without a body, GET an internal route on a node; return (status, body)."""
+    request = urllib.request.Request(node.rstrip("/") + path, data=body or None,
+                                     headers={TOKEN_HEADER: token, "Content-Type": content_type},
+                                     method="POST" if body else "GET")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.read()
+
+
+class Router:
+    """WSGI reverse proxy that sends each game's requests to the node that owns it."""
+
+    def __init__(self, nodes, secret_key, vnodes=VNODES, timeout=30):
+        from flask import Flask
+
+        # The session cookie is read with the nodes' own signing serializer.
+        signer = Flask(__name__)
+        signer.secret_key = secret_key
+        self._sessions = signer.session_interface.get_signing_serializer(signer)
+        self._session_cookie = signer.config["SESSION_COOKIE_NAME"]
+        self.token = cluster_token(secret_key)
+        self.ring = HashRing(nodes, vnodes)
+        self.timeout = timeout
+        self._next = itertools.count()
+        self._local = threading.local()
+        self._membership = threading.Lock()
+
+    # Routing
+
+    def game_id(self, environ):
+        """The ID of the game a request is for, if any."""
+        path = environ.get("PATH_INFO", "")
+        if path.startswith(GAME_ROUTE):
+            return path[len(GAME_ROUTE):].split("/", 1)[0] or None
+        if path.startswith(SESSION_ROUTES):
+            from werkzeug.http import parse_cookie
+
+            cookie = parse_cookie(environ.get("HTTP_COOKIE", "")).get(self._session_cookie)
+            if cookie:
+                try:
+                    return self._sessions.loads(cookie).get("game_id")
+                except Exception:
+                    return None
+        return None
+
+    def node_for(self, environ):
+        ring = self.ring
+        game_id = self.game_id(environ)
+        if game_id is not None:
+            return ring.node_for(game_id)
+        return ring.nodes[next(self._next) % len(ring.nodes)]
+
+    # Membership
+
+    def set_nodes(self, nodes):
+        """Change the cluster's members and hand games off to their new owners.
+
+        Returns {node: games it handed off}. A node that cannot be reached
+        does not stop the others from handing off; it is reported by a
+        RuntimeError at the end, and the nodes keep pulling missing games
+        from their previous owners.
+        """
+        with self._membership:
+            old = self.ring
+            new = old.with_nodes(nodes)
+            everyone = list(dict.fromkeys(old.nodes + new.nodes))
+            payload = json.dumps({"nodes": list(new.nodes)}).encode()
+            for node in everyone:
+                self._internal(node, "/internal/ring", payload)
+            self.ring = new
+            moved, left, failed = {}, 0, []
+            for node in old.nodes:
+                try:
+                    result = json.loads(self._internal(node, "/internal/handoff", b"{}"))
+                except (OSError, RuntimeError) as exc:
+                    failed.append(f"{node}: {exc}")
+                    continue
+                moved[node] = result["moved"]
+                left += result["left"]
+            if failed:
+                raise RuntimeError("handoff failed on " + "; ".join(failed))
+            if not left:
+                for node in new.nodes:
+                    self._internal(node, "/internal/handoff/done", b"{}")
+            return moved
+
+    def _internal(self, node, path, body):
+        status, data = call_node(node, path, self.token, body, timeout=self.timeout)
+        if status != 200:
+            raise RuntimeError(f"{node}{path} returned {status}: {data[:200]!r}")
+        return data
+
+    # Proxying
+
+    def _connection(self, node):
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        connection = connections.get(node)
+        if connection is not None and _dropped(connection):
+            # The node closed this kept-alive connection while it was idle.
+            connection.close()
+            connection = None
+        if connection is None:
+            parts = urlsplit(node)
+            connection = connections[node] = http.client.HTTPConnection(parts.hostname, parts.port,
+                                                                         timeout=self.timeout)
+        return connection
+
+    def _drop(self, node, connection):
+        connection.close()
+        self._local.connections.pop(node, None)
+
+    def _forward(self, node, method, target, headers, body):
+        """Send a request to a node and return its response.
+
+        A request is sent again only if sending it failed. Once it has gone
+        out the node may have applied it, and moves are not idempotent, even
+        over GET, so a failure after that is the caller's 502.
+        """
+        for attempt in range(2):
+            connection = self._connection(node)
+            try:
+                connection.request(method, target, body=body, headers=headers)
+            except (http.client.HTTPException, OSError):
+                self._drop(node, connection)
+                if attempt:
+                    raise
+                continue
+            try:
+                return connection, connection.getresponse()
+            except (http.client.HTTPException, OSError):
+                self._drop(node, connection)
+                raise
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if path == "/_cluster/nodes":
+            return self._membership_view(environ, start_response)
+        node = self.node_for(environ)
+        target = path + ("?" + environ["QUERY_STRING"] if environ.get("QUERY_STRING") else "")
+        headers = {name[5:].replace("_", "-").title(): value
+                   for name, value in environ.items() if name.startswith("HTTP_")}
+        headers.pop("Connection", None)
+        if environ.get("CONTENT_TYPE"):
+            headers["Content-Type"] = environ["CONTENT_TYPE"]
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        body = environ["wsgi.input"].read(length) if length else None
+        if body is not None:
+            headers["Content-Length"] = str(length)
+
+        connection = None
+        try:
+            connection, response = self._forward(node, environ["REQUEST_METHOD"], target, headers, body)
+            streamed = response.getheader("Content-Length") is None
+            data = None if streamed else response.read()
+        except (http.client.HTTPException, OSError):
+            if connection is not None:
+                self._drop(node, connection)
+            start_response("502 Bad Gateway", [("Content-Type", "text/plain"), (NODE_HEADER, node)])
+            return [b"Bad Gateway"]
+        response_headers = [(name, value) for name, value in response.getheaders()
+                            if name.lower() not in HOP_BY_HOP]
+        response_headers.append((NODE_HEADER, node))
+        start_response(f"{response.status} {response.reason}", response_headers)
+        if not streamed:
+            return [data]
+        # Event streams: pass chunks on as they arrive, on a connection of their own.
+        self._local.connections.pop(node, None)
+        return _stream(response)
+
+    def _membership_view(self, environ, start_response):
+        if not hmac.compare_digest(environ.get("HTTP_X_CLUSTER_TOKEN", ""), self.token):
+            start_response("403 Forbidden", [("Content-Type", "text/plain")])
+            return [b"Forbidden"]
+        if environ["REQUEST_METHOD"] == "POST":
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+            nodes = json.loads(environ["wsgi.input"].read(length))["nodes"]
+            body = {"nodes": nodes, "moved": self.set_nodes(nodes)}
+        else:
+            body = {"nodes": list(self.ring.nodes)}
+        start_response("200 OK", [("Content-Type", "application/json")])
+        return [json.dumps(body).encode()]
+
+
+def _dropped(connection):
+    """True if the peer has closed an idle connection (it is readable with nothing to read)."""
+    sock = connection.sock
+    if sock is None:
+        return False
+    try:
+        return bool(select.select([sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+def _stream(response):
+    try:
+        while True:
+            chunk = response.read1(65536)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        response.close()
+
+
+# Local clusters
+
+def spawn_node(port, nodes, secret_key=None, host="127.0.0.1", env=None):
+    """Start an app.py node process on a port; returns the Popen once it answers."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    url = f"http://{host}:{port}"
+    environment = dict(os.environ, GAME_NODE=url, GAME_NODES=",".join(nodes), GAME_METRICS="0", **(env or {}))
+    if secret_key is not None:
+        environment["GAME_SECRET_KEY"] = secret_key
+    process = subprocess.Popen(
+        [sys.executable, "-c", "import sys, app; from werkzeug.serving import run_simple; "
+                               "run_simple(sys.argv[1], int(sys.argv[2]), app.app, threaded=True)", host, str(port)],
+        cwd=root, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"node on port {port} exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(url + "/", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"node on port {port} did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--nodes", default="", help="comma-separated node URLs, e.g. http://10.0.0.2:5000")
+    parser.add_argument("--local", type=int, default=0, help="start this many nodes on the following ports")
+    parser.add_argument("--vnodes", type=int, default=VNODES)
+    args = parser.parse_args(argv)
+
+    from werkzeug.serving import run_simple
+
+    # Local nodes share a fresh key unless one is given.
+    secret_key = os.environ.get("GAME_SECRET_KEY") or secrets.token_hex(16)
+    nodes = [node for node in args.nodes.split(",") if node]
+    ports = range(args.port + 1, args.port + 1 + args.local)
+    nodes += [f"http://127.0.0.1:{port}" for port in ports]
+    processes = [spawn_node(port, nodes, secret_key) for port in ports]
+    try:
+        run_simple("127.0.0.1", args.port, Router(nodes, secret_key, args.vnodes), threaded=True)
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
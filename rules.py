@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+"""
+Game rules compiled from the content's location and action tables.
+
+compile_rules() checks every reference once, when content is loaded, and
+lays the tables out as integer-indexed tuples:
+
+    action_ids["rest"]                  -> action id
+    eco_points[id], energy[id],
+    sustainability[id]                  the impact of that action
+    location_ids["park"]                -> location id
+    location_actions[location id]       the action ids offered there
+
+so applying an action is three tuple lookups. SustainabilityGame, and
+through it the web app, as well as the batch engine, the solver and the
+simulators all read the same compiled table from content_store.
+"""
+
+import difflib
+from numbers import Real
+
+START_LOCATION = "home"
+IMPACT_FIELDS = ("eco_points", "energy", "sustainability")
+
+
+class RuleError(ValueError):
+    """Raised when the location and action tables do not fit together."""
+
+
+class RuleTable:
+    """Integer-indexed location and action tables; build with compile_rules()."""
+
+    __slots__ = ("action_names", "action_ids", "eco_points", "energy", "sustainability",
+                 "location_names", "location_ids", "location_actions", "start_location")
+
+    def apply(self, state, action_id):
+        """Apply an action's impact to a game state in place."""
+        state.eco_points += self.eco_points[action_id]
+        state.energy += self.energy[action_id]
+        state.sustainability_level += self.sustainability[action_id]
+
+    def actions_at(self, location):
+        """Names of the actions offered at a location."""
+        names = self.action_names
+        return [names[action_id] for action_id in self.location_actions[self.location_ids[location]]]
+
+
+def _validate(locations, action_impacts):
+    problems = []
+    for action, impact in action_impacts.items():
+        for field in IMPACT_FIELDS:
+            value = impact.get(field)
+            if not isinstance(value, Real) or isinstance(value, bool):
+                problems.append(f"action {action!r} needs a numeric {field!r}, got {value!r}")
+        for field in ("eco_points", "energy"):
+            if isinstance(impact.get(field), float):
+                problems.append(f"action {action!r} needs a whole number for {field!r}")
+    if START_LOCATION not in locations:
+        problems.append(f"start location {START_LOCATION!r} is missing")
+    for location, data in locations.items():
+        for action in data.get("actions", ()):
+            if action not in action_impacts:
+                close = difflib.get_close_matches(action.lower(), list(action_impacts), n=1)
+                hint = f" (did you mean {close[0]!r}?)" if close else ""
+                problems.append(f"location {location!r} offers unknown action {action!r}{hint}")
+    if problems:
+        raise RuleError("Invalid rule tables: " + "; ".join(problems))
+
+
+def compile_rules(locations, action_impacts):
+    """Validate the location and action tables and compile them into a RuleTable."""
+    _validate(locations, action_impacts)
+    rules = RuleTable()
+    rules.action_names = tuple(action_impacts)
+    rules.action_ids = {name: index for index, name in enumerate(rules.action_names)}
+    rules.eco_points = tuple(action_impacts[name]["eco_points"] for name in rules.action_names)
+    rules.energy = tuple(action_impacts[name]["energy"] for name in rules.action_names)
+    rules.sustainability = tuple(action_impacts[name]["sustainability"] for name in rules.action_names)
+    rules.location_names = tuple(locations)
+    rules.location_ids = {name: index for index, name in enumerate(rules.location_names)}
+    rules.location_actions = tuple(tuple(rules.action_ids[action] for action in data.get("actions", ()))
+                                   for data in locations.values())
+    rules.start_location = rules.location_ids[START_LOCATION]
+    return rules
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+"""
+No-repeat sampling of facts and tips with a few bytes of state per player.
+
+A player's position in a pool is a single integer cursor packing a 32-bit
+seed and a 16-bit position. Each seed selects an affine permutation
+``i -> (a * i + b) mod n`` of the pool, applied on top of a fixed shuffle
+shared by all players, so drawing the next item is O(1) and never copies
+or filters the pool. Every item is handed out once before any repeats;
+after a full cycle the seed is advanced and a new order begins.
+"""
+
+import random
+from math import gcd
+
+import content_store
+
+_POSITION_BITS = 16
+_POSITION_MASK = (1 << _POSITION_BITS) - 1
+_SEED_MASK = 0xFFFFFFFF
+
+
+def cursor_for(seed):
+    """Return the cursor at the start of the order selected by a 32-bit seed."""
+    return (seed & _SEED_MASK) << _POSITION_BITS
+
+
+def cursor_seed(cursor):
+    """Return the seed a cursor is currently following."""
+    return cursor >> _POSITION_BITS
+
+
+def _next_seed(seed):
+    # 32-bit LCG step (Numerical Recipes constants).
+    return (seed * 1664525 + 1013904223) & _SEED_MASK
+
+
+class Sampler:
+    """Hands out the items of a fixed pool in a per-player shuffled order."""
+
+    def __init__(self, items, shuffle_seed=0):
+        self.items = tuple(items)
+        n = len(self.items)
+        if not n or n > _POSITION_MASK:
+            raise ValueError(f"Sampler pools must hold 1 to {_POSITION_MASK} items")
+        order = list(range(n))
+        random.Random(shuffle_seed).shuffle(order)
+        self._order = tuple(order)
+        # Multipliers coprime with n give permutations; 1 and n-1 are skipped
+        # when possible because they only rotate or reverse the shared order.
+        units = [a for a in range(1, n) if gcd(a, n) == 1]
+        self._multipliers = tuple(a for a in units if a not in (1, n - 1)) or tuple(units) or (1,)
+
+    def __len__(self):
+        return len(self.items)
+
+    def draw(self, cursor):
+        """Return (item, next_cursor) for the given cursor."""
+        seed, position = cursor >> _POSITION_BITS, cursor & _POSITION_MASK
+        n = len(self.items)
+        if position >= n:
+            # The pool shrank under a content reload; start a new cycle.
+            seed, position = _next_seed(seed), 0
+        multiplier = self._multipliers[seed % len(self._multipliers)]
+        offset = (seed // len(self._multipliers)) % n
+        item = self.items[self._order[(multiplier * position + offset) % n]]
+        position += 1
+        if position == n:
+            seed, position = _next_seed(seed), 0
+        return item, (seed << _POSITION_BITS) | position
+
+
+class SamplerSet:
+    """The facts, tips and per-location fact samplers for one content version."""
+
+    def __init__(self, content):
+        self.version = content.version
+        self.facts = Sampler(content.facts)
+        self.tips = Sampler(content.tips)
+        self.location_facts = {location: Sampler(facts) for location, facts in content.location_facts.items()}
+
+
+def location_fact(location, seed, day):
+    """Return the fact shown at `location` on `day` of the game seeded by `seed`.
+
+    A player sees the location's facts in their own order, one per day, so
+    the fact needs no per-player state beyond the seed the game already has.
+    Returns None for locations without facts.
+    """
+    samplers = current().location_facts.get(location)
+    if samplers is None:
+        return None
+    fact, _ = samplers.draw(cursor_for(seed) | (day - 1) % len(samplers))
+    return fact
+
+
+_current = None
+
+
+def current():
+    """Return the samplers for the current content version."""
+    global _current
+    content = content_store.current()
+    samplers = _current
+    if samplers is None or samplers.version != content.version:
+        samplers = _current = SamplerSet(content)
+    return samplers
+
+
+def __getattr__(name):
+    # FACTS, TIPS and LOCATION_FACTS hold the samplers for the content loaded
+    # on first use; building them is left until then to keep imports fast.
+    attributes = {"FACTS": "facts", "TIPS": "tips", "LOCATION_FACTS": "location_facts"}
+    if name not in attributes:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = getattr(current(), attributes[name])
+    return value
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+"""
+Full-text search over the game's facts, location facts and tips.
+
+Every string is tokenized (lowercase words, stop words dropped) and
+stemmed with a small suffix-stripping stemmer, so "recycling", "recycled"
+and "recycles" meet at "recycl". The index maps each stem to a postings
+list of (document, BM25 impact), with the whole BM25 term weight
+precomputed per posting, so a query only adds up a few short lists.
+
+Indexes are written to a flat binary file next to the content file
+(content/content.json.index) and opened with mmap, so a restart with
+unchanged content loads it without parsing or scoring anything:
+
+    header      magic, content version, counts and blob sizes
+    u32[]       term offsets into the term blob, then postings offsets
+    u32[]       postings: document numbers
+    f32[]       postings: BM25 impacts
+    u32[]       document offsets into the text blob
+    u8[]        document kind and location number
+    blobs       terms, texts and location names, UTF-8
+
+IndexStore.current() follows a content_store.ContentStore: when the content version
+changes it builds a new index, reusing the token counts of every string
+it has seen before, and swaps it in.
+"""
+
+import array
+import heapq
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import Counter
+
+import content_store
+
+K1 = 1.2
+B = 0.75
+FACT, LOCATION_FACT, TIP = range(3)
+KIND_NAMES = ("fact", "location_fact", "tip")
+NO_LOCATION = 255
+MAX_LIMIT = 50
+
+_MAGIC = b"HKIX1"
+_HEADER = struct.Struct("<5s3x16sIIIIII")
+_WORD = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a about an and are as at be been but by can for from has have if in into is it its of on or "
+    "our so than that the their them there these they this to up was were what when which while "
+    "who will with you your".split())
+# Checked in order; the first suffix that leaves a stem of MIN_STEM letters wins.
+# "ss" maps to itself so words like "glass" keep their last "s".
+_SUFFIXES = (("ational", "ate"), ("ization", "ize"), ("ations", "ate"), ("ation", "ate"),
+             ("ness", ""), ("ments", ""), ("ment", ""), ("ingly", ""), ("ings", ""), ("ing", ""),
+             ("edly", ""), ("ies", "y"), ("ied", "y"), ("sses", "ss"), ("ss", "ss"), ("ed", ""),
+             ("ly", ""), ("es", ""), ("s", ""))
+MIN_STEM = 3
+
+logger = logging.getLogger(__name__)
+
+
+def stem(word):
+    """Reduce a lowercase word to its stem."""
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix):
+            if len(word) - len(suffix) >= MIN_STEM:
+                word = word[:-len(suffix)] + replacement
+            break
+    if len(word) > MIN_STEM and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    """The stems of the words of a text, stop words removed."""
+    return [stem(word) for word in _WORD.findall(text.lower()) if word not in STOP_WORDS]
+
+
+def documents(content):
+    """(kind, location, text) for every searchable string of a content version."""
+    docs = [(FACT, None, fact) for fact in content.facts]
+    docs += [(LOCATION_FACT, location, fact)
+             for location, facts in content.location_facts.items() for fact in facts]
+    docs += [(TIP, None, tip) for tip in content.tips]
+    return docs
+
+
+def build(version, docs, analyzed=None):
+    """Encode an index of (kind, location, text) documents; returns the file's bytes.
+
+    `analyzed` maps texts to their term counts and is reused and extended,
+    so a rebuild only tokenizes strings it has not seen.
+    """
+    analyzed = {} if analyzed is None else analyzed
+    counts = []
+    for _, _, text in docs:
+        terms = analyzed.get(text)
+        if terms is None:
+            terms = analyzed[text] = Counter(tokenize(text))
+        counts.append(terms)
+    lengths = [sum(terms.values()) for terms in counts]
+    average = sum(lengths) / len(lengths) if lengths else 0.0
+
+    postings = {}
+    for doc, terms in enumerate(counts):
+        for term, frequency in terms.items():
+            postings.setdefault(term, []).append((doc, frequency))
+    terms = sorted(postings)
+
+    term_blob = bytearray()
+    term_offsets = array.array("I", [0])
+    post_offsets = array.array("I", [0])
+    post_docs = array.array("I")
+    impacts = array.array("f")
+    for term in terms:
+        term_blob += term.encode()
+        term_offsets.append(len(term_blob))
+        entries = postings[term]
+        idf = math.log(1 + (len(docs) - len(entries) + 0.5) / (len(entries) + 0.5))
+        for doc, frequency in entries:
+            norm = K1 * (1 - B + B * lengths[doc] / average)
+            post_docs.append(doc)
+            impacts.append(idf * frequency * (K1 + 1) / (frequency + norm))
+        post_offsets.append(len(post_docs))
+
+    locations = sorted({location for _, location, _ in docs if location is not None})
+    location_numbers = {location: number for number, location in enumerate(locations)}
+    text_blob = bytearray()
+    doc_offsets = array.array("I", [0])
+    doc_meta = bytearray()
+    for kind, location, text in docs:
+        text_blob += text.encode()
+        doc_offsets.append(len(text_blob))
+        doc_meta += bytes((kind, NO_LOCATION if location is None else location_numbers[location]))
+    doc_meta += bytes(-len(doc_meta) % 4)
+    location_blob = "\n".join(locations).encode()
+
+    header = _HEADER.pack(_MAGIC, version.encode().ljust(16)[:16], len(docs), len(terms), len(post_docs),
+                          len(term_blob), len(text_blob), len(location_blob))
+    return b"".join([header, term_offsets.tobytes(), post_offsets.tobytes(), post_docs.tobytes(),
+                     impacts.tobytes(), doc_offsets.tobytes(), bytes(doc_meta),
+                     bytes(term_blob), bytes(text_blob), location_blob])
+
+
+class SearchIndex:
+    """A built index, read from bytes or a memory-mapped file."""
+
+    def __init__(self, data):
+        self._data = data
+        view = memoryview(data)
+        if len(view) < _HEADER.size:
+            raise ValueError("truncated search index")
+        (magic, version, docs, terms, postings,
+         term_bytes, text_bytes, location_bytes) = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError("not a search index")
+        size = (_HEADER.size + 8 * (terms + 1) + 8 * postings + 4 * (docs + 1) + 2 * docs + (-2 * docs) % 4
+                + term_bytes + text_bytes + location_bytes)
+        if size != len(view):
+            # A torn or corrupt file; the sections would not line up.
+            raise ValueError("search index size does not match its header")
+        self.version = version.rstrip(b" ").decode()
+        offset = _HEADER.size
+
+        def take(size, fmt=None):
+            nonlocal offset
+            part = view[offset:offset + size]
+            offset += size
+            return part.cast(fmt) if fmt else part
+
+        term_offsets = take(4 * (terms + 1), "I")
+        self._post_offsets = take(4 * (terms + 1), "I")
+        self._post_docs = take(4 * postings, "I")
+        self._impacts = take(4 * postings, "f")
+        self._doc_offsets = take(4 * (docs + 1), "I")
+        self._doc_meta = take(2 * docs + (-2 * docs) % 4)
+        term_blob = bytes(take(term_bytes))
+        self._texts = take(text_bytes)
+        locations = bytes(take(location_bytes)).decode()
+        self.locations = tuple(locations.split("\n")) if locations else ()
+        self._terms = {term_blob[term_offsets[i]:term_offsets[i + 1]].decode(): i for i in range(terms)}
+        self.documents = docs
+
+    @classmethod
+    def open(cls, path):
+        """Map an index file into memory."""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def text(self, doc):
+        return bytes(self._texts[self._doc_offsets[doc]:self._doc_offsets[doc + 1]]).decode()
+
+    def kind(self, doc):
+        return KIND_NAMES[self._doc_meta[2 * doc]]
+
+    def location(self, doc):
+        number = self._doc_meta[2 * doc + 1]
+        return None if number == NO_LOCATION else self.locations[number]
+
+    def search(self, query, location=None, limit=10):
+        """The best `limit` (score, doc) matches for a query, best first.
+
+        With a location, location facts about other places are left out.
+        """
+        scores = {}
+        impacts, post_docs, post_offsets = self._impacts, self._post_docs, self._post_offsets
+        for term in set(tokenize(query)):
+            number = self._terms.get(term)
+            if number is None:
+                continue
+            for i in range(post_offsets[number], post_offsets[number + 1]):
+                doc = post_docs[i]
+                scores[doc] = scores.get(doc, 0.0) + impacts[i]
+        if location is not None:
+            wanted = self.locations.index(location) if location in self.locations else -1
+            meta = self._doc_meta
+            scores = {doc: score for doc, score in scores.items()
+                      if meta[2 * doc + 1] in (NO_LOCATION, wanted)}
+        return heapq.nlargest(limit, ((score, doc) for doc, score in scores.items()))
+
+    def results(self, query, location=None, limit=10):
+        """search() as JSON-ready dicts."""
+        return [{"text": self.text(doc), "kind": self.kind(doc), "location": self.location(doc),
+                 "score": round(score, 3)}
+                for score, doc in self.search(query, location, limit)]
+
+
+class IndexStore:
+    """Keeps the index of a content store's current content, on disk and in memory."""
+
+    def __init__(self, contents=None, path=None):
+        self.contents = contents or content_store.store
+        self.path = path or self.contents.path + ".index"
+        self._index = None
+        self._analyzed = {}
+        self._lock = threading.Lock()
+
+    def current(self):
+        """The index of the current content, loaded or rebuilt if the content changed."""
+        content = self.contents.current()
+        index = self._index
+        if index is None or index.version != content.version:
+            with self._lock:
+                index = self._index
+                if index is None or index.version != content.version:
+                    index = self._index = self._load(content)
+        return index
+
+    def _load(self, content):
+        try:
+            index = SearchIndex.open(self.path)
+            if index.version == content.version:
+                return index
+        except (OSError, ValueError):
+            pass
+        docs = documents(content)
+        data = build(content.version, docs, self._analyzed)
+        # Keep the token counts of the strings still in use for the next rebuild.
+        self._analyzed = {text: self._analyzed[text] for _, _, text in docs}
+        try:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+            return SearchIndex.open(self.path)
+        except OSError:
+            logger.warning("Could not write search index %s", self.path)
+            return SearchIndex(data)
+
+
+store = IndexStore()
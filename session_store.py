@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+def new_game_id():
+    """Return a fresh, unguessable game ID."""
+    return uuid.uuid4().hex
+
+
+class SessionStore:
+    """Interface for storing one game per game ID."""
+
+    def get(self, game_id):
+        raise NotImplementedError
+
+    def save(self, game_id, game):
+        raise NotImplementedError
+
+    def delete(self, game_id):
+        raise NotImplementedError
+
+    def game_ids(self):
+        """Return the IDs of every stored game."""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """In-process store with LRU eviction and a per-entry idle TTL."""
+
+    def __init__(self, max_entries=10000, ttl=3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, game_id):
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(game_id)
+            if entry is None:
+                return None
+            game, touched = entry
+            if now - touched > self.ttl:
+                del self._entries[game_id]
+                return None
+            self._entries[game_id] = (game, now)
+            self._entries.move_to_end(game_id)
+            return game
+
+    def save(self, game_id, game):
+        now = self.clock()
+        with self._lock:
+            self._entries[game_id] = (game, now)
+            self._entries.move_to_end(game_id)
+            self._evict(now)
+
+    def delete(self, game_id):
+        with self._lock:
+            self._entries.pop(game_id, None)
+
+    def game_ids(self):
+        with self._lock:
+            return list(self._entries)
+
+    def _evict(self, now):
+        # Entries are ordered by last use, so expired ones sit at the front.
+        while self._entries:
+            oldest_id, (_, touched) = next(iter(self._entries.items()))
+            if len(self._entries) > self.max_entries or now - touched > self.ttl:
+                del self._entries[oldest_id]
+            else:
+                break
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SqliteSessionStore(SessionStore):
+    """SQLite-backed store that several worker processes can share.
+
+    Like MemorySessionStore, the TTL counts from a game's last use. Expired
+    rows are purged at most every `purge_interval` seconds, on a save.
+    """
+
+    def __init__(self, path, ttl=3600, clock=time.time, purge_interval=60):
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self.purge_interval = purge_interval
+        self._next_purge = clock() + purge_interval
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS games ("
+            "game_id TEXT PRIMARY KEY, state BLOB NOT NULL, touched REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS games_touched ON games (touched)")
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, game_id):
+        row = self._connect().execute(
+            "SELECT state, touched FROM games WHERE game_id = ?", (game_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = self.clock()
+        if now - row[1] > self.ttl:
+            self.delete(game_id)
+            return None
+        self._connect().execute("UPDATE games SET touched = ? WHERE game_id = ?", (now, game_id))
+        return pickle.loads(row[0])
+
+    def save(self, game_id, game):
+        now = self.clock()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO games (game_id, state, touched) VALUES (?, ?, ?)",
+            (game_id, pickle.dumps(game, pickle.HIGHEST_PROTOCOL), now),
+        )
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            self.purge_expired()
+
+    def delete(self, game_id):
+        self._connect().execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+
+    def game_ids(self):
+        return [row[0] for row in self._connect().execute("SELECT game_id FROM games")]
+
+    def purge_expired(self):
+        """Delete every game idle for longer than the TTL."""
+        self._connect().execute(
+            "DELETE FROM games WHERE touched < ?", (self.clock() - self.ttl,)
+        )
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+
+class AsyncSessionStore:
+    """Awaitable access to a SessionStore for the ASGI front end.
+
+    The in-memory store never blocks, so it is called directly; other stores
+    run in the default thread pool to keep the event loop free.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._inline = isinstance(store, MemorySessionStore)
+
+    async def _call(self, method, *args):
+        if self._inline:
+            return method(*args)
+        import asyncio
+        return await asyncio.to_thread(method, *args)
+
+    async def get(self, game_id):
+        return await self._call(self.store.get, game_id)
+
+    async def save(self, game_id, game):
+        return await self._call(self.store.save, game_id, game)
+
+    async def delete(self, game_id):
+        return await self._call(self.store.delete, game_id)
+
+    def __len__(self):
+        return len(self.store)
+
+
+def create_store(url=None):
+    """Build a store from a URL such as ``memory://`` or ``sqlite:///games.db``."""
+    url = url or os.environ.get("GAME_STORE_URL", "memory://")
+    ttl = int(os.environ.get("GAME_STORE_TTL", "3600"))
+    if url.startswith("sqlite:///"):
+        return SqliteSessionStore(url[len("sqlite:///"):], ttl=ttl)
+    if url.startswith("memory://"):
+        max_entries = int(os.environ.get("GAME_STORE_MAX_ENTRIES", "10000"))
+        return MemorySessionStore(max_entries=max_entries, ttl=ttl)
+    raise ValueError(f"Unsupported game store URL: {url}")
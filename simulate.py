@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+"""
+Monte Carlo strategy explorer for the Sustainability Game.
+
+Plays many complete games with a policy across a process pool and reports
+the distribution of final eco points and sustainability levels.
+
+    python simulate.py --policy random --games 1000000
+    python simulate.py --policy greedy --workers 8
+    python simulate.py --policy my_module:my_policy
+
+A policy is a callable ``policy(game, rng)`` that returns one move:
+``("action", name)``, ``("travel", location)`` or ``("end_day", None)``.
+Games are split into fixed-size chunks; each chunk is seeded from the base
+seed and its chunk number, so results do not depend on the worker count,
+and workers send back only aggregated histograms.
+"""
+
+import argparse
+import importlib
+import json
+import math
+import multiprocessing
+import random
+import sys
+import time
+from collections import Counter
+
+from sustainability_game import TRAVEL_COST, SustainabilityGame
+
+MAX_MOVES = 500
+
+
+def random_policy(game, rng):
+    """Pick uniformly among the actions here, travel and ending the day."""
+    rules = game.rules
+    moves = [("action", action) for action in rules.actions_at(game.current_location)]
+    moves += [("travel", location) for location in rules.location_names if location != game.current_location]
+    moves.append(("end_day", None))
+    return rng.choice(moves)
+
+
+def greedy_policy(game, rng):
+    """Take the affordable action with the biggest sustainability gain, travelling if needed."""
+    rules = game.rules
+    best = None
+    for location, action_ids in zip(rules.location_names, rules.location_actions):
+        cost = 0 if location == game.current_location else TRAVEL_COST
+        for action_id in action_ids:
+            if game.energy - cost + rules.energy[action_id] <= 0:
+                continue
+            sustainability = rules.sustainability[action_id]
+            key = (sustainability, rules.eco_points[action_id], -cost)
+            if sustainability > 0 and (best is None or key > best[0]):
+                best = (key, location, rules.action_names[action_id])
+    if best is None:
+        return ("end_day", None)
+    _, location, action = best
+    if location != game.current_location:
+        return ("travel", location)
+    return ("action", action)
+
+
+POLICIES = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+}
+
+
+def load_policy(spec):
+    """Resolve a policy name or a ``module:function`` reference."""
+    if spec in POLICIES:
+        return POLICIES[spec]
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Unknown policy {spec!r}; use one of {sorted(POLICIES)} or module:function")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def play_game(policy, rng, max_moves=MAX_MOVES):
+    """Play one game to the end and return it with the reason it stopped."""
+    game = SustainabilityGame()
+    for _ in range(max_moves):
+        if game.is_over():
+            break
+        game.apply_move(*policy(game, rng))
+    if game.energy <= 0:
+        return game, "out_of_energy"
+    if game.is_over():
+        return game, "completed"
+    return game, "move_limit"
+
+
+class Distribution:
+    """Streaming summary of a numeric result: moments plus a value histogram."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.histogram = Counter()
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.total_squares += value * value
+        self.histogram[value] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.total_squares += other.total_squares
+        self.histogram.update(other.histogram)
+
+    def percentile(self, fraction):
+        """Return the smallest value with at least `fraction` of results at or below it."""
+        target = fraction * self.count
+        seen = 0
+        for value in sorted(self.histogram):
+            seen += self.histogram[value]
+            if seen >= target:
+                return value
+        return None
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        mean = self.total / self.count
+        variance = max(0.0, self.total_squares / self.count - mean * mean)
+        return {
+            "count": self.count,
+            "mean": round(mean, 3),
+            "std": round(math.sqrt(variance), 3),
+            "min": min(self.histogram),
+            "p5": self.percentile(0.05),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "max": max(self.histogram),
+        }
+
+
+class SimulationResult:
+    """Aggregated results of a batch of games."""
+
+    def __init__(self):
+        self.games = 0
+        self.eco_points = Distribution()
+        self.sustainability = Distribution()
+        self.endings = Counter()
+
+    def add(self, game, ending):
+        self.games += 1
+        self.eco_points.add(game.eco_points)
+        # Rounded so the histogram key set stays small however many games are played.
+        self.sustainability.add(round(game.sustainability_level, 1))
+        self.endings[ending] += 1
+
+    def merge(self, other):
+        self.games += other.games
+        self.eco_points.merge(other.eco_points)
+        self.sustainability.merge(other.sustainability)
+        self.endings.update(other.endings)
+
+
+def run_chunk(task):
+    """Worker entry point: play one seeded chunk of games and summarize it."""
+    policy_spec, seed, chunk_index, games, max_moves = task
+    policy = load_policy(policy_spec)
+    rng = random.Random(f"{seed}:{chunk_index}")
+    result = SimulationResult()
+    for _ in range(games):
+        game, ending = play_game(policy, rng, max_moves)
+        result.add(game, ending)
+    return result
+
+
+def _tasks(policy_spec, seed, games, chunk_size, max_moves):
+    chunk_index = 0
+    while games > 0:
+        size = min(chunk_size, games)
+        yield policy_spec, seed, chunk_index, size, max_moves
+        games -= size
+        chunk_index += 1
+
+
+def simulate(policy_spec, games, workers=None, chunk_size=10000, seed=0, max_moves=MAX_MOVES, progress=None):
+    """Play `games` games and return (SimulationResult, games per second)."""
+    load_policy(policy_spec)
+    tasks = _tasks(policy_spec, seed, games, chunk_size, max_moves)
+    total = SimulationResult()
+    start = time.perf_counter()
+    if workers == 1:
+        chunks = map(run_chunk, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        chunks = pool.imap_unordered(run_chunk, tasks)
+    try:
+        for chunk in chunks:
+            total.merge(chunk)
+            if progress:
+                progress(total, time.perf_counter() - start)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    elapsed = time.perf_counter() - start
+    return total, total.games / elapsed if elapsed else float("inf")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo strategy explorer for the Sustainability Game")
+    parser.add_argument("--policy", default="random", help="random, greedy or module:function")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-moves", type=int, default=MAX_MOVES, help="cap on moves per game")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    def progress(total, elapsed):
+        print(f"\r{total.games:,} games, {total.games / elapsed:,.0f} games/s", end="", file=sys.stderr)
+
+    result, rate = simulate(args.policy, args.games, args.workers, args.chunk_size,
+                            args.seed, args.max_moves, progress=progress)
+    print(file=sys.stderr)
+
+    report = {
+        "policy": args.policy,
+        "games": result.games,
+        "games_per_second": round(rate),
+        "endings": dict(result.endings),
+        "eco_points": result.eco_points.summary(),
+        "sustainability": result.sustainability.summary(),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Policy: {report['policy']}")
+    print(f"Games: {report['games']:,} ({report['games_per_second']:,} games/s)")
+    print("Endings: " + ", ".join(f"{name} {count:,}" for name, count in sorted(result.endings.items())))
+    for name in ("eco_points", "sustainability"):
+        stats = report[name]
+        print(f"{name:>15}: " + "  ".join(f"{key} {value}" for key, value in stats.items() if key != "count"))
+
+
+if __name__ == "__main__":
+    main()
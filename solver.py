@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+"""
+Exact optimal-play solver for the Sustainability Game.
+
+Searches every reachable state of one game with memoized dynamic
+programming, using the same rules as SustainabilityGame: the action
+impacts, the travel cost of change_location and the capped energy recovery
+of end_day. The game itself has no limit on actions per day, and resting
+restores energy without a cap, so without a limit the best score would be
+unbounded; the solver therefore takes an ``actions_per_day`` budget.
+
+    python solver.py --actions-per-day 5
+
+Solutions are cached under a hash of the rule tables and solver settings,
+in memory and optionally on disk, so re-solving a table that has been
+solved before is free.
+"""
+
+import argparse
+import os
+import pickle
+from decimal import Decimal
+
+from rules import compile_rules
+from sustainability_game import (
+    ACTION_IMPACTS, DAY_RECOVERY, GAME_DAYS, LOCATIONS, MAX_ENERGY, TRAVEL_COST, rules_hash
+)
+
+OBJECTIVES = ("sustainability", "eco_points")
+
+_SOLUTIONS = {}
+
+
+class Solver:
+    """Memoized search over (day, location, energy, actions left, just travelled)."""
+
+    def __init__(self, locations=LOCATIONS, action_impacts=ACTION_IMPACTS,
+                 actions_per_day=5, objective="sustainability"):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"objective must be one of {OBJECTIVES}")
+        self.locations = tuple(locations)
+        self.actions_per_day = actions_per_day
+        self.objective = objective
+        self.rules_hash = rules_hash(locations, action_impacts)
+        rules = compile_rules(locations, action_impacts)
+
+        # Sustainability is tracked in integer units so sums are exact.
+        decimals = max(-Decimal(str(value)).as_tuple().exponent for value in rules.sustainability)
+        self.scale = 10 ** max(decimals, 0)
+        self._impacts = {
+            name: (rules.eco_points[i], rules.energy[i], round(rules.sustainability[i] * self.scale))
+            for i, name in enumerate(rules.action_names)
+        }
+        self._actions = {name: tuple(rules.actions_at(name)) for name in rules.location_names}
+        self._memo = {}
+
+    def start_state(self):
+        return (1, "home", 100, self.actions_per_day, False)
+
+    def _better(self, value, best):
+        if best is None:
+            return True
+        if self.objective == "sustainability":
+            return value > best
+        return (value[1], value[0]) > (best[1], best[0])
+
+    def _solve(self, state):
+        cached = self._memo.get(state)
+        if cached is not None:
+            return cached
+        day, location, energy, actions_left, travelled = state
+        if energy <= 0 or day > GAME_DAYS:
+            result = ((0, 0), None)
+            self._memo[state] = result
+            return result
+
+        best, best_move = None, None
+        if actions_left:
+            for action in self._actions[location]:
+                eco, delta_energy, sustainability = self._impacts[action]
+                (future_sustainability, future_eco), _ = self._solve(
+                    (day, location, energy + delta_energy, actions_left - 1, False))
+                value = (sustainability + future_sustainability, eco + future_eco)
+                if self._better(value, best):
+                    best, best_move = value, ("action", action)
+        # Travelling twice in a row only wastes energy, so it is never explored.
+        if not travelled:
+            for other in self.locations:
+                if other == location:
+                    continue
+                value, _ = self._solve((day, other, energy - TRAVEL_COST, actions_left, True))
+                if self._better(value, best):
+                    best, best_move = value, ("travel", other)
+        value, _ = self._solve(
+            (day + 1, location, min(MAX_ENERGY, energy + DAY_RECOVERY), self.actions_per_day, False))
+        if self._better(value, best):
+            best, best_move = value, ("end_day", None)
+
+        result = (best, best_move)
+        self._memo[state] = result
+        return result
+
+    def value(self, state=None):
+        """Return the best (sustainability_level, eco_points) reachable from `state`."""
+        (sustainability, eco), _ = self._solve(state or self.start_state())
+        return sustainability / self.scale, eco
+
+    def best_move(self, state):
+        """Return the optimal move from `state`, or None when the game is over."""
+        return self._solve(state)[1]
+
+    def policy(self):
+        """Return the optimal move for every state explored so far."""
+        self._solve(self.start_state())
+        return {state: move for state, (_, move) in self._memo.items() if move is not None}
+
+    def plan(self, state=None):
+        """Return the sequence of optimal moves from `state` to the end of the game."""
+        state = state or self.start_state()
+        moves = []
+        while True:
+            move = self.best_move(state)
+            if move is None:
+                return moves
+            moves.append(move)
+            day, location, energy, actions_left, _ = state
+            kind, arg = move
+            if kind == "action":
+                state = (day, location, energy + self._impacts[arg][1], actions_left - 1, False)
+            elif kind == "travel":
+                state = (day, arg, energy - TRAVEL_COST, actions_left, True)
+            else:
+                state = (day + 1, location, min(MAX_ENERGY, energy + DAY_RECOVERY), self.actions_per_day, False)
+
+    def __len__(self):
+        return len(self._memo)
+
+
+def solve(locations=LOCATIONS, action_impacts=ACTION_IMPACTS, actions_per_day=5,
+          objective="sustainability", cache_dir=None):
+    """Return a fully solved Solver, reusing any solution cached for the same rules."""
+    solver = Solver(locations, action_impacts, actions_per_day, objective)
+    key = (solver.rules_hash, actions_per_day, objective)
+    if key in _SOLUTIONS:
+        return _SOLUTIONS[key]
+
+    path = None
+    if cache_dir:
+        path = os.path.join(cache_dir, "solution-{}-{}-{}.pickle".format(*key))
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                solver._memo = pickle.load(f)
+
+    solver._solve(solver.start_state())
+    if path and not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(solver._memo, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    _SOLUTIONS[key] = solver
+    return solver
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve the Sustainability Game exactly")
+    parser.add_argument("--actions-per-day", type=int, default=5)
+    parser.add_argument("--objective", choices=OBJECTIVES, default="sustainability")
+    parser.add_argument("--cache-dir", default=None, help="directory for cached solutions")
+    args = parser.parse_args(argv)
+
+    solver = solve(actions_per_day=args.actions_per_day, objective=args.objective, cache_dir=args.cache_dir)
+    sustainability, eco_points = solver.value()
+    print(f"Rules {solver.rules_hash}: {len(solver):,} states")
+    print(f"Best sustainability level: {sustainability:g}, eco points: {eco_points}")
+    print("Optimal plan:")
+    day = 1
+    for kind, arg in solver.plan():
+        if kind == "end_day":
+            print(f"  -- end of day {day} --")
+            day += 1
+        elif kind == "travel":
+            print(f"  travel to {arg}")
+        else:
+            print(f"  {arg.replace('_', ' ')}")
+
+
+if __name__ == "__main__":
+    main()
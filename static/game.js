@@ -0,0 +1,129 @@
+// Plays moves through the JSON API and patches the page instead of reloading it.
+// Every move and tip response carries the new state or tip, since the live
+// event stream may be served by another worker or not at all; when the
+// stream is open it also brings in moves made from other tabs.
+// Without JavaScript the links fall back to the redirect routes.
+(function () {
+    var main = document.getElementById('game');
+    if (!main || !window.fetch) {
+        return;
+    }
+    var gameId = main.getAttribute('data-game-id');
+
+    function title(name) {
+        return name.replace(/_/g, ' ').replace(/\b\w/g, function (c) { return c.toUpperCase(); });
+    }
+
+    function setText(id, value) {
+        if (value !== undefined) {
+            document.getElementById(id).textContent = value;
+        }
+    }
+
+    // Applies a full state or a delta holding only the changed fields.
+    function render(state) {
+        if (state.game_over) {
+            window.location.href = '/game_over';
+            return;
+        }
+        setText('day', state.day);
+        setText('eco-points', state.eco_points);
+        setText('energy', state.energy);
+        setText('sustainability', state.sustainability);
+        setText('location-description', state.description);
+        if (state.location_fact !== undefined) {
+            document.getElementById('location-fact').hidden = !state.location_fact;
+            setText('location-fact-text', state.location_fact || '');
+        }
+
+        if (state.actions) {
+            var actions = document.getElementById('actions');
+            actions.innerHTML = '';
+            state.actions.forEach(function (action) {
+                var link = document.createElement('a');
+                link.href = '/action/' + action;
+                link.setAttribute('data-move', 'action');
+                link.setAttribute('data-name', action);
+                link.textContent = title(action);
+                var item = document.createElement('li');
+                item.appendChild(link);
+                actions.appendChild(item);
+            });
+        }
+
+        if (state.location) {
+            var travel = document.querySelectorAll('#travel a');
+            for (var i = 0; i < travel.length; i++) {
+                travel[i].parentNode.hidden = travel[i].getAttribute('data-name') === state.location;
+            }
+        }
+    }
+
+    function showTip(tip) {
+        var section = document.getElementById('tip');
+        if (!section) {
+            section = document.createElement('section');
+            section.id = 'tip';
+            section.innerHTML = '<h3>Sustainability Tip</h3><p></p>';
+            main.appendChild(section);
+        }
+        section.querySelector('p').textContent = tip;
+    }
+
+    if (window.EventSource) {
+        var events = new EventSource('/api/v1/games/' + gameId + '/events');
+        events.addEventListener('state', function (event) { render(JSON.parse(event.data)); });
+        events.addEventListener('tip', function (event) { showTip(JSON.parse(event.data).tip); });
+    }
+
+    function moveFor(link) {
+        var kind = link.getAttribute('data-move');
+        var name = link.getAttribute('data-name');
+        if (kind === 'action') {
+            return {type: 'action', action: name};
+        }
+        if (kind === 'travel') {
+            return {type: 'travel', location: name};
+        }
+        return {type: 'end_day'};
+    }
+
+    document.addEventListener('click', function (event) {
+        var tipLink = event.target.closest('a[data-tip]');
+        if (tipLink) {
+            event.preventDefault();
+            fetch('/api/v1/games/' + gameId + '/tips', {method: 'POST'}).then(function (response) {
+                return response.json();
+            }).then(function (data) {
+                if (data.tip) {
+                    showTip(data.tip);
+                } else {
+                    window.location.href = tipLink.href;
+                }
+            }).catch(function () {
+                window.location.href = tipLink.href;
+            });
+            return;
+        }
+        var link = event.target.closest('a[data-move]');
+        if (!link) {
+            return;
+        }
+        event.preventDefault();
+        fetch('/api/v1/games/' + gameId + '/actions', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(moveFor(link))
+        }).then(function (response) {
+            return response.json();
+        }).then(function (data) {
+            if (data.state) {
+                render(data.state);
+            } else if (data.error) {
+                window.location.href = link.href;
+            }
+        }).catch(function () {
+            window.location.href = link.href;
+        });
+    });
+})();
@@ -1,84 +1,194 @@
 #!/usr/bin/env python3
 
+import hashlib
+import json
 import random
 
+import achievements
+import content_store
+import sampler
+from rules import START_LOCATION
+
+# Static game catalog, shared read-only by every game instance. These names
+# hold the content loaded at import time; games read content_store.current()
+# so they follow hot reloads.
+LOCATIONS = content_store.current().locations
+
+ACTION_IMPACTS = content_store.current().action_impacts
+
+TIPS = content_store.current().tips
+
+# The compiled, validated form of LOCATIONS and ACTION_IMPACTS (see rules.py).
+RULES = content_store.current().rules
+
+GAME_DAYS = 7
+TRAVEL_COST = 5
+DAY_RECOVERY = 20
+MAX_ENERGY = 100
+# A game ends after this many moves (tips included), so resting forever
+# cannot grow its recorded history without bound.
+MAX_MOVES = 1000
+
+
+def rules_hash(locations=LOCATIONS, action_impacts=ACTION_IMPACTS):
+    """Return a short hash of the rule tables, for keying caches that depend on them."""
+    rules = {
+        "locations": {name: {"description": data["description"], "actions": list(data["actions"])}
+                      for name, data in locations.items()},
+        "action_impacts": {name: dict(impact) for name, impact in action_impacts.items()},
+        "constants": [GAME_DAYS, TRAVEL_COST, DAY_RECOVERY, MAX_ENERGY, MAX_MOVES],
+    }
+    encoded = json.dumps(rules, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+RULES_VERSION = rules_hash()
+
+
 class SustainabilityGame:
-    def __init__(self):
+    """Per-player game state; the catalog is read from the shared content store.
+
+    Each game owns a 32-bit `seed` that selects its tip order, and records
+    every move it accepts in `moves` as (kind, arg) pairs, so the same seed
+    and moves replay to the same game (see replay.py); `move_count` counts
+    them, also where the list itself is not kept (see cookie_state.py). `room` names the
+    shared city the game plays in, if any (see rooms.py). `progress` holds
+    the game's achievement progress, updated as moves happen (see
+    achievements.py).
+    """
+
+    __slots__ = ("player_name", "eco_points", "days", "energy",
+                 "sustainability_level", "current_location", "tip_cursor", "seed", "moves", "move_count",
+                 "room", "progress")
+
+    @property
+    def locations(self):
+        return content_store.current().locations
+
+    @property
+    def rules(self):
+        return content_store.current().rules
+
+    @property
+    def action_impacts(self):
+        return content_store.current().action_impacts
+
+    @property
+    def tips(self):
+        return content_store.current().tips
+
+    def __init__(self, seed=None):
         self.player_name = ""
         self.eco_points = 0
         self.days = 1
         self.energy = 100
         self.sustainability_level = 0
-        self.current_location = "home"
-        self.locations = {
-            "home": {"description": "Your apartment in Hong Kong", "actions": ["save_energy", "reduce_waste", "rest", "consume_alot_of_meat"]},
-            "work": {"description": "Your office in Central", "actions": ["use_public_transport", "reduce_paper", "advocate_sustainability", "eat_junk_food", "Drive_a_car"]},
-            "market": {"description": "Local wet market in Mong Kok", "actions": ["buy_local_produce", "reduce_plastic", "educate_vendors", "use_single_use_plastics", "buy_fast_fashion"]},
-            "beach": {"description": "Repulse Bay Beach", "actions": ["clean_beach", "join_conservation", "raise_awareness", "order_takeout"]},
-            "park": {"description": "Hong Kong Park", "actions": ["plant_trees", "water_conservation", "community_garden", "skip_recycling", "consume_sugar_drinks"]}
-        }
-        self.action_impacts = {
-            # Rest
-            "rest": {"eco_points": 0, "energy": 50, "sustainability": 0},
-
-            # Positive actions
-            "save_energy": {"eco_points": 10, "energy": -15, "sustainability": 0.3},
-            "reduce_waste": {"eco_points": 8, "energy": -10, "sustainability": 0.5},
-            "use_public_transport": {"eco_points": 5, "energy": -10, "sustainability": 0.7},
-            "reduce_paper": {"eco_points": 3, "energy": -5, "sustainability": 0.3},
-            "advocate_sustainability": {"eco_points": 10, "energy": -25, "sustainability": 1},
-            "buy_local_produce": {"eco_points": 5, "energy": -10, "sustainability": 0.6},
-            "reduce_plastic": {"eco_points": 7, "energy": -5, "sustainability": 0.5},
-            "educate_vendors": {"eco_points": 15, "energy": -20, "sustainability": 0.8},
-            "clean_beach": {"eco_points": 20, "energy": -30, "sustainability": 1},
-            "join_conservation": {"eco_points": 25, "energy": -35, "sustainability": 1.2},
-            "raise_awareness": {"eco_points": 15, "energy": -25, "sustainability": 0.9},
-            "plant_trees": {"eco_points": 20, "energy": -30, "sustainability": 1.1},
-            "water_conservation": {"eco_points": 15, "energy": -20, "sustainability": 0.8},
-            "community_garden": {"eco_points": 20, "energy": -25, "sustainability": 1},
-
-            # Negative actions
-            "consume_alot_of_meat": {"eco_points": -18, "energy": 20, "sustainability": -1.0},
-            "eat_junk_food": {"eco_points": -10, "energy": 25, "sustainability": -1},
-            "drive_a_car": {"eco_points": -25, "energy": 30, "sustainability": -0.8},
-            "use_single_use_plastics": {"eco_points": -5, "energy": 20, "sustainability": -0.5},
-            "buy_fast_fashion": {"eco_points": -30, "energy": 15, "sustainability": -1.2},
-            "order_takeout": {"eco_points": -8, "energy": 10, "sustainability": -0.4},
-            "skip_recycling": {"eco_points": -12, "energy": 25, "sustainability": -0.7},
-            "consume_sugar_drinks": {"eco_points": -10, "energy": 15, "sustainability": -0.6}
-        }
-        self.tips = [
-            "Bring your own shopping bag to reduce waste.",
-            "Use a reusable water bottle instead of buying bottled water.",
-            "Take public transport to reduce your carbon footprint.",
-            "Support local farms by purchasing locally grown produce.",
-            "Turn off unnecessary lights to save energy."
-        ]
+        self.current_location = START_LOCATION
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.tip_cursor = sampler.cursor_for(self.seed)
+        self.moves = []
+        self.move_count = 0
+        self.room = None
+        self.progress = achievements.engine_for(content_store.current().rules).new_progress()
+
+    def __copy__(self):
+        game = SustainabilityGame.__new__(SustainabilityGame)
+        for name in SustainabilityGame.__slots__:
+            setattr(game, name, getattr(self, name))
+        game.moves = list(self.moves)
+        game.progress = bytearray(self.progress)
+        return game
+
+    def follow_content(self):
+        """Send the player to the start location if a content reload removed theirs.
+
+        Return True if the game changed. Games are loaded before every move
+        and view, so this keeps a reload from stranding live games at a
+        location the content no longer has.
+        """
+        if self.current_location in self.locations:
+            return False
+        # Content that lacks the start location is rejected (see rules.py).
+        self.current_location = START_LOCATION
+        return True
 
     def perform_action(self, action):
         """Perform an action and update the game state."""
-        if action not in self.action_impacts:
+        rules = content_store.current().rules
+        action_id = rules.action_ids.get(action)
+        if action_id is None:
             return {"error": "Invalid action"}
-        impact = self.action_impacts[action]
-        self.eco_points += impact["eco_points"]
-        self.energy += impact["energy"]
-        self.sustainability_level += impact["sustainability"]
-        return {
+        rules.apply(self, action_id)
+        self._record("action", action)
+        result = {
             "action": action,
-            "eco_points": impact["eco_points"],
-            "energy": impact["energy"],
-            "sustainability": impact["sustainability"]
+            "eco_points": rules.eco_points[action_id],
+            "energy": rules.energy[action_id],
+            "sustainability": rules.sustainability[action_id]
         }
+        earned = achievements.engine_for(rules).action(self, action_id)
+        if earned:
+            result["achievements"] = earned
+        return result
+
+    def change_location(self, location):
+        """Travel to another location, which costs energy."""
+        if location not in self.locations:
+            return {"error": "Invalid location"}
+        self.current_location = location
+        self.energy -= TRAVEL_COST
+        self._record("travel", location)
+        result = {
+            "location": location,
+            "energy": self.energy
+        }
+        rules = content_store.current().rules
+        earned = achievements.engine_for(rules).travel(self, rules.location_ids[location])
+        if earned:
+            result["achievements"] = earned
+        return result
 
     def end_day(self):
         """End the current day and recover energy."""
         self.days += 1
-        self.energy = min(100, self.energy + 20) 
-        return {
+        self.energy = min(MAX_ENERGY, self.energy + DAY_RECOVERY)
+        self._record("end_day", None)
+        result = {
             "days": self.days,
             "energy": self.energy
         }
+        earned = achievements.engine_for(content_store.current().rules).end_day(self)
+        if earned:
+            result["achievements"] = earned
+        return result
+
+    def apply_move(self, kind, arg=None):
+        """Apply a move given as ("action", name), ("travel", location), ("end_day", None) or ("tip", None)."""
+        if kind == "action":
+            return self.perform_action(arg)
+        if kind == "travel":
+            return self.change_location(arg)
+        if kind == "end_day":
+            return self.end_day()
+        if kind == "tip":
+            return {"tip": self.get_random_tip()}
+        return {"error": "Invalid move"}
+
+    def _record(self, kind, arg):
+        self.moves.append((kind, arg))
+        self.move_count += 1
+
+    def is_over(self):
+        """Return True once the player is out of energy, the last day has ended
+        or the game has made MAX_MOVES moves."""
+        return self.energy <= 0 or self.days > GAME_DAYS or self.move_count >= MAX_MOVES
 
     def get_random_tip(self):
-        """Return a random sustainability tip."""
-        return random.choice(self.tips)
\ No newline at end of file
+        """Return the next sustainability tip, without repeats until all have been shown."""
+        tip, self.tip_cursor = sampler.current().tips.draw(self.tip_cursor)
+        self._record("tip", None)
+        return tip
+
+    def location_fact(self):
+        """Return today's fact about the current location, or None if it has none."""
+        return sampler.location_fact(self.current_location, self.seed, self.days)
\ No newline at end of file
@@ -5,6 +5,15 @@ from io import StringIO
 from unittest.mock import patch
 import sys
 from sustainability_game import SustainabilityGame
+from session_store import MemorySessionStore, SqliteSessionStore
+import content_store
+import os
+import tempfile
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class TestSustainabilityGame(unittest.TestCase):
 
@@ -144,5 +153,1720 @@ class TestSustainabilityGame(unittest.TestCase):
 
         self.assertEqual(len(self.game.shown_location_facts["home"]), 1)
 
+class TestGameState(unittest.TestCase):
+
+    def test_games_share_read_only_catalog(self):
+        """Test that every game shares one immutable catalog"""
+        first, second = SustainabilityGame(), SustainabilityGame()
+        self.assertIs(first.action_impacts, second.action_impacts)
+        self.assertIs(first.locations, second.locations)
+        with self.assertRaises(TypeError):
+            first.action_impacts["rest"]["energy"] = 100
+
+    def test_game_has_no_instance_dict(self):
+        """Test that per-player state is held in slots"""
+        game = SustainabilityGame()
+        self.assertFalse(hasattr(game, "__dict__"))
+        with self.assertRaises(AttributeError):
+            game.unknown_field = 1
+
+    def test_resting_forever_ends_the_game(self):
+        """Test that a game's recorded moves stay bounded and the API refuses moves and tips past the limit"""
+        from app import app
+        from sustainability_game import MAX_MOVES
+
+        game = SustainabilityGame()
+        while not game.is_over():
+            game.apply_move("action", "rest")
+        self.assertEqual(len(game.moves), MAX_MOVES)
+
+        client = app.test_client()
+        game_id = client.post('/api/v1/games', json={"player_name": "Test Player"}).get_json()["game_id"]
+        moves_url = f"/api/v1/games/{game_id}/actions"
+        client.post(moves_url, json={"moves": [{"type": "action", "action": "rest"}] * (MAX_MOVES - 1)})
+        self.assertEqual(client.post(f"/api/v1/games/{game_id}/tips").status_code, 200)
+        state = client.get(f"/api/v1/games/{game_id}").get_json()["state"]
+        self.assertTrue(state["game_over"])
+        self.assertEqual(client.post(moves_url, json={"type": "end_day"}).status_code, 409)
+        self.assertEqual(client.post(f"/api/v1/games/{game_id}/tips").status_code, 409)
+        self.assertEqual(len(app.store.get(game_id).moves), MAX_MOVES)
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestBatchEngine(unittest.TestCase):
+
+    def test_batch_matches_scalar_replay(self):
+        """Test that batch and scalar games end in identical states"""
+        from batch_engine import BatchGame, replay_scalar
+
+        batch = BatchGame(200)
+        history = batch.run_random(seed=7)
+
+        for index in range(len(batch)):
+            game = replay_scalar(history[:, index].tolist())
+            self.assertEqual(game.eco_points, batch.eco_points[index])
+            self.assertEqual(game.energy, batch.energy[index])
+            self.assertEqual(game.sustainability_level, batch.sustainability[index])
+            self.assertEqual(game.days, batch.day[index])
+
+    def test_same_seed_same_results(self):
+        """Test that random batch play is reproducible from its seed"""
+        from batch_engine import BatchGame
+
+        first, second = BatchGame(50), BatchGame(50)
+        first.run_random(seed=3)
+        second.run_random(seed=3)
+        self.assertTrue((first.eco_points == second.eco_points).all())
+
+class TestSimulate(unittest.TestCase):
+
+    def test_results_do_not_depend_on_worker_count(self):
+        """Test that chunk seeding makes simulations reproducible"""
+        from simulate import simulate
+
+        serial, _ = simulate("random", 300, workers=1, chunk_size=100, seed=5)
+        pooled, _ = simulate("random", 300, workers=2, chunk_size=100, seed=5)
+
+        self.assertEqual(serial.games, 300)
+        self.assertEqual(serial.eco_points.histogram, pooled.eco_points.histogram)
+        self.assertEqual(serial.sustainability.histogram, pooled.sustainability.histogram)
+
+    def test_user_supplied_policy(self):
+        """Test that a module:function policy can be loaded"""
+        from simulate import simulate
+
+        result, _ = simulate("simulate:greedy_policy", 10, workers=1)
+        self.assertEqual(result.endings["completed"], 10)
+
+class TestSolver(unittest.TestCase):
+
+    def test_optimal_plan_reaches_solved_value(self):
+        """Test that replaying the optimal plan reaches the solved score"""
+        from solver import solve
+
+        solver = solve(actions_per_day=3)
+        game = SustainabilityGame()
+        for kind, arg in solver.plan():
+            game.apply_move(kind, arg)
+
+        sustainability, eco_points = solver.value()
+        self.assertTrue(game.is_over())
+        self.assertAlmostEqual(game.sustainability_level, sustainability)
+        self.assertEqual(game.eco_points, eco_points)
+
+    def test_solutions_are_cached_by_rule_hash(self):
+        """Test that unchanged rules reuse the cached solution"""
+        from solver import solve
+        from sustainability_game import ACTION_IMPACTS, LOCATIONS
+
+        first = solve(actions_per_day=2)
+        self.assertIs(solve(actions_per_day=2), first)
+
+        impacts = {name: dict(impact) for name, impact in ACTION_IMPACTS.items()}
+        impacts["plant_trees"]["sustainability"] = 3
+        changed = solve(LOCATIONS, impacts, actions_per_day=2)
+        self.assertNotEqual(changed.rules_hash, first.rules_hash)
+        self.assertGreater(changed.value()[0], first.value()[0])
+
+class TestJsonApi(unittest.TestCase):
+
+    def setUp(self):
+        from app import app
+        self.client = app.test_client()
+        response = self.client.post('/api/v1/games', json={"player_name": "Test Player"})
+        self.game_id = response.get_json()["game_id"]
+
+    def moves_url(self):
+        return f"/api/v1/games/{self.game_id}/actions"
+
+    def test_single_move_returns_new_state(self):
+        """Test that one POST applies a move and returns the updated state"""
+        response = self.client.post(self.moves_url(), json={"type": "travel", "location": "park"})
+        state = response.get_json()["state"]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(state["location"], "park")
+        self.assertEqual(state["energy"], 95)
+        self.assertIn("plant_trees", state["actions"])
+
+    def test_batch_with_invalid_move_is_not_applied(self):
+        """Test that a batch containing an invalid move changes nothing"""
+        response = self.client.post(self.moves_url(), json={"moves": [
+            {"type": "end_day"},
+            {"type": "action", "action": "not_an_action"},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["index"], 1)
+
+        state = self.client.get(f"/api/v1/games/{self.game_id}").get_json()["state"]
+        self.assertEqual(state["day"], 1)
+
+    def test_overlong_player_names_are_rejected(self):
+        """Test that names too long for the event log and state cookie start no game"""
+        from app import MAX_NAME_LENGTH
+
+        name = "x" * (MAX_NAME_LENGTH + 1)
+        self.assertEqual(self.client.post('/api/v1/games', json={"player_name": name}).status_code, 400)
+        self.assertEqual(self.client.post('/api/v1/games', json={"player_name": 7}).status_code, 400)
+        response = self.client.post('/start', data={'player_name': name})
+        self.assertEqual(response.headers["Location"], "/")
+
+class TestFragmentCache(unittest.TestCase):
+
+    def test_location_fragment_is_rendered_once_per_version(self):
+        """Test that fragments are reused until the rule version changes"""
+        from app import app
+        from fragments import FragmentCache
+
+        cache = FragmentCache(app.jinja_env)
+        fragment = cache.location("park")
+        self.assertIs(cache.location("park"), fragment)
+        self.assertIn("Plant Trees", fragment)
+
+        content = content_store.current()
+        changed = content_store.Content("changed", {
+            "facts": {}, "location_facts": {}, "tips": [],
+            "locations": {name: dict(data) for name, data in content.locations.items()},
+            "action_impacts": {name: dict(impact) for name, impact in content.action_impacts.items()},
+        })
+        self.assertIsNot(cache.location("park", changed), fragment)
+
+class TestSampler(unittest.TestCase):
+
+    def test_every_item_is_drawn_once_per_cycle(self):
+        """Test that a cursor hands out the whole pool before repeating"""
+        from sampler import FACTS, cursor_for
+
+        cursor = cursor_for(12345)
+        drawn = []
+        for _ in range(len(FACTS)):
+            fact, cursor = FACTS.draw(cursor)
+            drawn.append(fact)
+        self.assertEqual(sorted(drawn), sorted(FACTS.items))
+
+        fact, cursor = FACTS.draw(cursor)
+        self.assertIn(fact, FACTS.items)
+
+    def test_cursor_fits_in_a_few_bytes(self):
+        """Test that the per-player sampler state is a small integer"""
+        from sampler import TIPS, cursor_for
+
+        cursor = cursor_for(0xFFFFFFFF)
+        for _ in range(100):
+            _, cursor = TIPS.draw(cursor)
+        self.assertLess(cursor.bit_length(), 49)
+
+    def test_game_tips_do_not_repeat(self):
+        """Test that the web game's tips cycle without repeats"""
+        game = SustainabilityGame()
+        tips = [game.get_random_tip() for _ in range(len(game.tips))]
+        self.assertEqual(len(set(tips)), len(game.tips))
+
+    def test_location_facts_change_daily_without_repeats(self):
+        """Test that a location shows each of its facts once before repeating, one per day"""
+        from sampler import LOCATION_FACTS
+
+        game = SustainabilityGame(seed=3)
+        game.change_location("beach")
+        shown = []
+        for _ in range(len(LOCATION_FACTS["beach"])):
+            shown.append(game.location_fact())
+            game.days += 1
+        self.assertEqual(sorted(shown), sorted(LOCATION_FACTS["beach"].items))
+
+    def test_location_facts_reach_the_player(self):
+        """Test that the game page and the terminal game show the current location's fact"""
+        from markupsafe import escape
+        from app import app
+        from sampler import LOCATION_FACTS
+        from text_sustainability_game import TerminalGame
+
+        app.config['TESTING'] = True
+        client = app.test_client()
+        client.post('/start', data={'player_name': 'Test Player'})
+        client.get('/change_location/park')
+        page = client.get('/game').get_data(as_text=True)
+        self.assertTrue(any(f'<p id="location-fact-text">{escape(fact)}</p>' in page for fact in LOCATION_FACTS["park"].items))
+
+        game = TerminalGame(seed=5)
+        game.change_location("market")
+        output = game._flush()
+        self.assertTrue(any(f"Did you know? {fact}" in output for fact in LOCATION_FACTS["market"].items))
+
+class TestContentStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "content.json")
+        with open(content_store.CONTENT_PATH) as f:
+            self.source = f.read()
+        with open(self.path, "w") as f:
+            f.write(self.source)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_binary_cache_matches_json(self):
+        """Test that a cached load gives the same content as a fresh parse"""
+        fresh = content_store.load(self.path, use_cache=False)
+        content_store.load(self.path)
+        cached = content_store.load(self.path)
+
+        self.assertTrue(os.path.exists(self.path + ".cache"))
+        self.assertEqual(cached.version, fresh.version)
+        self.assertEqual(cached.facts, fresh.facts)
+        self.assertEqual(dict(cached.action_impacts["rest"]), dict(fresh.action_impacts["rest"]))
+
+    def test_hot_reload_swaps_in_new_version(self):
+        """Test that an edited file is picked up without a restart"""
+        store = content_store.ContentStore(self.path, check_interval=0)
+        old = store.current()
+        with open(self.path, "w") as f:
+            f.write(self.source.replace('"rest": {\n            "eco_points": 0', '"rest": {\n            "eco_points": 1'))
+        os.utime(self.path, ns=(0, 0))
+
+        self.assertTrue(store.maybe_reload())
+        self.assertNotEqual(store.current().version, old.version)
+        self.assertEqual(store.current().action_impacts["rest"]["eco_points"], 1)
+
+    def _edited(self, edit):
+        import json
+        data = json.loads(self.source)
+        edit(data)
+        return content_store.Content("edited", data)
+
+    def test_reload_that_drops_a_location_keeps_games_playable(self):
+        """Test that games at a location removed by a reload continue from the start location"""
+        from app import app
+
+        def drop_beach(data):
+            del data["locations"]["beach"]
+            del data["location_facts"]["beach"]
+        edited = self._edited(drop_beach)
+
+        app.config['TESTING'] = True
+        client = app.test_client()
+        client.post('/start', data={'player_name': 'Test Player'})
+        client.get('/change_location/beach')
+        game_id = client.post('/api/v1/games', json={"player_name": "Test Player"}).get_json()["game_id"]
+        client.post(f"/api/v1/games/{game_id}/actions", json={"type": "travel", "location": "beach"})
+        with patch('content_store.current', return_value=edited):
+            self.assertEqual(client.get('/game').status_code, 200)
+            state = client.get(f"/api/v1/games/{game_id}").get_json()["state"]
+            self.assertEqual((state["location"], state["energy"]), ("home", 95))
+            response = client.post(f"/api/v1/games/{game_id}/actions", json={"type": "action", "action": "rest"})
+            self.assertEqual(response.status_code, 200)
+
+    def test_state_cookie_keeps_the_location_across_reorders(self):
+        """Test that a state cookie holds the location by name, not by its place in the content"""
+        from cookie_state import CookieState
+        from session_store import new_game_id
+
+        state = CookieState("secret")
+        game = SustainabilityGame()
+        game.player_name = "Test Player"
+        game.change_location("market")
+        value = state.dumps(new_game_id(), game, 1)
+
+        def reorder(data):
+            data["locations"] = dict(reversed(list(data["locations"].items())))
+        with patch('content_store.current', return_value=self._edited(reorder)):
+            self.assertEqual(CookieState("secret").loads(value)[1].current_location, "market")
+
+        def drop_market(data):
+            del data["locations"]["market"]
+            del data["location_facts"]["market"]
+        with patch('content_store.current', return_value=self._edited(drop_market)):
+            self.assertEqual(CookieState("secret").loads(value)[1].current_location, "home")
+
+    def test_broken_file_keeps_current_content(self):
+        """Test that a failed reload leaves the current content in place"""
+        store = content_store.ContentStore(self.path, check_interval=0)
+        old = store.current()
+        with open(self.path, "w") as f:
+            f.write("{")
+
+        self.assertFalse(store.reload())
+        self.assertIs(store.current(), old)
+
+class TestLoadTest(unittest.TestCase):
+
+    def test_load_test_reports_every_route(self):
+        """Test that a short load test plays full games and reports each route"""
+        from app import app
+        from loadtest import TestClientTransport, report, run
+
+        recorder, elapsed = run(TestClientTransport(app), players=3, concurrency=2)
+        result = report(recorder, elapsed, players=3)
+
+        self.assertEqual(result["routes"]["/start"]["requests"], 3)
+        self.assertEqual(result["routes"]["/game_over"]["requests"], 3)
+        for stats in result["routes"].values():
+            self.assertEqual(stats["errors"], 0)
+            self.assertLessEqual(stats["p50_ms"], stats["p99_ms"])
+
+    def test_brotli_pages_are_decoded_for_asset_scanning(self):
+        """Test that the harness finds static files in Brotli-compressed pages"""
+        import zlib
+        from types import SimpleNamespace
+        from app import app
+        from loadtest import TestClientTransport, report, run
+
+        # A stand-in codec, so the test does not need the brotli package.
+        fake_brotli = SimpleNamespace(compress=lambda body, quality: zlib.compress(body),
+                                      decompress=zlib.decompress)
+        with patch("http_cache._brotli_module", return_value=fake_brotli):
+            recorder, elapsed = run(TestClientTransport(app), players=1, concurrency=1, accept_encoding="br")
+        result = report(recorder, elapsed, players=1)
+        self.assertGreater(result["routes"]["/static/<path:filename>"]["requests"], 0)
+
+class TestMetrics(unittest.TestCase):
+
+    def test_counters_sum_across_threads(self):
+        """Test that per-thread shards are summed at scrape time"""
+        import threading
+        import metrics
+
+        registry = metrics.Registry()
+        counter = registry.counter("test_total", "Test counter.", ("route",))
+        threads = [threading.Thread(target=lambda: [counter.inc("/game") for _ in range(1000)])
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(counter.value("/game"), 4000)
+        self.assertIn('test_total{route="/game"} 4000', registry.render())
+
+    def test_shards_of_finished_threads_are_folded_in(self):
+        """Test that a thread's shard is merged into the totals when the thread exits"""
+        import gc
+        import threading
+        import metrics
+
+        registry = metrics.Registry()
+        histogram = registry.histogram("test_seconds", "Test histogram.", ("route",))
+        for _ in range(50):
+            thread = threading.Thread(target=lambda: [histogram.observe(0.002, "/game") for _ in range(10)])
+            thread.start()
+            thread.join()
+        gc.collect()
+
+        self.assertEqual(len(histogram._shards), 0)
+        self.assertEqual(histogram.count("/game"), 500)
+        self.assertIn('test_seconds_sum{route="/game"} 1.0', registry.render())
+
+    def test_metrics_endpoint_reports_phases_and_sessions(self):
+        """Test that /metrics exposes request phases and session counts"""
+        from app import app
+
+        client = app.test_client()
+        client.post('/start', data={'player_name': 'Test Player'})
+        client.get('/action/rest')
+        client.get('/game')
+        text = client.get('/metrics').get_data(as_text=True)
+
+        for phase in ("state_load", "logic", "render"):
+            self.assertIn(f'game_phase_seconds_count{{phase="{phase}"}}', text)
+        self.assertIn('game_store_lookups_total{result="hit"}', text)
+        self.assertIn("game_live_sessions", text)
+
+class TestEventLog(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def _state(self, game):
+        return (game.player_name, game.days, game.energy, game.eco_points,
+                game.sustainability_level, game.current_location, game.tip_cursor, game.seed, game.moves)
+
+    def _play(self, log, game_id, moves):
+        game = SustainabilityGame()
+        game.player_name = "Test Player"
+        log.append(game_id, "start", None, game)
+        for kind, arg in moves:
+            if kind == "tip":
+                game.get_random_tip()
+            else:
+                game.apply_move(kind, arg)
+            log.append(game_id, kind, arg, game)
+        return game
+
+    def test_recover_replays_moves(self):
+        """Test that a reopened log rebuilds every game"""
+        from event_log import EventLog
+        from session_store import new_game_id
+
+        log = EventLog(self.directory, fsync=False)
+        self.assertEqual(log.recover(), {})
+        game_id = new_game_id()
+        game = self._play(log, game_id, [("action", "save_energy"), ("travel", "market"),
+                                         ("tip", None), ("end_day", None)])
+        self.assertTrue(log.wait(timeout=5))
+        log.close()
+
+        recovered = EventLog(self.directory, fsync=False)
+        games = recovered.recover()
+        recovered.close()
+        self.assertEqual(self._state(games[game_id]), self._state(game))
+
+    def test_snapshots_replace_old_segments(self):
+        """Test that recovery after rotation uses the snapshot and the log tail"""
+        from event_log import EventLog
+        from session_store import new_game_id
+
+        log = EventLog(self.directory, snapshot_every=3, fsync=False)
+        log.recover()
+        games = {}
+        for _ in range(3):
+            game_id = new_game_id()
+            games[game_id] = self._play(log, game_id, [("action", "rest")])
+            log.wait(timeout=5)
+        log.close()
+
+        self.assertEqual(len([name for name in os.listdir(self.directory) if name.startswith("snapshot")]), 1)
+        recovered = EventLog(self.directory, fsync=False)
+        restored = recovered.recover()
+        recovered.close()
+        self.assertEqual({game_id: self._state(game) for game_id, game in restored.items()},
+                         {game_id: self._state(game) for game_id, game in games.items()})
+
+    def test_appends_do_not_encode_move_history(self):
+        """Test that an append costs the same however many moves a game has, and snapshots still hold them"""
+        import event_log
+        from event_log import EventLog
+        from session_store import new_game_id
+
+        log = EventLog(self.directory, snapshot_every=10 ** 6, fsync=False)
+        log.recover()
+        game_id = new_game_id()
+        with patch("event_log.move_token", wraps=event_log.move_token) as move_token:
+            game = self._play(log, game_id, [("action", "rest")] * 500)
+        self.assertEqual(move_token.call_count, 0)
+        # A move applied but not yet logged is left out of the snapshot.
+        game.apply_move("end_day")
+        log.snapshot_every = 1
+        self._play(log, new_game_id(), [])
+        log.wait(timeout=5)
+        log.close()
+
+        recovered = EventLog(self.directory, fsync=False)
+        games = recovered.recover()
+        recovered.close()
+        self.assertEqual(games[game_id].moves, [("action", "rest")] * 500)
+
+    def test_snapshots_leave_out_finished_and_idle_games(self):
+        """Test that forgotten games and games idle past the TTL are not carried into snapshots"""
+        from event_log import EventLog
+        from session_store import new_game_id
+
+        now = [0]
+        log = EventLog(self.directory, snapshot_every=1000, fsync=False, ttl=10, clock=lambda: now[0])
+        log.recover()
+        finished, idle, active = new_game_id(), new_game_id(), new_game_id()
+        self._play(log, finished, [("end_day", None)] * 7)
+        log.forget(finished)
+        self._play(log, idle, [("action", "rest")])
+        now[0] = 20
+        game = self._play(log, active, [("action", "rest")])
+        log.snapshot_every = 1
+        log.append(active, "tip", None, game)
+        log.wait(timeout=5)
+        log.close()
+
+        recovered = EventLog(self.directory, fsync=False)
+        games = recovered.recover()
+        recovered.close()
+        self.assertEqual(list(games), [active])
+
+    def test_tips_after_the_end_do_not_revive_a_game(self):
+        """Test that asking a finished game for a tip neither logs it nor puts it back into snapshots"""
+        from app import app
+        from event_log import EventLog
+
+        log = EventLog(self.directory, fsync=False)
+        log.recover()
+        with patch.object(app, 'event_log', log):
+            client = app.test_client()
+            client.post('/start', data={'player_name': 'Test Player'})
+            for _ in range(7):
+                client.get('/end_day')
+            with client.session_transaction() as session:
+                game_id = session['game_id']
+            self.assertNotIn(game_id, log._states)
+            self.assertEqual(client.get('/random_tip').headers['Location'], '/game_over')
+            self.assertNotIn(game_id, log._states)
+        log.close()
+
+    def test_torn_tail_is_ignored(self):
+        """Test that a partially written last record does not break recovery"""
+        from event_log import EventLog
+        from session_store import new_game_id
+
+        log = EventLog(self.directory, fsync=False)
+        log.recover()
+        game_id = new_game_id()
+        game = self._play(log, game_id, [("action", "rest")])
+        log.close()
+        segment = sorted(name for name in os.listdir(self.directory) if name.startswith("events"))[-1]
+        with open(os.path.join(self.directory, segment), "ab") as f:
+            f.write(b"\x10\x00garbage")
+
+        recovered = EventLog(self.directory, fsync=False)
+        games = recovered.recover()
+        recovered.close()
+        self.assertEqual(self._state(games[game_id]), self._state(game))
+
+class TestAsgi(unittest.TestCase):
+
+    def _call(self, method, path, body=b"", cookie=None, headers=()):
+        import asyncio
+        from asgi import application
+
+        path, _, query = path.partition("?")
+        headers = [(name.lower().encode(), value.encode()) for name, value in headers]
+        if cookie:
+            headers.append((b"cookie", cookie.encode()))
+        scope = {"type": "http", "method": method, "path": path, "query_string": query.encode(),
+                 "headers": headers}
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        sent = []
+
+        async def receive():
+            return messages.pop()
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application(scope, receive, send))
+        headers = {name.decode(): value.decode() for name, value in sent[0]["headers"]}
+        return sent[0]["status"], headers, sent[1]["body"]
+
+    def test_pages_share_the_flask_session(self):
+        """Test that a game started over ASGI can be continued through Flask"""
+        from app import app
+
+        status, headers, _ = self._call("POST", "/start", b"player_name=Test+Player")
+        self.assertEqual((status, headers["location"]), (302, "/game"))
+        cookie = headers["set-cookie"].split(";")[0]
+        self._call("GET", "/action/rest", cookie=cookie)
+        status, _, body = self._call("GET", "/game", cookie=cookie)
+        self.assertEqual(status, 200)
+        self.assertIn(b"Test Player", body)
+
+        client = app.test_client()
+        client.set_cookie("session", cookie.split("=", 1)[1])
+        self.assertIn(b'<span id="energy">150</span>', client.get("/game").data)
+
+    def test_static_files_are_compressed_and_cached(self):
+        """Test that the ASGI front end serves hashed, gzipped static files and 304s"""
+        import gzip
+        from app import app
+
+        url = app.assets.url("game.js")
+        status, headers, body = self._call("GET", url, headers=[("Accept-Encoding", "gzip")])
+        self.assertEqual((status, headers["content-encoding"]), (200, "gzip"))
+        self.assertIn("immutable", headers["cache-control"])
+        self.assertEqual(gzip.decompress(body), app.assets.get("game.js").body)
+        status, _, body = self._call("GET", url, headers=[("Accept-Encoding", "gzip"),
+                                                          ("If-None-Match", headers["etag"])])
+        self.assertEqual((status, body), (304, b""))
+
+    def test_cluster_nodes_mint_owned_ids_and_hand_games_off(self):
+        """Test that an ASGI node in a cluster creates games it owns and serves the handoff routes"""
+        import json
+        from app import app
+        from event_log import decode_games
+        from router import HashRing
+
+        ring = HashRing(["http://node-a", "http://node-b"])
+        with patch.multiple(app, node="http://node-a", ring=ring, cluster_token="token", create=True):
+            ids = [json.loads(self._call("POST", "/api/v1/games", b'{"player_name": "Test Player"}')[2])["game_id"]
+                   for _ in range(10)]
+            self.assertEqual({ring.node_for(game_id) for game_id in ids}, {"http://node-a"})
+
+            self.assertEqual(self._call("GET", f"/internal/games/{ids[0]}")[0], 403)
+            status, _, data = self._call("GET", f"/internal/games/{ids[0]}", headers=[("X-Cluster-Token", "token")])
+            self.assertEqual(status, 200)
+            self.assertEqual([game_id for game_id, _ in decode_games(data)], [ids[0]])
+            self.assertEqual(self._call("GET", f"/api/v1/games/{ids[0]}")[0], 404)
+            status, _, body = self._call("POST", "/internal/games", data, headers=[("X-Cluster-Token", "token")])
+            self.assertEqual(json.loads(body), {"received": 1})
+            self.assertEqual(self._call("GET", f"/api/v1/games/{ids[0]}")[0], 200)
+
+    def test_builtin_server_decodes_paths(self):
+        """Test that the built-in server passes percent-decoded paths to the app"""
+        import asyncio
+        from asgi import serve
+
+        async def echo(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": scope["path"].encode()})
+
+        async def request():
+            ports = []
+            server = asyncio.ensure_future(serve(echo, port=0, ready=ports.append))
+            while not ports:
+                await asyncio.sleep(0.01)
+            reader, writer = await asyncio.open_connection("127.0.0.1", ports[0])
+            writer.write(b"GET /action/plant%5Ftrees%20now HTTP/1.1\r\nConnection: close\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+            server.cancel()
+            return response
+
+        self.assertTrue(asyncio.run(request()).endswith(b"\r\n\r\n/action/plant_trees now"))
+
+    def test_json_api_matches_flask(self):
+        """Test that the ASGI JSON API applies batches atomically"""
+        import json
+
+        status, _, body = self._call("POST", "/api/v1/games", b'{"player_name": "Test Player"}')
+        self.assertEqual(status, 201)
+        game_id = json.loads(body)["game_id"]
+        status, _, body = self._call("POST", f"/api/v1/games/{game_id}/actions",
+                                     b'{"moves": [{"type": "end_day"}, {"type": "action", "action": "fly"}]}')
+        self.assertEqual((status, json.loads(body)["index"]), (400, 1))
+        _, _, body = self._call("GET", f"/api/v1/games/{game_id}")
+        self.assertEqual(json.loads(body)["state"]["day"], 1)
+        self.assertEqual(self._call("GET", "/nowhere")[0], 404)
+
+class TestLiveUpdates(unittest.TestCase):
+
+    def test_deltas_hold_only_changed_fields(self):
+        """Test that subscribers get the full state once, then only changes"""
+        import live
+
+        broadcaster = live.Broadcaster()
+        game = SustainabilityGame()
+        messages = []
+        unsubscribe = broadcaster.subscribe("game", game, messages.append)
+        game.perform_action("rest")
+        broadcaster.publish_state("game", game)
+        broadcaster.publish_state("game", game)
+        unsubscribe()
+        broadcaster.publish_state("game", game)
+
+        self.assertEqual(len(messages), 2)
+        self.assertIn(b'"location":"home"', messages[0])
+        self.assertEqual(messages[1], b'event: state\ndata: {"energy":150}\n\n')
+        self.assertEqual(len(broadcaster), 0)
+
+    def test_moves_and_tips_are_pushed(self):
+        """Test that moves and drawn tips reach the stream and still return the new state"""
+        from app import app
+
+        client = app.test_client()
+        game_id = client.post('/api/v1/games', json={'player_name': 'Test Player'}).get_json()['game_id']
+        messages = []
+        unsubscribe = app.live.subscribe(game_id, app.store.get(game_id), messages.append)
+        response = client.post(f'/api/v1/games/{game_id}/actions', json={'type': 'action', 'action': 'rest'},
+                               headers={'Prefer': 'return=minimal'})
+        tip = client.post(f'/api/v1/games/{game_id}/tips').get_json()['tip']
+        unsubscribe()
+
+        self.assertEqual((response.status_code, response.get_json()['state']['energy']), (200, 150))
+        self.assertIn(b'"energy":150', messages[1])
+        self.assertTrue(messages[2].startswith(b'event: tip') and tip.encode() in messages[2])
+
+    def test_flask_streams_are_off_by_default(self):
+        """Test that the WSGI app does not tie up a worker per open event stream unless asked to"""
+        from app import app
+
+        client = app.test_client()
+        game_id = client.post('/api/v1/games', json={'player_name': 'Test Player'}).get_json()['game_id']
+        subscribers = len(app.live)
+        self.assertEqual(client.get(f'/api/v1/games/{game_id}/events').status_code, 404)
+        self.assertEqual(len(app.live), subscribers)
+
+    def test_asgi_stream_ends_subscription_on_disconnect(self):
+        """Test that closing an ASGI event stream unsubscribes it"""
+        import asyncio
+        from asgi import application, flask_app
+
+        game_id = flask_app.test_client().post('/api/v1/games', json={'player_name': 'Test Player'}).get_json()['game_id']
+        subscribers = len(flask_app.live)
+        sent = []
+
+        async def run():
+            gone = asyncio.Event()
+            messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                await gone.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                sent.append(message)
+                if message.get("more_body"):
+                    gone.set()
+
+            scope = {"type": "http", "method": "GET", "path": f"/api/v1/games/{game_id}/events", "headers": []}
+            await asyncio.wait_for(application(scope, receive, send), 5)
+
+        asyncio.run(run())
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertTrue(sent[1]["body"].startswith(b"event: state"))
+        self.assertEqual(len(flask_app.live), subscribers)
+
+class TestLeaderboard(unittest.TestCase):
+
+    def _finished(self, name, eco_points, sustainability):
+        game = SustainabilityGame()
+        game.player_name = name
+        game.eco_points = eco_points
+        game.sustainability_level = sustainability
+        game.days = 8
+        return game
+
+    def test_ranks_and_percentiles_match_a_full_sort(self):
+        """Test that index ranks and quantiles agree with sorting every score"""
+        import random
+        from leaderboard import Leaderboard
+
+        rng = random.Random(3)
+        board = Leaderboard(size=5)
+        games = [self._finished(f"p{i}", rng.randint(-2000, 3000), rng.uniform(-50, 80)) for i in range(2000)]
+        for game in games:
+            board.record(game)
+        scores = sorted((game.eco_points for game in games), reverse=True)
+
+        probe = games[17]
+        self.assertEqual(board.rank(probe)["eco_points"]["rank"], scores.index(probe.eco_points) + 1)
+        self.assertEqual(board.percentiles("eco_points", (0.5,))["p50"], sorted(scores)[999])
+        self.assertEqual([entry["score"] for entry in board.top("eco_points", 5)], scores[:5])
+
+    def test_finished_games_are_recorded_once(self):
+        """Test that a game reaches the leaderboard when it ends and takes no more moves"""
+        from app import app
+
+        client = app.test_client()
+        client.post('/start', data={'player_name': 'Test Player'})
+        recorded = len(app.leaderboard)
+        for _ in range(7):
+            client.get('/end_day')
+        self.assertEqual(client.get('/action/rest').headers['Location'], '/game_over')
+        client.get('/end_day')
+
+        self.assertEqual(len(app.leaderboard), recorded + 1)
+        self.assertIn(b'Eco Points Rank: #', client.get('/game_over').data)
+        self.assertIn('eco_points', client.get('/api/v1/leaderboard').get_json()['boards'])
+
+    def test_out_of_range_scores_are_clamped(self):
+        """Test that huge scores rank at the ends of a bounded index instead of growing it"""
+        from leaderboard import MAX_KEY, MIN_KEY, Leaderboard
+
+        board = Leaderboard(size=5)
+        for name, eco_points in (("huge", 10 ** 12), ("big", 10 ** 9), ("low", -10 ** 12), ("normal", 50)):
+            board.record(self._finished(name, eco_points, 1))
+
+        index = board._indexes["eco_points"]
+        self.assertLessEqual(len(index._counts), MAX_KEY - MIN_KEY + 1)
+        self.assertEqual(board.top("eco_points", 1), [{"rank": 1, "name": "huge", "score": 10 ** 12}])
+        self.assertEqual(board.rank(self._finished("normal", 50, 1))["eco_points"],
+                         {"rank": 3, "of": 4, "percentile": 25.0})
+        self.assertEqual(board.rank(self._finished("low", -10 ** 12, 1))["eco_points"],
+                         {"rank": 4, "of": 4, "percentile": 0.0})
+
+class TestRules(unittest.TestCase):
+
+    def test_unknown_actions_are_rejected_at_load(self):
+        """Test that a location offering a missing action fails compilation"""
+        from rules import RuleError, compile_rules
+
+        locations = {"home": {"actions": ["rest"]}, "work": {"actions": ["Drive_a_car"]}}
+        impacts = {"rest": {"eco_points": 0, "energy": 50, "sustainability": 0},
+                   "drive_a_car": {"eco_points": -5, "energy": 10, "sustainability": -2}}
+        with self.assertRaisesRegex(RuleError, "did you mean 'drive_a_car'"):
+            compile_rules(locations, impacts)
+        with self.assertRaises(ValueError):
+            content_store.Content("bad", {"facts": {}, "location_facts": {}, "tips": [],
+                                          "locations": locations, "action_impacts": impacts})
+
+    def test_every_offered_action_applies(self):
+        """Test that each location's actions, including driving at work, change the state"""
+        from sustainability_game import RULES
+
+        for location in RULES.location_names:
+            for action in RULES.actions_at(location):
+                game = SustainabilityGame()
+                result = game.perform_action(action)
+                self.assertNotIn("error", result)
+                self.assertEqual(game.energy, 100 + result["energy"])
+        self.assertIn("drive_a_car", RULES.actions_at("work"))
+
+class TestTerminalGame(unittest.TestCase):
+
+    def test_scripted_game_runs_without_io(self):
+        """Test that a scripted terminal game plays to the end headless"""
+        from text_sustainability_game import play_headless
+
+        script = ["Test Player", ""] + ["1", "5", ""] * 7
+        game = play_headless(script)
+        self.assertTrue(game.done)
+        self.assertEqual(game.days, 8)
+        self.assertEqual(game.eco_points, -35)
+
+    def test_facts_follow_content_reloads(self):
+        """Test that the terminal game draws facts from the current content, not the content at import"""
+        from types import SimpleNamespace
+        from sampler import Sampler
+        from text_sustainability_game import TerminalGame
+
+        game = TerminalGame(seed=1)
+        reloaded = SimpleNamespace(facts=Sampler(["A fact added by a reload."]))
+        with patch('sampler.current', return_value=reloaded):
+            game.show_random_fact()
+        self.assertIn("A fact added by a reload.", game._flush())
+
+    def test_interactive_mode_uses_pluggable_io_and_clock(self):
+        """Test that the interactive driver reads, writes and sleeps only through its arguments"""
+        from text_sustainability_game import play_interactive
+
+        lines = iter(["Test Player", "", "4", "5", "6", "y"])
+        written, slept = [], []
+        with patch('builtins.input') as real_input, patch('time.sleep') as real_sleep, \
+                patch('os.system') as real_system:
+            game = play_interactive(read=lambda prompt: next(lines), write=written.append, sleep=slept.append)
+        real_input.assert_not_called()
+        real_sleep.assert_not_called()
+        real_system.assert_not_called()
+
+        self.assertEqual((game.current_location, game.energy), ("park", 95))
+        self.assertEqual(slept, [1])
+        self.assertIn("\nTraveled to Park\n", written)
+        self.assertIn("\nThank you for playing the Hong Kong Sustainability Challenge!\n", written)
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "games.hkt")
+
+    def _play(self, seed, moves):
+        game = SustainabilityGame(seed=seed)
+        game.player_name = f"Player {seed}"
+        tips = [game.apply_move(kind, arg) for kind, arg in moves]
+        return game, tips
+
+    def test_seed_and_moves_reproduce_a_game(self):
+        """Test that a game's seed and recorded moves replay to the same state and tips"""
+        import copy
+        from replay import final_state
+
+        moves = [("tip", None), ("action", "save_energy"), ("travel", "park"), ("tip", None), ("end_day", None)]
+        game, results = self._play(1234, moves)
+        self.assertEqual(game.moves, moves)
+        again, again_results = self._play(1234, game.moves)
+        self.assertEqual(again_results, results)
+        self.assertEqual((final_state(again), again.tip_cursor), (final_state(game), game.tip_cursor))
+
+        # Rejected moves are not recorded, and copies record independently.
+        game.perform_action("not_an_action")
+        copied = copy.copy(game)
+        copied.end_day()
+        self.assertEqual(game.moves, moves)
+
+    def _record(self, count):
+        from replay import TranscriptWriter
+
+        games = []
+        for seed in range(count):
+            moves = [("action", "save_energy"), ("tip", None)] * (seed % 3) + [("travel", "beach")]
+            moves += [("action", "clean_beach"), ("end_day", None)] * 7
+            games.append(self._play(seed, moves)[0])
+        with TranscriptWriter(self.path) as writer:
+            for game in games[:count // 2]:
+                writer.write(game)
+        # Reopening appends under a new symbol table.
+        with TranscriptWriter(self.path) as writer:
+            for game in games[count // 2:]:
+                writer.write(game)
+        return games
+
+    def test_transcripts_follow_content_reloads(self):
+        """Test that games are stamped with the rules current when they are written"""
+        import json
+        from replay import TranscriptWriter, read_transcripts
+        from sustainability_game import rules_hash
+
+        with open(content_store.CONTENT_PATH) as f:
+            data = json.load(f)
+        data["action_impacts"]["rest"]["energy"] = 40
+        edited = content_store.Content("edited", data)
+        with TranscriptWriter(self.path) as writer:
+            writer.write(self._play(1, [("action", "rest")])[0])
+            with patch('content_store.current', return_value=edited):
+                writer.write(self._play(2, [("action", "rest")])[0])
+            writer.write(self._play(3, [("action", "rest")])[0])
+
+        content = content_store.current()
+        current, reloaded = rules_hash(content.locations, content.action_impacts), rules_hash(
+            edited.locations, edited.action_impacts)
+        self.assertNotEqual(current, reloaded)
+        self.assertEqual([(t.rules_version, t.moves) for t in read_transcripts(self.path)],
+                         [(current, [("action", "rest")]), (reloaded, [("action", "rest")]),
+                          (current, [("action", "rest")])])
+
+    def test_transcripts_stream_back_and_verify(self):
+        """Test that transcripts read back in small chunks and replay to their recorded states"""
+        from replay import read_transcripts, verify
+
+        games = self._record(20)
+        transcripts = list(read_transcripts(self.path, chunk_size=64))
+        self.assertEqual([(t.seed, t.player_name, t.moves) for t in transcripts],
+                         [(g.seed, g.player_name, g.moves) for g in games])
+        self.assertLess(os.path.getsize(self.path) / len(games), 100)
+
+        modes = [False] + ([True] if numpy is not None else [])
+        for vectorized in modes:
+            report = verify(read_transcripts(self.path), batch_size=7, vectorized=vectorized)
+            self.assertEqual((report.games, report.mismatches), (20, 0))
+
+        # A game whose recorded result no longer matches is reported.
+        transcripts[3].final = (8, 0, 0, 0.0)
+        for vectorized in modes:
+            report = verify(transcripts, vectorized=vectorized)
+            self.assertEqual(report.mismatches, 1)
+            self.assertEqual(report.examples[0]["seed"], 3)
+            self.assertEqual(report.examples[0]["recorded"]["energy"], 0)
+
+    def test_terminal_game_seed_reproduces_output(self):
+        """Test that a terminal game with the same seed and input shows the same facts"""
+        from text_sustainability_game import TerminalGame, play_headless
+
+        def transcript(seed):
+            game = TerminalGame(seed=seed)
+            output = game.start()
+            for line in ["Test Player", "", "7", "", "5", ""]:
+                output += game.send(line)
+            return [item for item in output if isinstance(item, str)]
+
+        self.assertEqual(transcript(7), transcript(7))
+        self.assertEqual(play_headless(["Test Player"], TerminalGame(quiet=True, seed=7)).fact_cursor,
+                         play_headless(["Test Player"], TerminalGame(quiet=True, seed=7)).fact_cursor)
+
+class TestStartup(unittest.TestCase):
+
+    def test_app_import_defers_optional_modules(self):
+        """Test that importing the app loads neither NumPy nor asyncio nor the fact samplers"""
+        import subprocess
+        code = ("import sys, app, sampler; "
+                "print(sorted(name for name in ('numpy', 'batch_engine', 'asyncio') if name in sys.modules)); "
+                "print(sampler._current is None)")
+        result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                env=dict(os.environ, GAME_METRICS="0"), capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.split("\n")[:2], ["[]", "True"])
+
+    def test_stateless_mode_needs_a_secret_key(self):
+        """Test that the app refuses to sign state cookies with the default secret key"""
+        import subprocess
+        env = {name: value for name, value in os.environ.items() if name != "GAME_SECRET_KEY"}
+        env.update(GAME_METRICS="0", GAME_STATELESS="1")
+        result = subprocess.run([sys.executable, "-c", "import app"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                env=env, capture_output=True, text=True)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("GAME_SECRET_KEY", result.stderr)
+
+        env["GAME_SECRET_KEY"] = "a private key"
+        subprocess.run([sys.executable, "-c", "import app"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                       env=env, capture_output=True, check=True)
+
+class TestHttpCache(unittest.TestCase):
+
+    def setUp(self):
+        from app import app
+        self.app = app
+        self.client = app.test_client()
+
+    def test_pages_link_hashed_static_urls(self):
+        """Test that static files are linked by content hash and cached for a year under that URL"""
+        import re
+        page = self.client.get("/").get_data(as_text=True)
+        url = re.search(r'href="(/static/style\.css\?v=\w+)"', page).group(1)
+        self.assertEqual(url, self.app.assets.url("style.css"))
+
+        response = self.client.get(url)
+        self.assertEqual(response.headers["Cache-Control"], "public, max-age=31536000, immutable")
+        with open(os.path.join(self.app.root_path, "static", "style.css"), "rb") as f:
+            self.assertEqual(response.data, f.read())
+        # Unversioned or stale URLs must be revalidated.
+        self.assertEqual(self.client.get("/static/style.css?v=old").headers["Cache-Control"], "no-cache")
+        self.assertEqual(self.client.get("/static/../app.py").status_code, 404)
+
+    def test_compression_and_conditional_requests(self):
+        """Test gzip above the size threshold, per-encoding ETags and 304 Not Modified"""
+        import gzip
+        import http_cache
+
+        plain = self.client.get("/static/game.js")
+        self.assertNotIn("Content-Encoding", plain.headers)
+        compressed = self.client.get("/static/game.js", headers={"Accept-Encoding": "gzip;q=1.0, identity"})
+        self.assertEqual(compressed.headers["Content-Encoding"], "gzip")
+        self.assertEqual(compressed.headers["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(compressed.data), plain.data)
+        self.assertLess(len(compressed.data), len(plain.data))
+        self.assertNotEqual(compressed.headers["ETag"], plain.headers["ETag"])
+
+        not_modified = self.client.get("/static/game.js", headers={
+            "Accept-Encoding": "gzip", "If-None-Match": compressed.headers["ETag"]})
+        self.assertEqual((not_modified.status_code, not_modified.data), (304, b""))
+        self.assertEqual(self.client.get("/static/game.js", headers={
+            "If-None-Match": compressed.headers["ETag"]}).status_code, 200)
+
+        # Small bodies are sent as they are.
+        status, headers, body = http_cache.finish("GET", 200, [("Content-Type", "text/plain")], b"ok", "gzip")
+        self.assertEqual((status, body), (200, b"ok"))
+        self.assertNotIn("Content-Encoding", dict(headers))
+        self.assertIsNone(http_cache.negotiate("gzip;q=0, br;q=0"))
+
+    def test_middleware_sends_headers_once_for_error_pages(self):
+        """Test that a start_response call with exc_info is buffered like any other"""
+        import sys
+        import http_cache
+
+        def failing_app(environ, start_response):
+            start_response("200 OK", [("Content-Type", "text/html")])
+            try:
+                raise RuntimeError("broken page")
+            except RuntimeError:
+                start_response("500 Internal Server Error", [("Content-Type", "text/plain"),
+                                                             ("Content-Length", "5")], sys.exc_info())
+            return [b"error"]
+
+        calls = []
+        body = http_cache.WSGIMiddleware(failing_app)({"REQUEST_METHOD": "GET"},
+                                                      lambda *args: calls.append(args))
+        self.assertEqual(b"".join(body), b"error")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0][0], "500 Internal Server Error")
+        self.assertIsNotNone(calls[0][2])
+
+class TestRooms(unittest.TestCase):
+
+    def test_sharded_totals_add_up_across_threads(self):
+        """Test that concurrent actions in one room are all counted"""
+        import threading
+        from rooms import Room
+
+        room = Room("test")
+
+        def play():
+            room.join()
+            for _ in range(1000):
+                room.record_action(5, 0.5)
+
+        threads = [threading.Thread(target=play) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        state = room.state()
+        self.assertEqual((state["players"], state["actions"], state["eco_points"]), (8, 8000, 40000))
+        self.assertEqual(state["average_sustainability"], 500.0)
+
+    def test_threads_write_to_different_shards(self):
+        """Test that concurrent threads spread over the shards instead of sharing one"""
+        import threading
+        from rooms import ShardedCounter
+
+        counter = ShardedCounter(("actions",), shards=16)
+        ready = threading.Barrier(8)
+
+        def play():
+            ready.wait()
+            counter.add(1)
+
+        threads = [threading.Thread(target=play) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.totals(), {"actions": 8})
+        self.assertEqual(sum(1 for shard in counter._shards if shard[0]), 8)
+
+    def test_idle_rooms_are_dropped(self):
+        """Test that rooms without activity for the TTL are swept when a room is created"""
+        from rooms import Rooms
+
+        now = [0]
+        rooms = Rooms(ttl=10, sweep_interval=5, clock=lambda: now[0])
+        rooms.get("quiet").join()
+        rooms.get("busy").join()
+        now[0] = 8
+        rooms.get("busy").record_action(5, 0.5)
+        now[0] = 15
+        rooms.get("new")
+        self.assertIsNone(rooms.get("quiet", create=False))
+        self.assertEqual(len(rooms), 2)
+
+    def test_finished_and_expired_games_leave_their_room(self):
+        """Test that a room's totals and average cover only the games still in progress"""
+        from rooms import Rooms
+
+        now = [0]
+        rooms = Rooms(ttl=10, sweep_interval=5, clock=lambda: now[0])
+        rules = content_store.current().rules
+        games = {}
+        for game_id in ("finished", "idle", "playing"):
+            game = games[game_id] = SustainabilityGame()
+            game.room = "harbour"
+            rooms.record(game_id, game, [("start", None)], rules)
+        for game_id in ("finished", "idle"):
+            games[game_id].apply_move("action", "plant_trees")
+            rooms.record(game_id, games[game_id], [("action", "plant_trees")], rules)
+        self.assertEqual(rooms.get("harbour").state()["players"], 3)
+
+        games["finished"].days = 7
+        games["finished"].apply_move("end_day")
+        rooms.record("finished", games["finished"], [("end_day", None)], rules)
+        now[0] = 8
+        games["playing"].apply_move("action", "rest")
+        rooms.record("playing", games["playing"], [("action", "rest")], rules)
+        now[0] = 16
+        state = rooms.get("harbour").state()
+        self.assertEqual((state["players"], state["actions"], state["eco_points"]), (1, 1, 0))
+        self.assertEqual(state["average_sustainability"], 0.0)
+        self.assertEqual(len(rooms.get("harbour")), 1)
+
+    def test_players_in_a_room_share_a_city(self):
+        """Test that two players' actions add up in their room's state"""
+        from app import app
+
+        client = app.test_client()
+        self.assertEqual(client.post('/api/v1/games', json={"player_name": "A", "room": "bad room"}).status_code, 400)
+        self.assertEqual(client.get('/api/v1/rooms/test-shared').status_code, 404)
+        for name in ("A", "B"):
+            game_id = client.post('/api/v1/games', json={"player_name": name, "room": "test-shared"}).get_json()["game_id"]
+            client.post(f"/api/v1/games/{game_id}/actions", json={"type": "action", "action": "save_energy"})
+
+        state = client.get('/api/v1/rooms/test-shared').get_json()
+        self.assertEqual((state["players"], state["actions"]), (2, 2))
+        self.assertEqual(state["eco_points"], 20)
+
+        client.post('/start', data={'player_name': 'C', 'room': 'test-shared'})
+        self.assertIn(b'City: test-shared', client.get('/game').data)
+
+    def test_event_log_keeps_the_room(self):
+        """Test that recovered games are back in their room"""
+        from event_log import EventLog
+        from session_store import new_game_id
+
+        directory = tempfile.mkdtemp()
+        log = EventLog(directory, fsync=False)
+        log.recover()
+        game = SustainabilityGame()
+        game.player_name = "Test Player"
+        game.room = "harbour"
+        game_id = new_game_id()
+        log.append(game_id, "start", None, game)
+        game.apply_move("action", "rest")
+        log.append(game_id, "action", "rest", game)
+        log.close()
+
+        recovered = EventLog(directory, fsync=False)
+        self.assertEqual(recovered.recover()[game_id].room, "harbour")
+        recovered.close()
+
+class TestCookieState(unittest.TestCase):
+
+    def setUp(self):
+        from app import app
+        from cookie_state import CookieState
+        self.app = app
+        self.app.cookie_state = CookieState(app.secret_key)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.app.cookie_state = None
+
+    def _state_cookie(self):
+        from cookie_state import COOKIE_NAME
+        return self.client.get_cookie(COOKIE_NAME).value
+
+    def test_round_trip_and_tampering(self):
+        """Test that a game survives the cookie and a changed or expired cookie is refused"""
+        from cookie_state import CookieState
+        from session_store import new_game_id
+
+        now = [1000.0]
+        state = CookieState("secret", max_age=60, clock=lambda: now[0])
+        game = SustainabilityGame(seed=7)
+        game.player_name = "Test Player"
+        game.room = "harbour"
+        for kind, arg in [("travel", "park"), ("action", "plant_trees"), ("tip", None), ("end_day", None)]:
+            game.get_random_tip() if kind == "tip" else game.apply_move(kind, arg)
+        game_id = new_game_id()
+        value = state.dumps(game_id, game, 5)
+
+        found_id, restored, sequence = CookieState("secret", clock=lambda: now[0]).loads(value)
+        self.assertEqual((found_id, sequence), (game_id, 5))
+        for name in ("player_name", "room", "days", "current_location", "energy", "eco_points",
+                     "sustainability_level", "tip_cursor", "move_count"):
+            self.assertEqual(getattr(restored, name), getattr(game, name))
+        self.assertEqual(restored.get_random_tip(), game.get_random_tip())
+        self.assertEqual(restored.progress, game.progress)
+        self.assertLess(len(value), 160)
+
+        tampered = value[:30] + ("A" if value[30] != "A" else "B") + value[31:]
+        self.assertIsNone(state.loads(tampered))
+        self.assertIsNone(CookieState("other secret", clock=lambda: now[0]).loads(value))
+        self.assertIsNone(state.loads(value, new_game_id()))
+        now[0] += 61
+        self.assertIsNone(state.loads(value))
+
+    def test_large_scores_and_long_names(self):
+        """Test that energy and eco points past 16 bits round-trip and oversized state is refused"""
+        from cookie_state import CookieState
+        from session_store import new_game_id
+
+        state = CookieState("secret")
+        game = SustainabilityGame()
+        game.player_name = "Test Player"
+        game.energy, game.eco_points = 10 ** 6, -10 ** 6
+        game_id = new_game_id()
+        restored = state.loads(state.dumps(game_id, game, 1))[1]
+        self.assertEqual((restored.energy, restored.eco_points), (10 ** 6, -10 ** 6))
+
+        game.player_name = "x" * 5000
+        with self.assertRaises(ValueError):
+            state.dumps(game_id, game, 2)
+
+        self.client.post('/start', data={'player_name': 'Test Player'})
+        for _ in range(700):
+            response = self.client.get('/action/rest')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(b'<span id="energy">35100</span>', self.client.get('/game').data)
+
+    def test_stateless_game_keeps_nothing_on_the_server(self):
+        """Test that a game played from the cookie is never stored and cannot be rolled back"""
+        stored = len(self.app.store)
+        self.client.post('/start', data={'player_name': 'Test Player'})
+        self.client.get('/change_location/park')
+        before_action = self._state_cookie()
+        self.client.get('/action/plant_trees')
+
+        self.assertEqual(len(self.app.store), stored)
+        page = self.client.get('/game').data
+        self.assertIn(b'Test Player', page)
+        self.assertIn(b'<span id="energy">65</span>', page)
+
+        self.client.set_cookie('game_state', before_action)
+        self.assertEqual(self.client.get('/game').headers['Location'], '/')
+
+    def test_any_front_end_serves_the_cookie(self):
+        """Test that the ASGI front end continues a game started in Flask from its cookie alone"""
+        import asyncio
+        from asgi import application
+
+        game_id = self.client.post('/api/v1/games', json={"player_name": "Test Player"}).get_json()["game_id"]
+        cookie = self._state_cookie()
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b'{"type": "travel", "location": "beach"}', "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": f"/api/v1/games/{game_id}/actions", "query_string": b"",
+                 "headers": [(b"cookie", f"game_state={cookie}".encode())]}
+        asyncio.run(application(scope, receive, send))
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertIn(b'"location": "beach"', sent[1]["body"])
+        self.assertTrue(any(name == b"set-cookie" and value.startswith(b"game_state=")
+                            for name, value in sent[0]["headers"]))
+
+class TestRouter(unittest.TestCase):
+
+    def test_ring_moves_only_what_changes_hands(self):
+        """Test that a joining node takes about 1/N of the keys, all from other nodes"""
+        from router import HashRing
+        from session_store import new_game_id
+
+        keys = [new_game_id() for _ in range(20000)]
+        ring = HashRing(["a", "b", "c"])
+        before = {key: ring.node_for(key) for key in keys}
+        counts = [list(before.values()).count(node) for node in ring.nodes]
+        self.assertLess(max(counts) / min(counts), 1.5)
+
+        grown = ring.with_nodes(["a", "b", "c", "d"])
+        moved = [key for key in keys if grown.node_for(key) != before[key]]
+        self.assertTrue(all(grown.node_for(key) == "d" for key in moved))
+        self.assertAlmostEqual(len(moved) / len(keys), 0.25, delta=0.06)
+
+        shrunk = ring.with_nodes(["a", "c"])
+        self.assertTrue(all(before[key] == "b" for key in keys if shrunk.node_for(key) != before[key]))
+
+    def test_requests_are_not_resent_once_sent(self):
+        """Test that a reset after a move was sent is a 502, not a second move, and stale connections reconnect"""
+        import socket
+        import socketserver
+        import struct
+        import threading
+        import time
+        from werkzeug.test import Client
+        from router import Router
+
+        received = []
+
+        class Node(socketserver.BaseRequestHandler):
+            def handle(self):
+                data = b""
+                while b"\r\n\r\n" not in data:
+                    data += self.request.recv(4096)
+                path = data.split(b" ")[1].decode()
+                received.append(path)
+                if path == "/action/reset":
+                    # Reset the connection after the move was applied.
+                    self.request.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+                else:
+                    # Answer, then close a connection the client may keep for the next request.
+                    self.request.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Node)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            router = Router([f"http://127.0.0.1:{server.server_address[1]}"], "your_secret_key")
+            client = Client(router)
+            self.assertEqual(client.get('/action/rest').status_code, 200)
+            time.sleep(0.05)
+            self.assertEqual(client.get('/action/rest').status_code, 200)
+            # A connection of its own, so the reset is not taken for a stale keep-alive.
+            fresh = Client(Router(router.ring.nodes, "your_secret_key"))
+            self.assertEqual(fresh.get('/action/reset').status_code, 502)
+            self.assertEqual(received, ['/action/rest', '/action/rest', '/action/reset'])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_local_cluster_routes_and_hands_off_games(self):
+        """Test that games on local node processes survive nodes joining and leaving"""
+        import socket
+        from werkzeug.test import Client
+        from router import NODE_HEADER, Router, spawn_node
+
+        ports = []
+        for _ in range(3):
+            with socket.socket() as sock:
+                sock.bind(("127.0.0.1", 0))
+                ports.append(sock.getsockname()[1])
+        nodes = [f"http://127.0.0.1:{port}" for port in ports]
+        processes = [spawn_node(port, nodes[:2], "cluster secret") for port in ports]
+        try:
+            router = Router(nodes[:2], "cluster secret")
+            players = []
+            for number in range(30):
+                client = Client(router)
+                client.post('/start', data={'player_name': f'p{number}'})
+                response = client.get('/end_day')
+                self.assertEqual(response.headers['Location'], '/game')
+                players.append((client, response.headers[NODE_HEADER]))
+            self.assertEqual({node for _, node in players}, set(nodes[:2]))
+
+            moved = router.set_nodes(nodes)
+            self.assertGreater(sum(moved.values()), 0)
+            moved = router.set_nodes(nodes[1:])
+            self.assertGreater(moved[nodes[0]], 0)
+
+            for client, _ in players:
+                response = client.get('/game')
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(b'Day: <span id="day">2</span>', response.data)
+                self.assertIn(response.headers[NODE_HEADER], nodes[1:])
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+
+    def test_nodes_need_a_secret_key(self):
+        """Test that a cluster node refuses to start with the default secret key"""
+        import subprocess
+        env = {name: value for name, value in os.environ.items() if name != "GAME_SECRET_KEY"}
+        env.update(GAME_METRICS="0", GAME_NODE="http://127.0.0.1:5001")
+        result = subprocess.run([sys.executable, "-c", "import app"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                env=env, capture_output=True, text=True)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("GAME_SECRET_KEY", result.stderr)
+
+    def test_handoff_survives_an_unreachable_node_and_ends(self):
+        """Test that an unreachable owner leaves its games in place and the previous ring is dropped when done"""
+        import socket
+        from app import app, hand_off_games
+        from router import HashRing, cluster_token
+        from session_store import new_game_id
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            gone = f"http://127.0.0.1:{sock.getsockname()[1]}"
+        me = "http://127.0.0.1:1"
+        ring, token = HashRing([me, gone]), cluster_token("cluster secret")
+        game_id = new_game_id()
+        while ring.node_for(game_id) != gone:
+            game_id = new_game_id()
+        app.store.save(game_id, SustainabilityGame())
+        with patch.object(app, 'node', me), patch.object(app, 'ring', ring), \
+                patch.object(app, 'previous_ring', HashRing([me])), patch.object(app, 'cluster_token', token, create=True):
+            moved, left = hand_off_games()
+            self.assertEqual(moved, 0)
+            self.assertGreaterEqual(left, 1)
+            self.assertIsNotNone(app.store.get(game_id))
+
+            client = app.test_client()
+            self.assertEqual(client.post('/internal/handoff/done').status_code, 403)
+            response = client.post('/internal/handoff/done', headers={'X-Cluster-Token': token})
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(app.previous_ring)
+        app.store.delete(game_id)
+
+class TestSearch(unittest.TestCase):
+
+    def test_stemming_joins_word_forms(self):
+        """Test that inflected forms share a stem and stop words are dropped"""
+        from search import tokenize
+
+        self.assertEqual(tokenize("Recycling recycled RECYCLES"), ["recycl"] * 3)
+        self.assertEqual(tokenize("the glass and the glasses"), ["glass", "glass"])
+
+    def test_index_matches_a_linear_bm25_scan(self):
+        """Test that the mapped index ranks documents as a full BM25 scan does"""
+        import math
+        from collections import Counter
+        from search import B, K1, SearchIndex, build, documents, tokenize
+
+        content = content_store.current()
+        docs = documents(content)
+        path = os.path.join(tempfile.mkdtemp(), "index")
+        with open(path, "wb") as f:
+            f.write(build(content.version, docs))
+        index = SearchIndex.open(path)
+
+        counts = [Counter(tokenize(text)) for _, _, text in docs]
+        average = sum(sum(c.values()) for c in counts) / len(counts)
+        query = "recycling plastic waste in landfills"
+
+        def score(c):
+            total = 0.0
+            for term in set(tokenize(query)):
+                df = sum(1 for other in counts if term in other)
+                if c[term]:
+                    idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                    total += idf * c[term] * (K1 + 1) / (c[term] + K1 * (1 - B + B * sum(c.values()) / average))
+            return total
+
+        expected = sorted(((score(c), doc) for doc, c in enumerate(counts)), reverse=True)[:5]
+        found = index.search(query, limit=5)
+        self.assertEqual([doc for _, doc in found], [doc for _, doc in expected])
+        for (got, _), (want, _) in zip(found, expected):
+            self.assertAlmostEqual(got, want, places=4)
+        self.assertEqual(index.text(found[0][1]), docs[expected[0][1]][2])
+
+    def test_facts_endpoint_and_rebuild_on_content_change(self):
+        """Test the /facts endpoint and that edited content gets a fresh index"""
+        from app import app
+        from search import IndexStore
+
+        client = app.test_client()
+        results = client.get('/facts?q=beaches&location=beach').get_json()["results"]
+        self.assertTrue(results)
+        self.assertTrue(all(result["location"] in (None, "beach") for result in results))
+        self.assertEqual(client.get('/facts').status_code, 400)
+        self.assertEqual(client.get('/facts?q=water&location=moon').status_code, 400)
+
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "content.json")
+        with open(content_store.CONTENT_PATH) as f:
+            source = f.read()
+        with open(path, "w") as f:
+            f.write(source)
+        contents = content_store.ContentStore(path, check_interval=0)
+        store = IndexStore(contents)
+        self.assertEqual(store.current().search("zeolite"), [])
+        with open(path, "w") as f:
+            f.write(source.replace('"tips": [', '"tips": [\n        "Zeolite filters clean water.",', 1))
+        os.utime(path, ns=(0, 0))
+        contents.maybe_reload()
+        self.assertEqual(store.current().results("zeolite")[0]["text"], "Zeolite filters clean water.")
+        self.assertTrue(os.path.exists(path + ".index"))
+
+    def test_damaged_index_file_is_rebuilt(self):
+        """Test that a truncated or corrupt index file is rebuilt instead of failing to load"""
+        from search import IndexStore
+
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "content.json")
+        with open(content_store.CONTENT_PATH) as f:
+            source = f.read()
+        with open(path, "w") as f:
+            f.write(source)
+        contents = content_store.ContentStore(path, check_interval=0)
+        IndexStore(contents).current()
+        with open(path + ".index", "rb") as f:
+            data = f.read()
+
+        for damaged in (data[:20], data[:len(data) // 2], data[:-3], data + b"\0" * 5):
+            with open(path + ".index", "wb") as f:
+                f.write(damaged)
+            index = IndexStore(contents).current()
+            self.assertTrue(index.search("recycling"))
+            with open(path + ".index", "rb") as f:
+                self.assertEqual(f.read(), data)
+
+class TestAchievements(unittest.TestCase):
+
+    def _expected(self, game):
+        """Achievements earned by a game, worked out from its whole move history."""
+        replay = SustainabilityGame(seed=game.seed)
+        day, planted, beach, commutes, good_days, plastics = 1, set(), set(), 0, 0, False
+        for kind, arg in game.moves:
+            replay.apply_move(kind, arg)
+            if kind == "action" and arg == "plant_trees":
+                planted.add(day)
+            elif kind == "action" and arg == "use_public_transport":
+                commutes += 1
+            elif kind == "action" and arg == "use_single_use_plastics":
+                plastics = True
+            elif kind == "travel" and arg == "beach":
+                beach.add(day)
+            elif kind == "end_day":
+                day += 1
+                good_days += replay.sustainability_level > 10
+        expected = []
+        for name, earned in (("tree_planter", len(planted) >= 5), ("green_commuter", commutes >= 10),
+                             ("beach_regular", len(beach) >= 3), ("steady_progress", good_days >= 7),
+                             ("plastic_free", game.is_over() and not plastics)):
+            if earned:
+                expected.append(name)
+        return expected
+
+    def test_incremental_progress_matches_a_full_scan(self):
+        """Test that achievements earned move by move match a scan of the history"""
+        import random
+        from achievements import engine_for
+
+        rng = random.Random(5)
+        engine = engine_for(content_store.current().rules)
+        day_one = [("travel", "park"), ("action", "plant_trees"), ("action", "plant_trees"),
+                   ("travel", "home"), ("action", "rest"), ("action", "rest")] * 5
+        every_day = [("travel", "beach"), ("travel", "park"), ("action", "plant_trees"), ("travel", "work"),
+                     ("action", "use_public_transport"), ("action", "use_public_transport"),
+                     ("travel", "home"), ("action", "rest"), ("action", "rest"), ("end_day", None)]
+        planned = iter(day_one + every_day * 7)
+        for number in range(301):
+            game = SustainabilityGame(seed=rng.getrandbits(32))
+            size = len(game.progress)
+            announced = []
+            while not game.is_over() and len(game.moves) < 120:
+                roll = rng.random()
+                if number == 300:
+                    result = game.apply_move(*next(planned))
+                elif game.energy < 40 and game.current_location != "home":
+                    result = game.change_location("home")
+                elif game.energy < 40:
+                    result = game.perform_action("rest")
+                elif roll < 0.3:
+                    result = game.change_location(rng.choice(list(game.locations)))
+                elif roll < 0.45:
+                    result = game.end_day()
+                else:
+                    result = game.perform_action(rng.choice(game.rules.actions_at(game.current_location)))
+                announced += result.get("achievements", [])
+            earned = [achievement.name for achievement in engine.earned(game.progress)]
+            self.assertEqual(earned, self._expected(game))
+            self.assertEqual(sorted(announced), sorted(earned))
+            self.assertEqual(len(game.progress), size)
+        self.assertEqual(len(earned), 5)
+
+    def test_moves_only_run_their_own_triggers(self):
+        """Test that actions without achievements compile to empty trigger lists"""
+        from achievements import engine_for
+
+        rules = content_store.current().rules
+        engine = engine_for(rules)
+        self.assertEqual(engine.on_action[rules.action_ids["rest"]], ())
+        self.assertEqual(len(engine.on_action[rules.action_ids["plant_trees"]]), 1)
+        self.assertEqual(engine.on_travel[rules.location_ids["home"]], ())
+        self.assertIs(engine_for(rules), engine)
+
+    def test_progress_reaches_the_api_and_survives_snapshots(self):
+        """Test that earned achievements are reported and kept across an event log snapshot"""
+        from app import app
+        from event_log import EventLog
+        from session_store import new_game_id
+
+        client = app.test_client()
+        game_id = client.post('/api/v1/games', json={"player_name": "Test Player"}).get_json()["game_id"]
+        moves = [{"type": "travel", "location": "beach"}, {"type": "end_day"}] * 3
+        response = client.post(f'/api/v1/games/{game_id}/actions', json={"moves": moves}).get_json()
+        self.assertEqual(response["results"][4]["achievements"], ["beach_regular"])
+        self.assertEqual(response["state"]["achievements"], ["beach_regular"])
+
+        directory = tempfile.mkdtemp()
+        log = EventLog(directory, snapshot_every=2, fsync=False)
+        log.recover()
+        game = SustainabilityGame()
+        game.player_name = "Test Player"
+        log_id = new_game_id()
+        log.append(log_id, "start", None, game)
+        for kind, arg in [("travel", "beach"), ("end_day", None)] * 3:
+            game.apply_move(kind, arg)
+            log.append(log_id, kind, arg, game)
+            log.wait(timeout=5)
+        log.close()
+        recovered = EventLog(directory, fsync=False)
+        self.assertEqual(recovered.recover()[log_id].progress, game.progress)
+        recovered.close()
+
+class TestSessionStores(unittest.TestCase):
+
+    def test_memory_store_evicts_least_recently_used(self):
+        """Test that the memory store stays within max_entries"""
+        store = MemorySessionStore(max_entries=2, ttl=60)
+        store.save("a", SustainabilityGame())
+        store.save("b", SustainabilityGame())
+        store.get("a")
+        store.save("c", SustainabilityGame())
+
+        self.assertIsNotNone(store.get("a"))
+        self.assertIsNone(store.get("b"))
+        self.assertEqual(len(store), 2)
+
+    def test_memory_store_expires_idle_games(self):
+        """Test that games idle for longer than the TTL are dropped"""
+        now = [0]
+        store = MemorySessionStore(ttl=10, clock=lambda: now[0])
+        store.save("a", SustainabilityGame())
+        now[0] = 11
+        self.assertIsNone(store.get("a"))
+
+    def test_sqlite_store_round_trip(self):
+        """Test that the SQLite store persists game state"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "games.db")
+            game = SustainabilityGame()
+            game.player_name = "Test Player"
+            game.perform_action("plant_trees")
+            SqliteSessionStore(path).save("a", game)
+
+            loaded = SqliteSessionStore(path).get("a")
+            self.assertEqual(loaded.player_name, "Test Player")
+            self.assertEqual(loaded.eco_points, game.eco_points)
+            self.assertEqual(loaded.energy, game.energy)
+
+    def test_sqlite_store_expires_idle_games_only(self):
+        """Test that the SQLite store counts its TTL from the last use and purges on save"""
+        with tempfile.TemporaryDirectory() as tmp:
+            now = [0]
+            store = SqliteSessionStore(os.path.join(tmp, "games.db"), ttl=10,
+                                       clock=lambda: now[0], purge_interval=5)
+            store.save("active", SustainabilityGame())
+            store.save("idle", SustainabilityGame())
+            for now[0] in (6, 12, 18):
+                self.assertIsNotNone(store.get("active"))
+
+            store.save("new", SustainabilityGame())
+            self.assertEqual(sorted(store.game_ids()), ["active", "new"])
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,155 +1,203 @@
 #!/usr/bin/env python3
 
+"""
+Terminal version of the Hong Kong Sustainability Challenge.
+
+TerminalGame is a pure state machine: start() and send(line) return what to
+show, as text plus Pause and CLEAR effects, and `prompt` holds the question
+for the next line of input. It never reads input, sleeps or touches the
+terminal itself, so the same game runs interactively (play_interactive) or
+headless from a script or a bot (play_headless), thousands of games a
+second with quiet=True. A game's facts follow its `seed`, so the same seed
+and input lines reproduce a session exactly. Games given the same
+rooms.Room share a city: their actions add up, and the end-of-day status
+describes the room's average.
+
+    python text_sustainability_game.py
+"""
+
 import random
+import sys
 import time
-import os
-from hong_kong_sustainability_facts import HK_SUSTAINABILITY_FACTS, LOCATION_SPECIFIC_FACTS, SUSTAINABILITY_TIPS
 
-class SustainabilityGame:
-    def __init__(self):
+import sampler
+from rooms import sustainability_status
+from sampler import cursor_for
+
+GAME_DAYS = 7
+
+
+class Pause:
+    """Wait this many seconds before showing what follows."""
+
+    __slots__ = ("seconds",)
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+
+CLEAR = object()
+"""Clear the screen before showing what follows."""
+
+WIDTH = 60
+
+LOCATIONS = {
+    "home": {"description": "Your apartment in Hong Kong", "actions": ["save_energy", "reduce_waste", "rest"]},
+    "work": {"description": "Your office in Central", "actions": ["use_public_transport", "reduce_paper", "advocate_sustainability"]},
+    "market": {"description": "Local wet market in Mong Kok", "actions": ["buy_local_produce", "reduce_plastic", "educate_vendors"]},
+    "beach": {"description": "Repulse Bay Beach", "actions": ["clean_beach", "join_conservation", "raise_awareness"]},
+    "park": {"description": "Hong Kong Park", "actions": ["plant_trees", "water_conservation", "community_garden"]}
+}
+
+ACTION_IMPACTS = {
+    "save_energy": {"eco_points": -5, "energy": 10, "sustainability": 0.5},
+    "reduce_waste": {"eco_points": -10, "energy": 15, "sustainability": 0.5},
+    "rest": {"eco_points": 0, "energy": 50, "sustainability": 0},
+    "use_public_transport": {"eco_points": 5, "energy": -10, "sustainability": 0.7},
+    "reduce_paper": {"eco_points": 3, "energy": -5, "sustainability": 0.3},
+    "advocate_sustainability": {"eco_points": 10, "energy": -25, "sustainability": 1},
+    "buy_local_produce": {"eco_points": 5, "energy": -10, "sustainability": 0.6},
+    "reduce_plastic": {"eco_points": 7, "energy": -5, "sustainability": 0.5},
+    "educate_vendors": {"eco_points": 15, "energy": -20, "sustainability": 0.8},
+    "clean_beach": {"eco_points": 20, "energy": -30, "sustainability": 1},
+    "join_conservation": {"eco_points": 25, "energy": -35, "sustainability": 1.2},
+    "raise_awareness": {"eco_points": 15, "energy": -25, "sustainability": 0.9},
+    "plant_trees": {"eco_points": 20, "energy": -30, "sustainability": 1.1},
+    "water_conservation": {"eco_points": 15, "energy": -20, "sustainability": 0.8},
+    "community_garden": {"eco_points": 20, "energy": -25, "sustainability": 1}
+}
+
+MENU_PROMPT = "\nEnter your choice (1-7): "
+
+
+def _title(name):
+    return name.replace('_', ' ').title()
+
+
+class TerminalGame:
+    """The terminal game as a state machine driven one line of input at a time."""
+
+    def __init__(self, quiet=False, fact_cursor=None, seed=None, room=None):
+        self.quiet = quiet
+        self.room = room
+        self.seed = random.getrandbits(32) if seed is None else seed
         self.player_name = ""
         self.eco_points = 0
         self.days = 1
         self.energy = 100
         self.sustainability_level = 0
-        self.facts_shown = set()
-        self.tips_shown = set()
-        self.locations = {
-            "home": {"description": "Your apartment in Hong Kong", "actions": ["save_energy", "reduce_waste", "rest"]},
-            "work": {"description": "Your office in Central", "actions": ["use_public_transport", "reduce_paper", "advocate_sustainability"]},
-            "market": {"description": "Local wet market in Mong Kok", "actions": ["buy_local_produce", "reduce_plastic", "educate_vendors"]},
-            "beach": {"description": "Repulse Bay Beach", "actions": ["clean_beach", "join_conservation", "raise_awareness"]},
-            "park": {"description": "Hong Kong Park", "actions": ["plant_trees", "water_conservation", "community_garden"]}
-        }
-        self.action_impacts = {
-            "save_energy": {"eco_points": -5, "energy": 10, "sustainability": 0.5},
-            "reduce_waste": {"eco_points": -10, "energy": 15, "sustainability": 0.5},
-            "rest": {"eco_points": 0, "energy": 50, "sustainability": 0},
-            "use_public_transport": {"eco_points": 5, "energy": -10, "sustainability": 0.7},
-            "reduce_paper": {"eco_points": 3, "energy": -5, "sustainability": 0.3},
-            "advocate_sustainability": {"eco_points": 10, "energy": -25, "sustainability": 1},
-            "buy_local_produce": {"eco_points": 5, "energy": -10, "sustainability": 0.6},
-            "reduce_plastic": {"eco_points": 7, "energy": -5, "sustainability": 0.5},
-            "educate_vendors": {"eco_points": 15, "energy": -20, "sustainability": 0.8},
-            "clean_beach": {"eco_points": 20, "energy": -30, "sustainability": 1},
-            "join_conservation": {"eco_points": 25, "energy": -35, "sustainability": 1.2},
-            "raise_awareness": {"eco_points": 15, "energy": -25, "sustainability": 0.9},
-            "plant_trees": {"eco_points": 20, "energy": -30, "sustainability": 1.1},
-            "water_conservation": {"eco_points": 15, "energy": -20, "sustainability": 0.8},
-            "community_garden": {"eco_points": 20, "energy": -25, "sustainability": 1}
-        }
-        self.tips = [
-            "Bring your own shopping bag to reduce waste.",
-            "Use a reusable water bottle instead of buying bottled water.",
-            "Take public transport to reduce your carbon footprint.",
-            "Support local farms by purchasing locally grown produce.",
-            "Turn off unnecessary lights to save energy."
-        ]
-
-    def clear_screen(self):
-        os.system('cls' if os.name == 'nt' else 'clear')
-
-    def print_header(self):
-        self.clear_screen()
-        print("\n" + "=" * 60)
-        print(f"{'HONG KONG SUSTAINABILITY CHALLENGE':^60}")
-        print("=" * 60)
-        print(f"Player: {self.player_name} | Day: {self.days} | Eco Points: {self.eco_points} | Energy: {self.energy}%")
-        print(f"Sustainability Impact: {self.sustainability_level:.1f}")
-        print("-" * 60)
-
-    def get_player_info(self):
-        self.clear_screen()
-        print("\n" + "=" * 60)
-        print(f"{'HONG KONG SUSTAINABILITY CHALLENGE':^60}")
-        print("=" * 60)
-        print("\nWelcome to the Hong Kong Sustainability Challenge!")
-        print("Your mission is to improve sustainability in Hong Kong through")
-        print("daily choices and actions. Navigate different locations, make")
-        print("sustainable choices, and deal with Hong Kong's unique environmental challenges.")
-
-        self.player_name = input("\nPlease enter your name: ")
-        while not self.player_name.strip():
-            self.player_name = input("Please enter a valid name: ")
-
-        print(f"\nWelcome, {self.player_name}! Your sustainability journey in Hong Kong begins now.")
-        self.show_random_fact()
-        input("\nPress Enter to start the game...")
+        self.current_location = "home"
+        self.fact_cursor = cursor_for(self.seed) if fact_cursor is None else fact_cursor
+        self.locations = LOCATIONS
+        self.action_impacts = ACTION_IMPACTS
+        self.phase = "name"
+        self.prompt = "\nPlease enter your name: "
+        self._output = []
+
+    @property
+    def done(self):
+        return self.phase == "over"
+
+    # Output
+
+    def _show(self, *items):
+        if not self.quiet:
+            self._output.extend(items)
+
+    def _flush(self):
+        output, self._output = self._output, []
+        return output
+
+    def _banner(self, title):
+        self._show(CLEAR, "\n" + "=" * WIDTH, f"{title:^{WIDTH}}", "=" * WIDTH)
 
     def show_random_fact(self):
-        available_facts = [f for f in HK_SUSTAINABILITY_FACTS if f not in self.facts_shown]
-        if not available_facts:
-            self.facts_shown = set()
-            available_facts = HK_SUSTAINABILITY_FACTS
-
-        fact = random.choice(available_facts)
-        self.facts_shown.add(fact)
-        print("\n" + "-" * 60)
-        print("DID YOU KNOW? 🌿")
-        print(fact)
-        print("-" * 60)
-
-    def display_location(self):
+        # Read the samplers on every draw, so facts follow content hot reloads.
+        fact, self.fact_cursor = sampler.current().facts.draw(self.fact_cursor)
+        self._show("\n" + "-" * WIDTH, "DID YOU KNOW? 🌿", fact, "-" * WIDTH)
+
+    def _header(self):
+        if self.quiet:
+            return
+        self._banner("HONG KONG SUSTAINABILITY CHALLENGE")
+        self._show(f"Player: {self.player_name} | Day: {self.days} | Eco Points: {self.eco_points} | Energy: {self.energy}%",
+                   f"Sustainability Impact: {self.sustainability_level:.1f}",
+                   "-" * WIDTH)
+
+    def _menu(self):
+        """Show the day's menu, or the final results once the last day is over."""
+        if self.days > GAME_DAYS:
+            self._game_over()
+            return
+        self.phase, self.prompt = "menu", MENU_PROMPT
+        if self.quiet:
+            return
+        self._header()
         location_data = self.locations[self.current_location]
-        print(f"\nLocation: {self.current_location.title()} - {location_data['description']}")
-        print("\nAvailable actions:")
+        self._show(f"\nLocation: {self.current_location.title()} - {location_data['description']}",
+                   "\nAvailable actions:")
         for i, action in enumerate(location_data["actions"], 1):
-            print(f"{i}. {action.replace('_', ' ').title()} - {self.action_descriptions[action]}")
+            impact = self.action_impacts[action]
+            self._show(f"{i}. {_title(action)} ({impact['eco_points']:+} Eco Points, {impact['energy']:+} Energy)")
+        self._show("\nWhat would you like to do?",
+                   "1-3. Perform an action at this location",
+                   "4. Change location",
+                   "5. End the day",
+                   "6. Quit game",
+                   "7. Learn a sustainability fact")
+
+    def _game_over(self):
+        self.phase, self.prompt = "over", None
+        self._banner("GAME OVER - FINAL RESULTS")
+        self._show(f"Player: {self.player_name}",
+                   f"Days Played: {self.days}",
+                   f"Total Eco Points: {self.eco_points}",
+                   f"Final Sustainability Impact: {self.sustainability_level:.1f}",
+                   f"\n{self.get_final_message()}")
+        self.show_random_fact()
+        self._show("\nThank you for playing the Hong Kong Sustainability Challenge!", "=" * WIDTH)
+
+    # Rules
 
     def perform_action(self, action):
         impact = self.action_impacts[action]
         self.eco_points += impact["eco_points"]
         self.energy += impact["energy"]
         self.sustainability_level += impact["sustainability"]
+        if self.room is not None:
+            self.room.record_action(impact["eco_points"], impact["sustainability"])
 
-        print(f"\nYou performed: {action.replace('_', ' ').title()}")
-        print(f"Impact: {impact['eco_points']} Eco Points, {impact['energy']} Energy, {impact['sustainability']} Sustainability")
-
+        self._show(f"\nYou performed: {_title(action)}",
+                   f"Impact: {impact['eco_points']} Eco Points, {impact['energy']} Energy, {impact['sustainability']} Sustainability")
         if self.energy <= 0:
-            print("\nYou're out of energy! Time to rest.")
+            self._show("\nYou're out of energy! Time to rest.")
             self.energy = 10
+        self._show(Pause(2))
 
-        time.sleep(2)
+    def change_location(self, location):
+        self.current_location = location
+        self.energy -= 5  # Travel consumes energy
+        self._show(f"\nTraveled to {location.title()}")
+        fact = sampler.location_fact(location, self.seed, self.days)
+        if fact is not None:
+            self._show(f"Did you know? {fact}")
+        self._show(Pause(1))
 
     def end_day(self):
         self.days += 1
         self.energy = min(100, self.energy + 20)  # Reduced energy recovery
-        print("\n" + "-" * 60)
-        print(f"End of Day {self.days-1}")
-        print(f"Total Eco Points: {self.eco_points}")
-        print(f"Sustainability Impact: {self.sustainability_level:.1f}")
-
-        status = self.get_sustainability_status()
-        print(f"Status: {status}")
-        print("-" * 60)
+        self._show("\n" + "-" * WIDTH,
+                   f"End of Day {self.days - 1}",
+                   f"Total Eco Points: {self.eco_points}",
+                   f"Sustainability Impact: {self.sustainability_level:.1f}",
+                   f"Status: {self.get_sustainability_status()}",
+                   "-" * WIDTH)
         self.show_random_fact()
-        input("\nPress Enter to continue to the next day...")
 
     def get_sustainability_status(self):
-        if self.sustainability_level < 5:
-            return "Hong Kong is still facing significant environmental challenges."
-        elif self.sustainability_level < 10:
-            return "Small improvements are visible in Hong Kong's environment."
-        elif self.sustainability_level < 20:
-            return "Your efforts are making a noticeable difference in Hong Kong!"
-        else:
-            return "Remarkable progress! Hong Kong is becoming a model for urban sustainability."
-
-    def game_over(self):
-        self.clear_screen()
-        print("\n" + "=" * 60)
-        print(f"{'GAME OVER - FINAL RESULTS':^60}")
-        print("=" * 60)
-        print(f"Player: {self.player_name}")
-        print(f"Days Played: {self.days}")
-        print(f"Total Eco Points: {self.eco_points}")
-        print(f"Final Sustainability Impact: {self.sustainability_level:.1f}")
-
-        message = self.get_final_message()
-        print(f"\n{message}")
-        self.show_random_fact()
-        print("\nThank you for playing the Hong Kong Sustainability Challenge!")
-        print("=" * 60)
+        if self.room is not None:
+            return self.room.state()["status"]
+        return sustainability_status(self.sustainability_level)
 
     def get_final_message(self):
         if self.sustainability_level < 10:
@@ -161,69 +209,125 @@ class SustainabilityGame:
         else:
             return "Extraordinary achievement! You've transformed Hong Kong into a beacon of urban sustainability."
 
-    def play(self):
-        self.get_player_info()
-
-        game_duration = 7  # Game lasts for 7 days
-
-        while self.days <= game_duration:
-            self.print_header()
-            self.display_location()
-
-            print("\nWhat would you like to do?")
-            print("1-3. Perform an action at this location")
-            print("4. Change location")
-            print("5. End the day")
-            print("6. Quit game")
-            print("7. Learn a sustainability fact")
-
-            choice = input("\nEnter your choice (1-7): ")
-
-            if choice in ['1', '2', '3']:
-                action_idx = int(choice) - 1
-                if action_idx < len(self.locations[self.current_location]["actions"]):
-                    action = self.locations[self.current_location]["actions"][action_idx]
-                    self.perform_action(action)
-                else:
-                    print("\nInvalid action number. Try again.")
-                    time.sleep(1)
-
-            elif choice == '4':
-                self.print_header()
-                self.display_locations()
-                loc_choice = input("\nEnter location number: ")
-                try:
-                    loc_idx = int(loc_choice) - 1
-                    if 0 <= loc_idx < len(self.locations):
-                        self.current_location = list(self.locations.keys())[loc_idx]
-                        print(f"\nTraveled to {self.current_location.title()}")
-                        self.energy -= 5  # Travel consumes energy
-                        time.sleep(1)
-                    else:
-                        print("\nInvalid location number. Try again.")
-                        time.sleep(1)
-                except ValueError:
-                    print("\nPlease enter a valid number.")
-                    time.sleep(1)
-
-            elif choice == '5':
-                self.end_day()
-
-            elif choice == '6':
-                confirm = input("\nAre you sure you want to quit? (y/n): ")
-                if confirm.lower() == 'y':
-                    break
-
-            elif choice == '7':
-                self.show_random_fact()
-                input("\nPress Enter to continue...")
+    # Transitions
+
+    def start(self):
+        """Return the opening screen."""
+        self._banner("HONG KONG SUSTAINABILITY CHALLENGE")
+        self._show("\nWelcome to the Hong Kong Sustainability Challenge!",
+                   "Your mission is to improve sustainability in Hong Kong through",
+                   "daily choices and actions. Navigate different locations, make",
+                   "sustainable choices, and deal with Hong Kong's unique environmental challenges.")
+        return self._flush()
+
+    def send(self, line):
+        """Handle one line of player input; return what to show next."""
+        if self.phase == "over":
+            raise ValueError("The game is over")
+        getattr(self, "_on_" + self.phase)(line)
+        return self._flush()
+
+    def _on_name(self, line):
+        if not line.strip():
+            self.prompt = "Please enter a valid name: "
+            return
+        self.player_name = line
+        self._show(f"\nWelcome, {self.player_name}! Your sustainability journey in Hong Kong begins now.")
+        if self.room is not None:
+            self.room.join()
+            self._show(f"You share the city with the players of room {self.room.name}.")
+        self.show_random_fact()
+        self.phase, self.prompt = "continue", "\nPress Enter to start the game..."
 
+    def _on_continue(self, line):
+        self._menu()
+
+    def _on_menu(self, choice):
+        if choice in ('1', '2', '3'):
+            actions = self.locations[self.current_location]["actions"]
+            action_idx = int(choice) - 1
+            if action_idx < len(actions):
+                self.perform_action(actions[action_idx])
             else:
-                print("\nInvalid choice. Please enter a number from 1 to 7.")
-                time.sleep(1)
+                self._show("\nInvalid action number. Try again.", Pause(1))
+            self._menu()
+        elif choice == '4':
+            self._header()
+            self._show("\nWhere would you like to go?")
+            for i, (name, data) in enumerate(self.locations.items(), 1):
+                self._show(f"{i}. {name.title()} - {data['description']}")
+            self.phase, self.prompt = "travel", "\nEnter location number: "
+        elif choice == '5':
+            self.end_day()
+            self.phase, self.prompt = "continue", "\nPress Enter to continue to the next day..."
+        elif choice == '6':
+            self.phase, self.prompt = "quit", "\nAre you sure you want to quit? (y/n): "
+        elif choice == '7':
+            self.show_random_fact()
+            self.phase, self.prompt = "continue", "\nPress Enter to continue..."
+        else:
+            self._show("\nInvalid choice. Please enter a number from 1 to 7.", Pause(1))
+            self._menu()
+
+    def _on_travel(self, line):
+        try:
+            loc_idx = int(line) - 1
+        except ValueError:
+            self._show("\nPlease enter a valid number.", Pause(1))
+        else:
+            if 0 <= loc_idx < len(self.locations):
+                self.change_location(list(self.locations)[loc_idx])
+            else:
+                self._show("\nInvalid location number. Try again.", Pause(1))
+        self._menu()
+
+    def _on_quit(self, line):
+        if line.lower() == 'y':
+            self._game_over()
+        else:
+            self._menu()
+
+
+def render(output, write, sleep):
+    """Show a game's output on a terminal-like `write`, pausing with `sleep`."""
+    for item in output:
+        if item is CLEAR:
+            # ANSI clear and home, rather than forking a `clear` process.
+            write("\033[2J\033[H")
+        elif isinstance(item, Pause):
+            sleep(item.seconds)
+        else:
+            write(item + "\n")
+
+
+def play_interactive(game=None, read=input, write=sys.stdout.write, sleep=time.sleep):
+    """Play in a terminal; I/O and the clock can be swapped for anything with the same signature."""
+    game = game or TerminalGame()
+    render(game.start(), write, sleep)
+    while not game.done:
+        render(game.send(read(game.prompt)), write, sleep)
+    return game
+
+
+def play_headless(lines, game=None):
+    """Drive a game with scripted input without pausing; return the game.
+
+    `lines` is an iterable of input lines or a callable that is given the
+    game and returns the next line, for bots. Stops when the game is over
+    or the script runs out.
+    """
+    game = game or TerminalGame(quiet=True)
+    game.start()
+    if callable(lines):
+        while not game.done:
+            game.send(lines(game))
+        return game
+    for line in lines:
+        if game.done:
+            break
+        game.send(line)
+    return game
 
-        self.game_over()
 
 if __name__ == "__main__":
-    game = SustainabilityGame()
-    game.play()
\ No newline at end of file
+    play_interactive()